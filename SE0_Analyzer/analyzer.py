@@ -1,283 +1,363 @@
-def analyze_seo(seo_data):
-    """
-    Enhanced SEO analysis with comprehensive scoring
-    Score out of 100 points with detailed breakdown
-    """
-    
-    if 'error' in seo_data:
-        return {
-            'score': 0,
-            'issues': [seo_data['error']],
-            'strengths': [],
-            'category_scores': {}
-        }
-    
-    score = 0
-    issues = []
-    strengths = []
-    category_scores = {
-        'meta_tags': 0,
-        'content': 0,
-        'technical': 0,
-        'social': 0
-    }
-    
+import os
+import threading
+
+import metrics
+from rules import ScoringProfile, load_profile_file, score_batch, to_columns
+
+# Bump whenever a change to the rules below alters scores for the same data,
+# so that memoized analyses from older rules are not reused
+SCORING_VERSION = 1
+
+# Extra scoring profiles (*.json, *.yaml) are loaded from this directory
+PROFILES_DIR = os.getenv('SEO_PROFILES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+
+DEFAULT_PROFILE_NAME = 'default'
+
+# Category maximums are the sum of their rules' best scores:
+# meta tags 30, content 35, technical 25, social 10
+DEFAULT_CATEGORIES = {
+    'meta_tags': {},
+    'content': {},
+    'technical': {},
+    'social': {},
+}
+
+DEFAULT_RULES = [
     # ========================================
     # CATEGORY 1: META TAGS (30 points)
     # ========================================
-    
-    meta_score = 0
-    
-    # 1.1 Title Tag (10 points)
-    if seo_data['title']:
-        title_len = seo_data['title_length']
-        if 30 <= title_len <= 60:
-            meta_score += 10
-            strengths.append("✅ Title tag length is optimal (30-60 characters)")
-        elif 20 <= title_len <= 70:
-            meta_score += 6
-            issues.append(f"⚠️ Title tag length is {title_len} chars (optimal: 30-60)")
-        elif title_len > 0:
-            meta_score += 3
-            issues.append(f"❌ Title tag length is {title_len} chars (needs improvement)")
-        else:
-            issues.append("❌ Title tag is empty")
-    else:
-        issues.append("❌ Missing title tag (critical SEO issue)")
-    
-    # 1.2 Meta Description (10 points)
-    if seo_data['meta_description']:
-        desc_len = seo_data['meta_description_length']
-        if 120 <= desc_len <= 160:
-            meta_score += 10
-            strengths.append("✅ Meta description length is optimal (120-160 characters)")
-        elif 100 <= desc_len <= 180:
-            meta_score += 6
-            issues.append(f"⚠️ Meta description is {desc_len} chars (optimal: 120-160)")
-        elif desc_len > 0:
-            meta_score += 3
-            issues.append(f"❌ Meta description is {desc_len} chars (needs improvement)")
-        else:
-            issues.append("❌ Meta description is empty")
-    else:
-        issues.append("❌ Missing meta description (important for click-through rate)")
-    
-    # 1.3 Canonical URL (5 points)
-    if seo_data['canonical_url']:
-        meta_score += 5
-        strengths.append("✅ Canonical URL is set (prevents duplicate content)")
-    else:
-        issues.append("⚠️ No canonical URL found (recommended for SEO)")
-    
-    # 1.4 Meta Robots (5 points)
-    if seo_data['meta_robots']:
-        meta_score += 5
-        if 'noindex' in seo_data['meta_robots'].lower():
-            issues.append("⚠️ Page is set to NOINDEX (won't appear in search results)")
-        else:
-            strengths.append("✅ Meta robots tag configured properly")
-    else:
-        meta_score += 2
-        issues.append("⚠️ No meta robots tag (not critical but recommended)")
-    
-    category_scores['meta_tags'] = meta_score
-    score += meta_score
-    
+    {
+        'id': 'title',
+        'category': 'meta_tags',
+        'when': {'metric': 'title', 'truthy': True},
+        'otherwise': {'issue': "❌ Missing title tag (critical SEO issue)"},
+        'metric': 'title_length',
+        'bands': [
+            {'between': [30, 60], 'points': 10, 'strength': "✅ Title tag length is optimal (30-60 characters)"},
+            {'between': [20, 70], 'points': 6, 'issue': "⚠️ Title tag length is {value} chars (optimal: 30-60)"},
+            {'gt': 0, 'points': 3, 'issue': "❌ Title tag length is {value} chars (needs improvement)"},
+            {'issue': "❌ Title tag is empty"},
+        ],
+    },
+    {
+        'id': 'meta_description',
+        'category': 'meta_tags',
+        'when': {'metric': 'meta_description', 'truthy': True},
+        'otherwise': {'issue': "❌ Missing meta description (important for click-through rate)"},
+        'metric': 'meta_description_length',
+        'bands': [
+            {'between': [120, 160], 'points': 10,
+             'strength': "✅ Meta description length is optimal (120-160 characters)"},
+            {'between': [100, 180], 'points': 6, 'issue': "⚠️ Meta description is {value} chars (optimal: 120-160)"},
+            {'gt': 0, 'points': 3, 'issue': "❌ Meta description is {value} chars (needs improvement)"},
+            {'issue': "❌ Meta description is empty"},
+        ],
+    },
+    {
+        'id': 'canonical_url',
+        'category': 'meta_tags',
+        'metric': 'canonical_url',
+        'bands': [
+            {'truthy': True, 'points': 5, 'strength': "✅ Canonical URL is set (prevents duplicate content)"},
+            {'issue': "⚠️ No canonical URL found (recommended for SEO)"},
+        ],
+    },
+    {
+        'id': 'meta_robots',
+        'category': 'meta_tags',
+        'when': {'metric': 'meta_robots', 'truthy': True},
+        'otherwise': {'points': 2, 'issue': "⚠️ No meta robots tag (not critical but recommended)"},
+        'metric': 'meta_robots',
+        'bands': [
+            {'contains': 'noindex', 'points': 5,
+             'issue': "⚠️ Page is set to NOINDEX (won't appear in search results)"},
+            {'points': 5, 'strength': "✅ Meta robots tag configured properly"},
+        ],
+    },
+
     # ========================================
     # CATEGORY 2: CONTENT STRUCTURE (35 points)
     # ========================================
-    
-    content_score = 0
-    
-    # 2.1 H1 Tags (12 points)
-    h1_count = len(seo_data['h1_tags'])
-    if h1_count == 1:
-        content_score += 12
-        strengths.append("✅ Perfect! One H1 tag found")
-    elif h1_count == 0:
-        issues.append("❌ No H1 tag found (critical for SEO and accessibility)")
-    else:
-        content_score += 6
-        issues.append(f"⚠️ Multiple H1 tags found ({h1_count}). Should have only 1")
-    
-    # 2.2 H2 Tags (8 points)
-    h2_count = len(seo_data['h2_tags'])
-    if h2_count >= 3:
-        content_score += 8
-        strengths.append(f"✅ Good content structure with {h2_count} H2 tags")
-    elif h2_count >= 1:
-        content_score += 4
-        issues.append(f"⚠️ Only {h2_count} H2 tag(s). Add more for better structure")
-    else:
-        issues.append("❌ No H2 tags found. Add subheadings for better structure")
-    
-    # 2.3 Word Count (10 points)
-    word_count = seo_data['word_count']
-    if word_count >= 1000:
-        content_score += 10
-        strengths.append(f"✅ Good content length ({word_count} words)")
-    elif word_count >= 500:
-        content_score += 6
-        issues.append(f"⚠️ Content is {word_count} words (aim for 1000+ for better SEO)")
-    elif word_count >= 300:
-        content_score += 3
-        issues.append(f"⚠️ Content is short ({word_count} words). Add more valuable content")
-    else:
-        issues.append(f"❌ Very little content ({word_count} words). Search engines prefer comprehensive content")
-    
-    # 2.4 Internal Links (5 points)
-    if seo_data['internal_links'] >= 5:
-        content_score += 5
-        strengths.append(f"✅ Good internal linking ({seo_data['internal_links']} links)")
-    elif seo_data['internal_links'] >= 2:
-        content_score += 3
-        issues.append(f"⚠️ Only {seo_data['internal_links']} internal links. Add more for better SEO")
-    else:
-        issues.append("❌ Very few internal links. Add more to improve site navigation")
-    
-    category_scores['content'] = content_score
-    score += content_score
-    
+    {
+        'id': 'h1',
+        'category': 'content',
+        'metric': 'h1_count',
+        'bands': [
+            {'eq': 1, 'points': 12, 'strength': "✅ Perfect! One H1 tag found"},
+            {'eq': 0, 'issue': "❌ No H1 tag found (critical for SEO and accessibility)"},
+            {'points': 6, 'issue': "⚠️ Multiple H1 tags found ({value}). Should have only 1"},
+        ],
+    },
+    {
+        'id': 'h2',
+        'category': 'content',
+        'metric': 'h2_count',
+        'bands': [
+            {'gte': 3, 'points': 8, 'strength': "✅ Good content structure with {value} H2 tags"},
+            {'gte': 1, 'points': 4, 'issue': "⚠️ Only {value} H2 tag(s). Add more for better structure"},
+            {'issue': "❌ No H2 tags found. Add subheadings for better structure"},
+        ],
+    },
+    {
+        'id': 'word_count',
+        'category': 'content',
+        'metric': 'word_count',
+        'bands': [
+            {'gte': 1000, 'points': 10, 'strength': "✅ Good content length ({value} words)"},
+            {'gte': 500, 'points': 6, 'issue': "⚠️ Content is {value} words (aim for 1000+ for better SEO)"},
+            {'gte': 300, 'points': 3, 'issue': "⚠️ Content is short ({value} words). Add more valuable content"},
+            {'issue': "❌ Very little content ({value} words). Search engines prefer comprehensive content"},
+        ],
+    },
+    {
+        'id': 'internal_links',
+        'category': 'content',
+        'metric': 'internal_links',
+        'bands': [
+            {'gte': 5, 'points': 5, 'strength': "✅ Good internal linking ({value} links)"},
+            {'gte': 2, 'points': 3, 'issue': "⚠️ Only {value} internal links. Add more for better SEO"},
+            {'issue': "❌ Very few internal links. Add more to improve site navigation"},
+        ],
+    },
+    # Up to -3 points, only when links were checked
+    {
+        'id': 'broken_links',
+        'category': 'content',
+        'when': {'metric': 'links_checked', 'truthy': True},
+        'metric': 'broken_links',
+        'bands': [
+            {'eq': 0, 'strength': "✅ No broken links found ({links_checked} links checked)"},
+            {'points_per': -1, 'points_cap': 3, 'issue': "❌ {value} broken link(s) found. Fix or remove them"},
+        ],
+    },
+
     # ========================================
     # CATEGORY 3: TECHNICAL SEO (25 points)
     # ========================================
-    
-    technical_score = 0
-    
-    # 3.1 HTTPS (5 points)
-    if seo_data['has_https']:
-        technical_score += 5
-        strengths.append("✅ Website uses HTTPS (secure)")
-    else:
-        issues.append("❌ Website is not using HTTPS (security risk and SEO penalty)")
-    
-    # 3.2 Page Load Time (5 points)
-    load_time = seo_data['load_time']
-    if load_time < 2:
-        technical_score += 5
-        strengths.append(f"✅ Fast load time ({load_time}s)")
-    elif load_time < 4:
-        technical_score += 3
-        issues.append(f"⚠️ Load time is {load_time}s (aim for under 2s)")
-    else:
-        issues.append(f"❌ Slow load time ({load_time}s). Optimize for speed")
-    
-    # 3.3 Page Size (3 points)
-    page_size = seo_data['page_size_kb']
-    if page_size < 500:
-        technical_score += 3
-        strengths.append(f"✅ Good page size ({page_size:.1f} KB)")
-    elif page_size < 1000:
-        technical_score += 2
-        issues.append(f"⚠️ Page size is {page_size:.1f} KB (try to keep under 500 KB)")
-    else:
-        issues.append(f"❌ Page size is {page_size:.1f} KB (too large, affects loading speed)")
-    
-    # 3.4 Mobile Viewport (3 points)
-    if seo_data['has_viewport']:
-        technical_score += 3
-        strengths.append("✅ Mobile viewport meta tag present")
-    else:
-        issues.append("❌ Missing viewport meta tag (critical for mobile SEO)")
-    
-    # 3.5 Language Declaration (2 points)
-    if seo_data['has_language']:
-        technical_score += 2
-        strengths.append(f"✅ Language declared ({seo_data['language']})")
-    else:
-        issues.append("⚠️ No language declaration in HTML tag")
-    
-    # 3.6 Favicon (2 points)
-    if seo_data['has_favicon']:
-        technical_score += 2
-        strengths.append("✅ Favicon present")
-    else:
-        issues.append("⚠️ No favicon found (improves brand recognition)")
-    
-    # 3.7 Structured Data (5 points)
-    if seo_data['has_schema']:
-        technical_score += 5
-        schema_types = ', '.join(seo_data['schema_types'][:3])
-        if schema_types:
-            strengths.append(f"✅ Structured data found ({schema_types})")
-        else:
-            strengths.append("✅ Structured data present")
-    else:
-        issues.append("⚠️ No structured data (Schema.org). Helps search engines understand your content")
-    
-    category_scores['technical'] = technical_score
-    score += technical_score
-    
+    {
+        'id': 'https',
+        'category': 'technical',
+        'metric': 'has_https',
+        'bands': [
+            {'truthy': True, 'points': 5, 'strength': "✅ Website uses HTTPS (secure)"},
+            {'issue': "❌ Website is not using HTTPS (security risk and SEO penalty)"},
+        ],
+    },
+    {
+        'id': 'load_time',
+        'category': 'technical',
+        'metric': 'load_time',
+        'bands': [
+            {'lt': 2, 'points': 5, 'strength': "✅ Fast load time ({value}s)"},
+            {'lt': 4, 'points': 3, 'issue': "⚠️ Load time is {value}s (aim for under 2s)"},
+            {'issue': "❌ Slow load time ({value}s). Optimize for speed"},
+        ],
+    },
+    {
+        'id': 'page_size',
+        'category': 'technical',
+        'metric': 'page_size_kb',
+        'bands': [
+            {'lt': 500, 'points': 3, 'strength': "✅ Good page size ({value:.1f} KB)"},
+            {'lt': 1000, 'points': 2, 'issue': "⚠️ Page size is {value:.1f} KB (try to keep under 500 KB)"},
+            {'issue': "❌ Page size is {value:.1f} KB (too large, affects loading speed)"},
+        ],
+    },
+    {
+        'id': 'viewport',
+        'category': 'technical',
+        'metric': 'has_viewport',
+        'bands': [
+            {'truthy': True, 'points': 3, 'strength': "✅ Mobile viewport meta tag present"},
+            {'issue': "❌ Missing viewport meta tag (critical for mobile SEO)"},
+        ],
+    },
+    {
+        'id': 'language',
+        'category': 'technical',
+        'metric': 'has_language',
+        'bands': [
+            {'truthy': True, 'points': 2, 'strength': "✅ Language declared ({language})"},
+            {'issue': "⚠️ No language declaration in HTML tag"},
+        ],
+    },
+    {
+        'id': 'favicon',
+        'category': 'technical',
+        'metric': 'has_favicon',
+        'bands': [
+            {'truthy': True, 'points': 2, 'strength': "✅ Favicon present"},
+            {'issue': "⚠️ No favicon found (improves brand recognition)"},
+        ],
+    },
+    {
+        'id': 'structured_data',
+        'category': 'technical',
+        'when': {'metric': 'has_schema', 'truthy': True},
+        'otherwise': {'issue': "⚠️ No structured data (Schema.org). Helps search engines understand your content"},
+        'metric': 'schema_list',
+        'bands': [
+            {'truthy': True, 'points': 5, 'strength': "✅ Structured data found ({value})"},
+            {'points': 5, 'strength': "✅ Structured data present"},
+        ],
+    },
+
     # ========================================
     # CATEGORY 4: SOCIAL & IMAGES (10 points)
     # ========================================
-    
-    social_score = 0
-    
-    # 4.1 Images Alt Text (5 points)
-    if seo_data['images'] > 0:
-        if seo_data['images_without_alt'] == 0:
-            social_score += 5
-            strengths.append(f"✅ All {seo_data['images']} images have alt text")
-        else:
-            missing_percent = (seo_data['images_without_alt'] / seo_data['images']) * 100
-            if missing_percent < 30:
-                social_score += 3
-                issues.append(f"⚠️ {seo_data['images_without_alt']} out of {seo_data['images']} images missing alt text")
-            else:
-                social_score += 1
-                issues.append(f"❌ {seo_data['images_without_alt']} out of {seo_data['images']} images missing alt text")
-    else:
-        social_score += 2
-        issues.append("⚠️ No images found on the page")
-    
-    # 4.2 Open Graph Tags (3 points)
-    og_count = sum([
-        1 for x in [seo_data['og_title'], seo_data['og_description'], seo_data['og_image']] 
-        if x
-    ])
-    if og_count >= 3:
-        social_score += 3
-        strengths.append("✅ Complete Open Graph tags for social sharing")
-    elif og_count > 0:
-        social_score += 1
-        issues.append(f"⚠️ Only {og_count}/3 Open Graph tags found (add more for better social sharing)")
-    else:
-        issues.append("⚠️ No Open Graph tags (important for social media previews)")
-    
-    # 4.3 Twitter Cards (2 points)
-    if seo_data['twitter_card']:
-        social_score += 2
-        strengths.append("✅ Twitter Card tags present")
-    else:
-        issues.append("⚠️ No Twitter Card tags (helps with Twitter sharing)")
-    
-    category_scores['social'] = social_score
-    score += social_score
-    
+    {
+        'id': 'image_alt',
+        'category': 'social',
+        'when': {'metric': 'images', 'gt': 0},
+        'otherwise': {'points': 2, 'issue': "⚠️ No images found on the page"},
+        'metric': 'missing_alt_percent',
+        'bands': [
+            {'eq': 0, 'points': 5, 'strength': "✅ All {images} images have alt text"},
+            {'lt': 30, 'points': 3, 'issue': "⚠️ {images_without_alt} out of {images} images missing alt text"},
+            {'points': 1, 'issue': "❌ {images_without_alt} out of {images} images missing alt text"},
+        ],
+    },
+    {
+        'id': 'open_graph',
+        'category': 'social',
+        'metric': 'og_count',
+        'bands': [
+            {'gte': 3, 'points': 3, 'strength': "✅ Complete Open Graph tags for social sharing"},
+            {'gt': 0, 'points': 1,
+             'issue': "⚠️ Only {value}/3 Open Graph tags found (add more for better social sharing)"},
+            {'issue': "⚠️ No Open Graph tags (important for social media previews)"},
+        ],
+    },
+    {
+        'id': 'twitter_card',
+        'category': 'social',
+        'metric': 'twitter_card',
+        'bands': [
+            {'truthy': True, 'points': 2, 'strength': "✅ Twitter Card tags present"},
+            {'issue': "⚠️ No Twitter Card tags (helps with Twitter sharing)"},
+        ],
+    },
+
     # ========================================
     # ADDITIONAL CHECKS (Not scored but reported)
     # ========================================
-    
-    # External Links
-    if seo_data['external_links'] > 0:
-        strengths.append(f"✅ Has {seo_data['external_links']} external links (good for credibility)")
+    {
+        'id': 'external_links',
+        'metric': 'external_links',
+        'bands': [
+            {'gt': 0, 'strength': "✅ Has {value} external links (good for credibility)"},
+            {'issue': "⚠️ No external links found (linking to authoritative sources helps SEO)"},
+        ],
+    },
+]
+
+_profiles = {DEFAULT_PROFILE_NAME: ScoringProfile(DEFAULT_PROFILE_NAME, DEFAULT_CATEGORIES, DEFAULT_RULES)}
+_profiles_lock = threading.Lock()
+_profiles_loaded = False
+
+
+def register_profile(definition):
+    """
+    Compile and register a scoring profile from its definition (a dict with
+    a name, optionally 'extends' naming the profile it builds on, plus
+    categories/rules/disable as described in ScoringProfile.derive).
+    """
+    name = definition.get('name')
+    if not name:
+        raise ValueError("A scoring profile needs a name")
+    base = get_profile(definition.get('extends', DEFAULT_PROFILE_NAME))
+    profile = base.derive(name, definition)
+    with _profiles_lock:
+        _profiles[name] = profile
+    return profile
+
+
+def _load_profiles_dir():
+    global _profiles_loaded
+
+    with _profiles_lock:
+        if _profiles_loaded:
+            return
+        _profiles_loaded = True
+    if not os.path.isdir(PROFILES_DIR):
+        return
+    for filename in sorted(os.listdir(PROFILES_DIR)):
+        if filename.endswith(('.json', '.yaml', '.yml')):
+            try:
+                profile = register_profile(load_profile_file(os.path.join(PROFILES_DIR, filename)))
+                print(f"🧮 Loaded scoring profile '{profile.name}' from {filename}")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Skipping scoring profile {filename}: {e}")
+
+
+def get_profile(name=None):
+    """Return a compiled scoring profile by name (the default one if None)"""
+    name = name or DEFAULT_PROFILE_NAME
+    if name not in _profiles:
+        _load_profiles_dir()
+    try:
+        return _profiles[name]
+    except KeyError:
+        raise ValueError(f"Unknown scoring profile '{name}'") from None
+
+
+def list_profiles():
+    _load_profiles_dir()
+    return sorted(_profiles)
+
+
+def analyze_seo(seo_data, profile=None):
+    """
+    Enhanced SEO analysis with comprehensive scoring
+    Score out of 100 points with detailed breakdown
+    (profile: name of a scoring profile, the default rules if not given)
+    """
+
+    if 'error' in seo_data:
+        return {
+            'score': 0,
+            'issues': [seo_data['error']],
+            'strengths': [],
+            'category_scores': {}
+        }
+
+    if not isinstance(profile, ScoringProfile):
+        profile = get_profile(profile)
+    if metrics.ENABLED:
+        with metrics.STAGE_SECONDS.time(stage='score'):
+            result = profile.evaluate(seo_data)
     else:
-        issues.append("⚠️ No external links found (linking to authoritative sources helps SEO)")
-    
-    # Calculate percentage scores for categories
-    category_percentages = {
-        'meta_tags': round((category_scores['meta_tags'] / 30) * 100),
-        'content': round((category_scores['content'] / 35) * 100),
-        'technical': round((category_scores['technical'] / 25) * 100),
-        'social': round((category_scores['social'] / 10) * 100)
-    }
-    
-    return {
-        'score': score,
-        'issues': issues,
-        'strengths': strengths,
-        'category_scores': category_scores,
-        'category_percentages': category_percentages,
-        'seo_data': seo_data
-    }
\ No newline at end of file
+        result = profile.evaluate(seo_data)
+    result['seo_data'] = seo_data
+    return result
+
+
+def analyze_batch(pages, profiles=None):
+    """
+    Score many seo_data dictionaries against several profiles (names) in a
+    single pass. Yields one {profile name: analysis} dictionary per page;
+    the analyses do not embed seo_data.
+    """
+    compiled = [get_profile(name) for name in (profiles or [DEFAULT_PROFILE_NAME])]
+    return score_batch(pages, compiled)
+
+
+def analyze_columns(data, profile=None, messages=False):
+    """
+    Score many pages at once and return columns rather than one analysis
+    per page: {'score': [...], 'category_scores': {category: [...]},
+    'category_percentages': {category: [...]}}, with per-page 'issues' and
+    'strengths' lists only when messages is set.
+
+    data is either a list of seo_data dictionaries (pages that failed to
+    scrape must be left out) or columns, {metric name: values}, as listed by
+    get_profile(profile).column_evaluator(messages).metrics.
+    """
+    if not isinstance(profile, ScoringProfile):
+        profile = get_profile(profile)
+    if not isinstance(data, dict):
+        data = data if isinstance(data, list) else list(data)
+        if any('error' in seo_data for seo_data in data):
+            raise ValueError("Pages that failed to scrape cannot be scored in columns")
+        data = to_columns(data, profile.column_evaluator(messages).metrics)
+    return profile.score_columns(data, messages)
\ No newline at end of file
@@ -1,10 +1,47 @@
-from flask import Flask, render_template, request, jsonify
-from scraper import scrape_website
-from analyzer import analyze_seo
+import json
+import threading
+import time
+
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response
+import metrics
+from analyzer import DEFAULT_PROFILE_NAME, analyze_seo, get_profile
+from discovery import discover_urls
+from env import env_int
+from history import get_history_store, record_analysis
+from jobs import get_job_queue, QueueFullError, SUGGESTION_THRESHOLD
 from llm_helper import get_seo_suggestions
+from pipeline import iter_bulk, make_result, result_to_json, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST
+from scraper import scrape_website
 
 app = Flask(__name__)
 
+
+# Seconds between keep-alive comments on an idle progress stream
+SSE_KEEPALIVE = 15
+
+# Limits for /api/batch: URLs per request, fetches in flight per request
+# (overall and per host) and batches running at once
+MAX_BATCH_URLS = env_int('SEO_API_MAX_BATCH_URLS', 500)
+MAX_BATCH_CONCURRENCY = env_int('SEO_API_MAX_BATCH_CONCURRENCY', DEFAULT_CONCURRENCY)
+MAX_BATCH_PER_HOST = env_int('SEO_API_MAX_BATCH_PER_HOST', DEFAULT_PER_HOST)
+_batch_slots = threading.BoundedSemaphore(env_int('SEO_API_MAX_BATCHES', 2))
+
+# Time to the response object, per route; streamed bodies (SSE, NDJSON)
+# are sent after this is recorded
+HTTP_SECONDS = metrics.histogram('seo_http_request_seconds', 'Request handling time by endpoint', ['endpoint'])
+
+@app.before_request
+def _start_timer():
+    if metrics.ENABLED:
+        request.environ['seo.start'] = time.perf_counter()
+
+@app.after_request
+def _record_time(response):
+    start = request.environ.get('seo.start')
+    if start is not None:
+        HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or 'unknown')
+    return response
+
 @app.route('/')
 def index():
     """Display the home page with input form"""
@@ -12,82 +49,270 @@ def index():
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    """Handle the SEO analysis request with enhanced features"""
+    """
+    Queue an SEO analysis and return straight away. JSON clients get the job
+    id (202); browser form posts are redirected to the job's result page,
+    which refreshes until the analysis is done.
+    """
+    # Get form data
+    industry = request.form.get('industry', '').strip()
+    website_url = request.form.get('website_url', '').strip()
+    wants_json = request.accept_mimetypes.best == 'application/json'
+
+    # Validate inputs
+    if not industry or not website_url:
+        error = "Please provide both industry and website URL"
+        if wants_json:
+            return jsonify({'error': error}), 400
+        return render_template('results.html', error=error)
+
+    try:
+        job = get_job_queue().submit(industry, website_url)
+    except QueueFullError as e:
+        print(f"⚠️ Analysis queue is full: {e}")
+        error = "The analyzer is busy right now, please try again in a minute"
+        if wants_json:
+            return jsonify({'error': error}), 503
+        return render_template('results.html', error=error), 503
+
+    print(f"📥 Queued analysis {job.id} for {website_url}")
+    if wants_json:
+        return jsonify({
+            'job_id': job.id,
+            'status_url': url_for('job_status', job_id=job.id),
+            'events_url': url_for('job_events', job_id=job.id),
+            'result_url': url_for('job_result', job_id=job.id),
+        }), 202
+    return redirect(url_for('job_result', job_id=job.id), code=303)
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a job's status and progress events"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a job's progress as Server-Sent Events until it finishes"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+
+    def stream():
+        seen = 0
+        while True:
+            events = job.wait_for_events(seen, SSE_KEEPALIVE)
+            if not events:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            seen += len(events)
+            for event in events:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            if job.finished and seen >= len(job.events):
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """
+    Render results.html from a finished job's stored output. Once the page
+    is scored, its scores and issues are shown straight away and the AI
+    suggestions are filled in from the job's event stream as they arrive.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return render_template('results.html', error="This analysis has expired, please run it again"), 404
+    if not job.finished and job.partial is not None:
+        with metrics.STAGE_SECONDS.time(stage='render'):
+            return render_template('results.html', events_url=url_for('job_events', job_id=job.id), **job.partial)
+    if not job.finished:
+        # Browsers without JavaScript land here straight after submitting
+        response = Response(f"⏳ Analyzing {job.url}... ({job.stage})", status=202, mimetype='text/plain')
+        response.headers['Refresh'] = '2'
+        return response
+    if job.error:
+        return render_template('results.html', error=job.error)
+    with metrics.STAGE_SECONDS.time(stage='render'):
+        return render_template('results.html', **job.result)
+
+def _api_params():
+    """Request parameters: query/form values, overridden by a JSON body"""
+    params = request.values.to_dict()
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        params.update(body)
+    return params
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def _int_param(params, name, default, limit):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(1, min(value, limit))
+
+@app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    """
+    Analyze one URL and return the analysis as JSON.
+    Parameters: url, industry (optional; enables AI suggestions for low
+    scores), profile (scoring profile, the default rules if not given) and
+    include_text (adds seo_data.text_content).
+    """
+    params = _api_params()
+    website_url = str(params.get('url') or params.get('website_url') or '').strip()
+    industry = str(params.get('industry') or '').strip()
+    if not website_url:
+        return jsonify({'error': 'Please provide a url'}), 400
+    try:
+        profile = get_profile(params.get('profile') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    seo_data = scrape_website(website_url)
+    if 'error' in seo_data:
+        body = result_to_json(make_result(website_url, error=seo_data['error']))
+        return Response(body, status=502, mimetype='application/json')
+
+    analysis = analyze_seo(seo_data, profile)
+    if profile.name == DEFAULT_PROFILE_NAME:
+        # History trends compare scores, so only default-profile scores are kept
+        record_analysis(seo_data, analysis, industry or None)
+    suggestions = None
+    if industry and analysis['score'] < SUGGESTION_THRESHOLD:
+        suggestions = get_seo_suggestions(industry, seo_data, analysis['issues'])
+
+    result = make_result(seo_data['url'], seo_data, analysis, suggestions)
+    return Response(result_to_json(result, include_text=_flag(params.get('include_text'))),
+                    mimetype='application/json')
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    Analyze many URLs concurrently and stream one JSON result per line
+    (NDJSON) as each page finishes, in completion order.
+    Parameters: urls (a JSON list, or newline-separated text) or sitemap
+    (a site or sitemap URL whose pages are analyzed, up to the batch limit),
+    industry, include_text, concurrency and per_host (both capped
+    server-side) and incremental (skip pages unchanged since their last
+    analysis, or not modified since according to the sitemap, and report
+    field-level changes for the others). Fetches are paced per host and
+    pages disallowed by robots.txt are skipped unless ignore_robots is set.
+    """
+    params = _api_params()
+    sitemap = str(params.get('sitemap') or '').strip()
+    if sitemap:
+        urls = discover_urls(sitemap, limit=MAX_BATCH_URLS, respect_robots=not _flag(params.get('ignore_robots')))
+    else:
+        urls = params.get('urls') or []
+        if isinstance(urls, str):
+            urls = urls.splitlines()
+        urls = [str(url).strip() for url in urls if str(url).strip()]
+        if not urls:
+            return jsonify({'error': 'Please provide a list of urls or a sitemap'}), 400
+        if len(urls) > MAX_BATCH_URLS:
+            return jsonify({'error': f"At most {MAX_BATCH_URLS} URLs per batch"}), 413
+
+    options = {
+        'concurrency': _int_param(params, 'concurrency', MAX_BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY),
+        'per_host': _int_param(params, 'per_host', DEFAULT_PER_HOST, MAX_BATCH_PER_HOST),
+        'industry': str(params.get('industry') or '').strip() or None,
+        'incremental': _flag(params.get('incremental')),
+        'record_history': True,
+        'respect_robots': not _flag(params.get('ignore_robots')),
+    }
+    include_text = _flag(params.get('include_text'))
+
+    if not _batch_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many batches running, please try again shortly'}), 503
+
+    source = f"the pages of {sitemap}" if sitemap else f"{len(urls)} URLs"
+    print(f"📦 Batch of {source} (concurrency {options['concurrency']}, per host {options['per_host']})")
+
+    results = iter_bulk(urls, **options)
+
+    def stream():
+        for result in results:
+            yield result_to_json(result, include_text=include_text) + '\n'
+
+    response = Response(stream(), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the stream ends or the client goes away; stops the pipeline
+    response.call_on_close(results.close)
+    response.call_on_close(_batch_slots.release)
+    return response
+
+def _float_param(name):
     try:
-        # Get form data
-        industry = request.form.get('industry', '').strip()
-        website_url = request.form.get('website_url', '').strip()
-        
-        # Validate inputs
-        if not industry or not website_url:
-            return render_template('results.html', 
-                                 error="Please provide both industry and website URL")
-        
-        print(f"\n{'='*60}")
-        print(f"🚀 STARTING ENHANCED SEO ANALYSIS")
-        print(f"{'='*60}")
-        print(f"Industry: {industry}")
-        print(f"Website: {website_url}")
-        print(f"{'='*60}\n")
-        
-        # Step 1: Scrape the website (enhanced with more data)
-        print("📡 Step 1: Scraping website with enhanced crawler...")
-        seo_data = scrape_website(website_url)
-        
-        if 'error' in seo_data:
-            return render_template('results.html', 
-                                 error=seo_data['error'])
-        
-        print(f"✅ Scraping complete - extracted {len(seo_data)} data points\n")
-        
-        # Step 2: Analyze SEO (enhanced scoring system)
-        print("📊 Step 2: Analyzing SEO with comprehensive scoring...")
-        analysis = analyze_seo(seo_data)
-        
-        print(f"✅ Analysis complete!")
-        print(f"   Overall Score: {analysis['score']}/100")
-        print(f"   Meta Tags: {analysis['category_scores']['meta_tags']}/30")
-        print(f"   Content: {analysis['category_scores']['content']}/35")
-        print(f"   Technical: {analysis['category_scores']['technical']}/25")
-        print(f"   Social: {analysis['category_scores']['social']}/10\n")
-        
-        # Step 3: Get AI suggestions if score is low
-        suggestions = None
-        if analysis['score'] < 70:
-            print(f"🤖 Step 3: Score is {analysis['score']}/100 - Getting enhanced AI suggestions...")
-            suggestions = get_seo_suggestions(industry, seo_data, analysis['issues'])
-            
-            if suggestions:
-                print(f"✅ AI Suggestions generated:")
-                print(f"   - Optimized Title: {suggestions['optimized_title'][:50]}...")
-                print(f"   - Optimized Meta Desc: {suggestions['optimized_meta_description'][:50]}...")
-                print(f"   - Content Outline: {len(suggestions['content_outline'])} sections")
-                print(f"   - Keywords: {len(suggestions['keywords'])} keywords")
-                print(f"   - Blog Topics: {len(suggestions['blog_topics'])} topics")
-        else:
-            print(f"✅ Score is {analysis['score']}/100 - Great! No AI suggestions needed.")
-        
-        print(f"\n{'='*60}")
-        print("✅ ANALYSIS COMPLETE!")
-        print(f"{'='*60}\n")
-        
-        # Render results page with enhanced data
-        return render_template('results.html',
-                             industry=industry,
-                             url=website_url,
-                             score=analysis['score'],
-                             issues=analysis['issues'],
-                             strengths=analysis['strengths'],
-                             analysis=analysis,  # Pass full analysis object
-                             seo_data=seo_data,
-                             suggestions=suggestions)
-    
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return render_template('results.html', 
-                             error=f"An error occurred: {str(e)}")
+        return float(request.args[name])
+    except (KeyError, ValueError):
+        return None
+
+def _history_or_404():
+    store = get_history_store()
+    if store is None:
+        return None, (jsonify({'error': 'Analysis history is disabled'}), 404)
+    return store, None
+
+@app.route('/api/history')
+def api_history():
+    """
+    Score over time for one URL (?url=...), oldest first. Optional since
+    and until (Unix timestamps) and limit (latest N snapshots).
+    """
+    store, error = _history_or_404()
+    if error:
+        return error
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({'error': 'Please provide a url'}), 400
+    limit = request.args.get('limit', type=int)
+    return jsonify({'url': url, 'history': store.score_history(
+        url, since=_float_param('since'), until=_float_param('until'), limit=limit)})
+
+@app.route('/api/history/domain/<domain>')
+def api_domain_history(domain):
+    """
+    Domain-level aggregates, a score trend (?bucket=seconds, a day by
+    default) and the latest snapshot of its lowest scoring pages.
+    """
+    store, error = _history_or_404()
+    if error:
+        return error
+    since, until = _float_param('since'), _float_param('until')
+    return jsonify({
+        'summary': store.domain_summary(domain, since=since, until=until),
+        'trend': store.domain_trend(domain, bucket=request.args.get('bucket', 86400, type=int),
+                                    since=since, until=until),
+        'pages': store.domain_pages(domain, limit=request.args.get('pages', 100, type=int)),
+    })
+
+@app.route('/api/history/snapshots/<int:snapshot_id>')
+def api_snapshot(snapshot_id):
+    """One stored analysis in full (?include_text=1 adds the page text)"""
+    store, error = _history_or_404()
+    if error:
+        return error
+    snapshot = store.get_snapshot(snapshot_id, include_text=_flag(request.args.get('include_text')))
+    if snapshot is None:
+        return jsonify({'error': 'Unknown snapshot'}), 404
+    return jsonify(snapshot)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics (only when started with SEO_METRICS=1)"""
+    if not metrics.ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -102,4 +327,4 @@ if __name__ == '__main__':
     print("="*60)
     print("📍 Open your browser and go to: http://localhost:5000")
     print("="*60 + "\n")
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000, threaded=True)
\ No newline at end of file
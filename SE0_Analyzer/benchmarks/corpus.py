@@ -0,0 +1,187 @@
+"""
+Benchmark corpus: realistic pages generated on the fly
+
+The pages are built from a fixed seed, so every run (and every machine)
+benchmarks exactly the same bytes without a multi-megabyte corpus in the
+repository:
+
+    tiny       - a bare page with a title and a description (under 1 KB)
+    typical    - a blog article with full meta/Open Graph/Twitter tags,
+                 navigation, headings, images and links (~55 KB)
+    spa        - a single-page-app shell: a small pre-rendered DOM, a 4.5 MB
+                 inline script bundle and a JSON state blob (~5 MB)
+    deep       - a document nested thousands of elements deep
+    malformed  - unclosed and misnested tags, stray end tags, broken
+                 attributes and entities, repeated a few hundred times
+
+Usage (from the SE0_Analyzer directory), to save the pages for other tools:
+    python -m benchmarks.corpus out_dir
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+SEED = 20240601
+
+WORDS = (
+    'search engine optimisation content ranking page title description keyword audience '
+    'crawl index link structure mobile speed performance image schema social share '
+    'article guide product service local business review customer website traffic '
+    'strategy analysis report growth conversion quality signal authority'
+).split()
+
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _paragraph(rng, sentences=5):
+    return ' '.join(_sentence(rng, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def tiny_page(rng):
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<title>Tiny benchmark page</title>'
+        '<meta name="description" content="A very small page used to measure fixed per-page costs.">'
+        '</head><body><h1>Tiny page</h1>'
+        f'<p>{_paragraph(rng, 3)}</p>'
+        '<a href="/about">About</a></body></html>'
+    )
+
+
+def typical_page(rng):
+    head = (
+        '<!DOCTYPE html><html lang="en-GB"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<title>How to audit the SEO of a small business website in 2024</title>'
+        '<meta name="description" content="A step-by-step guide to auditing titles, descriptions, '
+        'headings, links and performance of a small business website, with a checklist.">'
+        '<meta name="robots" content="index, follow">'
+        '<link rel="canonical" href="https://example.com/blog/seo-audit-guide">'
+        '<link rel="icon" href="/favicon.ico">'
+        '<meta property="og:title" content="How to audit the SEO of a small business website">'
+        '<meta property="og:description" content="A step-by-step audit guide with a checklist.">'
+        '<meta property="og:image" content="https://example.com/img/audit.png">'
+        '<meta property="og:type" content="article">'
+        '<meta name="twitter:card" content="summary_large_image">'
+        '<meta name="twitter:title" content="SEO audit guide">'
+        '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Article"}</script>'
+        + ''.join(f'<link rel="stylesheet" href="/css/{i}.css">' for i in range(6)) +
+        '<style>' + 'body{margin:0}.nav a{padding:4px}' * 600 + '</style>'
+        '</head><body>'
+    )
+    nav = '<header><nav class="nav">' + ''.join(
+        f'<a href="/section/{i}">Section {i}</a>' for i in range(40)) + '</nav></header>'
+
+    article = ['<main><article><h1>How to audit the SEO of a small business website</h1>']
+    for section in range(6):
+        article.append(f'<h2>{_sentence(rng, 6)}</h2>')
+        for _ in range(8):
+            article.append(f'<p>{_paragraph(rng)} <a href="/blog/post-{rng.randint(1, 500)}">'
+                           f'{rng.choice(WORDS)}</a></p>')
+        for image in range(3):
+            alt = f' alt="{_sentence(rng, 5)}"' if rng.random() < 0.7 else ''
+            article.append(f'<img src="/img/{section}-{image}.jpg"{alt} width="800" height="450">')
+        article.append(f'<h3>{_sentence(rng, 4)}</h3><ul>' +
+                       ''.join(f'<li>{_sentence(rng, 8)}</li>' for _ in range(6)) + '</ul>')
+        article.append(f'<p>See <a href="https://external-{section}.example.org/ref">this reference</a>.</p>')
+    article.append('</article></main>')
+
+    footer = '<footer>' + ''.join(
+        f'<a href="https://partner{i}.example.net/">Partner {i}</a>' for i in range(15)) + '</footer>'
+    scripts = ''.join(f'<script src="/js/{i}.js" defer></script>' for i in range(8))
+    return head + nav + ''.join(article) + footer + scripts + '</body></html>'
+
+
+def spa_page(rng, bundle_bytes=4500 * 1024, state_bytes=500 * 1024):
+    shell = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<title>Dashboard | Example App</title>'
+        '<meta name="description" content="Example single page application with a large inline bundle.">'
+        '</head><body><div id="root"><h1>Dashboard</h1>'
+        f'<p>{_paragraph(rng, 2)}</p></div>'
+    )
+    chunk = ('function m%d(e,t){var n=e.map(function(r){return r*t+%d});'
+             'return n.filter(function(x){return x>%d}).length}\n')
+    bundle = []
+    size = 0
+    i = 0
+    while size < bundle_bytes:
+        line = chunk % (i, i % 97, i % 13)
+        bundle.append(line)
+        size += len(line)
+        i += 1
+
+    items = []
+    size = 0
+    while size < state_bytes:
+        item = {'id': len(items), 'name': _sentence(rng, 4), 'tags': rng.sample(WORDS, 3), 'score': rng.random()}
+        items.append(item)
+        size += len(json.dumps(item))
+    state = json.dumps({'items': items}).replace('</', '<\\/')
+
+    return (shell + '<script>' + ''.join(bundle) + '</script>'
+            '<script id="__STATE__" type="application/json">' + state + '</script></body></html>')
+
+
+def deep_page(rng, depth=3000):
+    return (
+        '<!DOCTYPE html><html lang="en"><head><title>Deeply nested page</title></head><body>'
+        '<h1>Deeply nested</h1>' + '<div class="wrap"><section>' * (depth // 2) +
+        f'<p>{_paragraph(rng, 4)}</p><a href="/inner">inner</a>' +
+        '</section></div>' * (depth // 2) + '</body></html>'
+    )
+
+
+def malformed_page(rng, repeats=300):
+    block = (
+        '<div class=card><p>{text}<p>{more}<b><i>bold italic</b></i>'
+        '<img src=/x.png alt=unquoted value><a href="/broken?a=1&b=2&c">link</a>'
+        '</span></div></div><table><tr><td>cell<td>cell &copy &nbsp; &#xZZ;</table>'
+        '<h2>heading<h3>unclosed</h2>'
+    )
+    body = ''.join(block.format(text=_sentence(rng), more=_sentence(rng)) for _ in range(repeats))
+    return ('<html><head><title>Malformed<meta name="description" content="broken "quotes">'
+            '<body>' + body + '<p>trailing')
+
+
+GENERATORS = {
+    'tiny': tiny_page,
+    'typical': typical_page,
+    'spa': spa_page,
+    'deep': deep_page,
+    'malformed': malformed_page,
+}
+
+
+def build_corpus(names=None, seed=SEED):
+    """{page name: HTML bytes} for the requested pages (all by default)"""
+    corpus = {}
+    for name in names or GENERATORS:
+        if name not in GENERATORS:
+            raise ValueError(f"Unknown corpus page '{name}' (choose from {', '.join(GENERATORS)})")
+        corpus[name] = GENERATORS[name](random.Random(f"{seed}:{name}")).encode('utf-8')
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out_dir', help='directory to write the pages to')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, content in build_corpus().items():
+        path = os.path.join(args.out_dir, f"{name}.html")
+        with open(path, 'wb') as f:
+            f.write(content)
+        print(f"📄 {path} ({len(content) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
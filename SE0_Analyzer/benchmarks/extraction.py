@@ -0,0 +1,315 @@
+"""
+Extraction benchmark: single-pass engine vs. the original multi-pass checks
+
+Usage (from the SE0_Analyzer directory):
+    python -m benchmarks.extraction path/to/saved/pages [--repeat N]
+
+Every *.html / *.htm file under the corpus directory is parsed once per run
+and extracted with both implementations. The outputs are compared field by
+field, so the benchmark doubles as a parity check.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import urlparse, urljoin
+
+from bs4 import BeautifulSoup
+
+from extractor import extract_seo_data, new_seo_data
+
+
+def legacy_extract(soup, url, status_code=200, load_time=0.0, page_size_kb=0.0):
+    """
+    Reference implementation: the section-by-section extraction that
+    scrape_website used before the single-pass engine. Mutates the soup.
+    """
+    seo_data = new_seo_data(url, status_code, load_time, page_size_kb)
+
+    # ========================================
+    # 1. BASIC META TAGS
+    # ========================================
+
+    # Title Tag
+    title_tag = soup.find('title')
+    if title_tag:
+        seo_data['title'] = title_tag.get_text().strip()
+        seo_data['title_length'] = len(seo_data['title'])
+
+    # Meta Description
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc and meta_desc.get('content'):
+        seo_data['meta_description'] = meta_desc.get('content', '').strip()
+        seo_data['meta_description_length'] = len(seo_data['meta_description'])
+
+    # Meta Keywords (legacy but still checked)
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if meta_keywords:
+        seo_data['meta_keywords'] = meta_keywords.get('content', '').strip()
+
+    # Canonical URL
+    canonical = soup.find('link', attrs={'rel': 'canonical'})
+    if canonical:
+        seo_data['canonical_url'] = canonical.get('href', '').strip()
+
+    # Meta Robots
+    meta_robots = soup.find('meta', attrs={'name': 'robots'})
+    if meta_robots:
+        seo_data['meta_robots'] = meta_robots.get('content', '').strip()
+
+    # ========================================
+    # 2. OPEN GRAPH TAGS
+    # ========================================
+
+    og_title = soup.find('meta', property='og:title')
+    if og_title:
+        seo_data['og_title'] = og_title.get('content', '').strip()
+
+    og_desc = soup.find('meta', property='og:description')
+    if og_desc:
+        seo_data['og_description'] = og_desc.get('content', '').strip()
+
+    og_image = soup.find('meta', property='og:image')
+    if og_image:
+        seo_data['og_image'] = og_image.get('content', '').strip()
+
+    og_type = soup.find('meta', property='og:type')
+    if og_type:
+        seo_data['og_type'] = og_type.get('content', '').strip()
+
+    # ========================================
+    # 3. TWITTER CARDS
+    # ========================================
+
+    twitter_card = soup.find('meta', attrs={'name': 'twitter:card'})
+    if twitter_card:
+        seo_data['twitter_card'] = twitter_card.get('content', '').strip()
+
+    twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
+    if twitter_title:
+        seo_data['twitter_title'] = twitter_title.get('content', '').strip()
+
+    twitter_desc = soup.find('meta', attrs={'name': 'twitter:description'})
+    if twitter_desc:
+        seo_data['twitter_description'] = twitter_desc.get('content', '').strip()
+
+    # ========================================
+    # 4. HEADING STRUCTURE
+    # ========================================
+
+    # H1 Tags
+    h1_tags = soup.find_all('h1')
+    seo_data['h1_tags'] = [h1.get_text().strip() for h1 in h1_tags if h1.get_text().strip()]
+
+    # H2 Tags
+    h2_tags = soup.find_all('h2')
+    seo_data['h2_tags'] = [h2.get_text().strip() for h2 in h2_tags if h2.get_text().strip()][:10]
+
+    # H3 Tags
+    h3_tags = soup.find_all('h3')
+    seo_data['h3_tags'] = [h3.get_text().strip() for h3 in h3_tags if h3.get_text().strip()][:10]
+
+    # H4 Tags
+    h4_tags = soup.find_all('h4')
+    seo_data['h4_tags'] = [h4.get_text().strip() for h4 in h4_tags if h4.get_text().strip()][:5]
+
+    # ========================================
+    # 5. IMAGES ANALYSIS
+    # ========================================
+
+    images = soup.find_all('img')
+    seo_data['images'] = len(images)
+
+    for img in images:
+        alt_text = img.get('alt', '').strip()
+        if alt_text:
+            seo_data['images_with_alt'] += 1
+        else:
+            seo_data['images_without_alt'] += 1
+
+    # ========================================
+    # 6. LINKS ANALYSIS
+    # ========================================
+
+    domain = urlparse(url).netloc
+    links = soup.find_all('a', href=True)
+
+    for link in links:
+        href = link['href'].strip()
+
+        # Skip empty, anchor, javascript, and mailto links
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+
+        # Convert relative URLs to absolute
+        absolute_url = urljoin(url, href)
+        link_domain = urlparse(absolute_url).netloc
+
+        # Classify as internal or external
+        if domain in link_domain or link_domain in domain:
+            seo_data['internal_links'] += 1
+        else:
+            seo_data['external_links'] += 1
+
+    # ========================================
+    # 7. CONTENT ANALYSIS
+    # ========================================
+
+    # Remove script and style elements
+    for script in soup(['script', 'style', 'nav', 'footer', 'header']):
+        script.decompose()
+
+    # Get text content
+    text_content = soup.get_text()
+    lines = (line.strip() for line in text_content.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    seo_data['text_content'] = text[:3000]  # First 3000 chars for LLM
+    seo_data['word_count'] = len(text.split())
+
+    # Count paragraphs
+    paragraphs = soup.find_all('p')
+    seo_data['paragraph_count'] = len([p for p in paragraphs if p.get_text().strip()])
+
+    # ========================================
+    # 8. TECHNICAL SEO
+    # ========================================
+
+    # Viewport meta tag
+    viewport = soup.find('meta', attrs={'name': 'viewport'})
+    seo_data['has_viewport'] = viewport is not None
+
+    # Favicon
+    favicon = soup.find('link', rel=lambda x: x and 'icon' in x.lower())
+    seo_data['has_favicon'] = favicon is not None
+
+    # Language declaration
+    html_tag = soup.find('html')
+    if html_tag and html_tag.get('lang'):
+        seo_data['has_language'] = True
+        seo_data['language'] = html_tag.get('lang')
+
+    # Charset
+    charset = soup.find('meta', attrs={'charset': True})
+    if not charset:
+        charset = soup.find('meta', attrs={'http-equiv': 'Content-Type'})
+    seo_data['has_charset'] = charset is not None
+
+    # ========================================
+    # 9. STRUCTURED DATA (Schema.org)
+    # ========================================
+
+    # Look for JSON-LD
+    json_ld_scripts = soup.find_all('script', type='application/ld+json')
+    if json_ld_scripts:
+        seo_data['has_schema'] = True
+        for script in json_ld_scripts[:3]:  # Check first 3
+            try:
+                data = json.loads(script.string)
+                if '@type' in data:
+                    seo_data['schema_types'].append(data['@type'])
+                elif isinstance(data, list):
+                    for item in data:
+                        if '@type' in item:
+                            seo_data['schema_types'].append(item['@type'])
+            except Exception:
+                pass
+
+    # Look for Microdata
+    if not seo_data['has_schema']:
+        microdata = soup.find_all(attrs={'itemtype': True})
+        if microdata:
+            seo_data['has_schema'] = True
+    return seo_data
+
+
+def load_corpus(corpus_dir):
+    """Return (name, raw bytes) for every saved page in the corpus directory"""
+    pages = []
+    for root, _, files in os.walk(corpus_dir):
+        for filename in sorted(files):
+            if filename.lower().endswith(('.html', '.htm')):
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    pages.append((os.path.relpath(path, corpus_dir), f.read()))
+    return pages
+
+
+def diff_fields(expected, actual):
+    """Return the seo_data keys whose values differ"""
+    keys = set(expected) | set(actual)
+    return sorted(k for k in keys if expected.get(k) != actual.get(k))
+
+
+def time_extractor(extract, raw, url, repeat, parser='html.parser'):
+    """Best-of-N extraction time in seconds, excluding parse time"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        soup = BeautifulSoup(raw, parser)
+        start = time.perf_counter()
+        result = extract(soup, url, page_size_kb=len(raw) / 1024)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(corpus_dir, repeat=3, url='https://example.com/'):
+    """Benchmark both extractors over the corpus and print a report"""
+    pages = load_corpus(corpus_dir)
+    if not pages:
+        print(f"❌ No .html files found in {corpus_dir}")
+        return None
+
+    rows = []
+    mismatches = 0
+    for name, raw in pages:
+        legacy_time, legacy_data = time_extractor(legacy_extract, raw, url, repeat)
+        single_time, single_data = time_extractor(extract_seo_data, raw, url, repeat)
+        diff = diff_fields(legacy_data, single_data)
+        if diff:
+            mismatches += 1
+        rows.append({
+            'page': name,
+            'size_kb': round(len(raw) / 1024, 1),
+            'legacy_ms': round(legacy_time * 1000, 2),
+            'single_pass_ms': round(single_time * 1000, 2),
+            'speedup': round(legacy_time / single_time, 2) if single_time else None,
+            'mismatched_fields': diff,
+        })
+
+    print(f"{'page':40} {'KB':>8} {'legacy ms':>10} {'1-pass ms':>10} {'speedup':>8}")
+    for row in rows:
+        flag = '' if not row['mismatched_fields'] else '  ❌ ' + ', '.join(row['mismatched_fields'])
+        print(f"{row['page'][:40]:40} {row['size_kb']:>8} {row['legacy_ms']:>10} "
+              f"{row['single_pass_ms']:>10} {row['speedup']:>7}x{flag}")
+
+    total_legacy = sum(r['legacy_ms'] for r in rows)
+    total_single = sum(r['single_pass_ms'] for r in rows)
+    print(f"\nTotal: {total_legacy:.1f} ms -> {total_single:.1f} ms "
+          f"({total_legacy / total_single:.2f}x faster), "
+          f"{mismatches} page(s) with output differences")
+    return {'pages': rows, 'mismatches': mismatches}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('corpus', help='directory of saved HTML pages')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per page (best is kept)')
+    parser.add_argument('--url', default='https://example.com/', help='URL the pages are treated as')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    report = run(args.corpus, args.repeat, args.url)
+    if report is None:
+        return 1
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
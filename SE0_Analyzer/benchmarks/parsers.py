@@ -0,0 +1,79 @@
+"""
+Parser backend parity check and benchmark
+
+Usage (from the SE0_Analyzer directory):
+    python -m benchmarks.parsers path/to/saved/pages [--repeat N]
+
+Every saved page is parsed and extracted with each available backend. Any
+seo_data field that differs from the html.parser reference is reported and
+the exit status is non-zero, so this can gate a backend switch in CI.
+"""
+import argparse
+import sys
+import time
+
+from extractor import extract_seo_data
+from parsers import PARSER_BACKENDS, available_backends, check_parity
+from benchmarks.extraction import load_corpus
+
+
+def time_backend(name, raw, url, repeat):
+    """Best-of-N parse + extract time in seconds for one backend"""
+    backend = PARSER_BACKENDS[name]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_seo_data(backend.parse(raw), url, page_size_kb=len(raw) / 1024)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(corpus_dir, repeat=3, url='https://example.com/'):
+    """Check parity and time every backend over the corpus"""
+    pages = load_corpus(corpus_dir)
+    if not pages:
+        print(f"❌ No .html files found in {corpus_dir}")
+        return None
+
+    names = available_backends()
+    totals = {name: 0.0 for name in names}
+    drift = {}
+
+    print(f"{'page':40} " + ' '.join(f"{name + ' ms':>14}" for name in names))
+    for page, raw in pages:
+        timings = {name: time_backend(name, raw, url, repeat) for name in names}
+        for name, elapsed in timings.items():
+            totals[name] += elapsed
+        print(f"{page[:40]:40} " + ' '.join(f"{timings[name] * 1000:>14.2f}" for name in names))
+
+        for name, fields in check_parity(raw, url, names).items():
+            if fields:
+                drift.setdefault(page, {})[name] = fields
+
+    print("\nTotal: " + ', '.join(f"{name} {totals[name] * 1000:.1f} ms" for name in names))
+    if drift:
+        print(f"\n❌ {len(drift)} page(s) differ from the html.parser reference:")
+        for page, by_backend in drift.items():
+            for name, fields in by_backend.items():
+                print(f"   - {page} [{name}]: {', '.join(fields)}")
+    else:
+        print("✅ All backends produce identical seo_data on every page")
+    return {'totals': totals, 'drift': drift}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('corpus', help='directory of saved HTML pages')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per page (best is kept)')
+    parser.add_argument('--url', default='https://example.com/', help='URL the pages are treated as')
+    args = parser.parse_args(argv)
+
+    report = run(args.corpus, args.repeat, args.url)
+    if report is None or report['drift']:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+Scoring benchmark: one analyze_seo call per page vs. columnar batch scoring
+
+Usage (from the SE0_Analyzer directory):
+    python -m benchmarks.scoring [--pages N] [--profile NAME] [--seed S]
+
+Synthetic seo_data records covering every threshold of the default rules
+are scored per page and in columns (numbers only, and with messages). The
+columnar results are checked against the per-page ones. legacy_analyze_seo
+is the hand-written scorer the default rules reproduce (see
+tests/test_rules.py).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from analyzer import analyze_columns, analyze_seo, get_profile
+from extractor import new_seo_data
+from rules import to_columns
+
+
+def random_seo_data(rng):
+    """One synthetic seo_data record"""
+    d = new_seo_data(rng.choice(['https://example.com/', 'http://example.org/']), 200,
+                     rng.choice([0.3, 2.0, 3.5, 6.0]), rng.choice([45.0, 500.0, 800.0, 2048.0]))
+    d['title'] = rng.choice([None, 'Example page title'])
+    d['title_length'] = len(d['title'] or '') + rng.choice([0, 15, 45])
+    d['meta_description'] = rng.choice([None, 'A description'])
+    d['meta_description_length'] = rng.choice([0, 90, 130, 175])
+    d['canonical_url'] = rng.choice([None, d['url']])
+    d['meta_robots'] = rng.choice([None, 'index,follow', 'noindex'])
+    d['h1_tags'] = ['Heading'] * rng.choice([0, 1, 2])
+    d['h2_tags'] = ['Section'] * rng.choice([0, 1, 4])
+    d['word_count'] = rng.choice([120, 400, 800, 1500])
+    d['internal_links'] = rng.choice([0, 3, 12])
+    d['external_links'] = rng.choice([0, 4])
+    if rng.random() < 0.3:
+        d['links_checked'] = 10
+        d['broken_links'] = rng.choice([0, 1, 4])
+    d['has_viewport'] = rng.random() < 0.8
+    d['has_favicon'] = rng.random() < 0.7
+    d['has_language'] = rng.random() < 0.6
+    d['language'] = 'en' if d['has_language'] else None
+    d['has_schema'] = rng.random() < 0.4
+    d['schema_types'] = ['Organization', 'WebPage'] if d['has_schema'] else []
+    d['images'] = rng.choice([0, 5, 20])
+    d['images_without_alt'] = rng.randint(0, d['images'])
+    d['og_title'], d['og_description'], d['og_image'] = [rng.choice([None, 'x']) for _ in range(3)]
+    d['twitter_card'] = rng.choice([None, 'summary_large_image'])
+    return d
+
+
+def legacy_analyze_seo(seo_data):
+    """
+    The hand-written scorer the declarative default rules replaced, kept as
+    the reference they must reproduce exactly
+    """
+
+    if 'error' in seo_data:
+        return {
+            'score': 0,
+            'issues': [seo_data['error']],
+            'strengths': [],
+            'category_scores': {}
+        }
+
+    score = 0
+    issues = []
+    strengths = []
+    category_scores = {
+        'meta_tags': 0,
+        'content': 0,
+        'technical': 0,
+        'social': 0
+    }
+
+    # ========================================
+    # CATEGORY 1: META TAGS (30 points)
+    # ========================================
+
+    meta_score = 0
+
+    # 1.1 Title Tag (10 points)
+    if seo_data['title']:
+        title_len = seo_data['title_length']
+        if 30 <= title_len <= 60:
+            meta_score += 10
+            strengths.append("✅ Title tag length is optimal (30-60 characters)")
+        elif 20 <= title_len <= 70:
+            meta_score += 6
+            issues.append(f"⚠️ Title tag length is {title_len} chars (optimal: 30-60)")
+        elif title_len > 0:
+            meta_score += 3
+            issues.append(f"❌ Title tag length is {title_len} chars (needs improvement)")
+        else:
+            issues.append("❌ Title tag is empty")
+    else:
+        issues.append("❌ Missing title tag (critical SEO issue)")
+
+    # 1.2 Meta Description (10 points)
+    if seo_data['meta_description']:
+        desc_len = seo_data['meta_description_length']
+        if 120 <= desc_len <= 160:
+            meta_score += 10
+            strengths.append("✅ Meta description length is optimal (120-160 characters)")
+        elif 100 <= desc_len <= 180:
+            meta_score += 6
+            issues.append(f"⚠️ Meta description is {desc_len} chars (optimal: 120-160)")
+        elif desc_len > 0:
+            meta_score += 3
+            issues.append(f"❌ Meta description is {desc_len} chars (needs improvement)")
+        else:
+            issues.append("❌ Meta description is empty")
+    else:
+        issues.append("❌ Missing meta description (important for click-through rate)")
+
+    # 1.3 Canonical URL (5 points)
+    if seo_data['canonical_url']:
+        meta_score += 5
+        strengths.append("✅ Canonical URL is set (prevents duplicate content)")
+    else:
+        issues.append("⚠️ No canonical URL found (recommended for SEO)")
+
+    # 1.4 Meta Robots (5 points)
+    if seo_data['meta_robots']:
+        meta_score += 5
+        if 'noindex' in seo_data['meta_robots'].lower():
+            issues.append("⚠️ Page is set to NOINDEX (won't appear in search results)")
+        else:
+            strengths.append("✅ Meta robots tag configured properly")
+    else:
+        meta_score += 2
+        issues.append("⚠️ No meta robots tag (not critical but recommended)")
+
+    category_scores['meta_tags'] = meta_score
+    score += meta_score
+
+    # ========================================
+    # CATEGORY 2: CONTENT STRUCTURE (35 points)
+    # ========================================
+
+    content_score = 0
+
+    # 2.1 H1 Tags (12 points)
+    h1_count = len(seo_data['h1_tags'])
+    if h1_count == 1:
+        content_score += 12
+        strengths.append("✅ Perfect! One H1 tag found")
+    elif h1_count == 0:
+        issues.append("❌ No H1 tag found (critical for SEO and accessibility)")
+    else:
+        content_score += 6
+        issues.append(f"⚠️ Multiple H1 tags found ({h1_count}). Should have only 1")
+
+    # 2.2 H2 Tags (8 points)
+    h2_count = len(seo_data['h2_tags'])
+    if h2_count >= 3:
+        content_score += 8
+        strengths.append(f"✅ Good content structure with {h2_count} H2 tags")
+    elif h2_count >= 1:
+        content_score += 4
+        issues.append(f"⚠️ Only {h2_count} H2 tag(s). Add more for better structure")
+    else:
+        issues.append("❌ No H2 tags found. Add subheadings for better structure")
+
+    # 2.3 Word Count (10 points)
+    word_count = seo_data['word_count']
+    if word_count >= 1000:
+        content_score += 10
+        strengths.append(f"✅ Good content length ({word_count} words)")
+    elif word_count >= 500:
+        content_score += 6
+        issues.append(f"⚠️ Content is {word_count} words (aim for 1000+ for better SEO)")
+    elif word_count >= 300:
+        content_score += 3
+        issues.append(f"⚠️ Content is short ({word_count} words). Add more valuable content")
+    else:
+        issues.append(f"❌ Very little content ({word_count} words). Search engines prefer comprehensive content")
+
+    # 2.4 Internal Links (5 points)
+    if seo_data['internal_links'] >= 5:
+        content_score += 5
+        strengths.append(f"✅ Good internal linking ({seo_data['internal_links']} links)")
+    elif seo_data['internal_links'] >= 2:
+        content_score += 3
+        issues.append(f"⚠️ Only {seo_data['internal_links']} internal links. Add more for better SEO")
+    else:
+        issues.append("❌ Very few internal links. Add more to improve site navigation")
+
+    # 2.5 Broken Links (up to -3 points, only when links were checked)
+    if seo_data.get('links_checked'):
+        broken = seo_data['broken_links']
+        if broken == 0:
+            strengths.append(f"✅ No broken links found ({seo_data['links_checked']} links checked)")
+        else:
+            content_score = max(0, content_score - min(broken, 3))
+            issues.append(f"❌ {broken} broken link(s) found. Fix or remove them")
+
+    category_scores['content'] = content_score
+    score += content_score
+
+    # ========================================
+    # CATEGORY 3: TECHNICAL SEO (25 points)
+    # ========================================
+
+    technical_score = 0
+
+    # 3.1 HTTPS (5 points)
+    if seo_data['has_https']:
+        technical_score += 5
+        strengths.append("✅ Website uses HTTPS (secure)")
+    else:
+        issues.append("❌ Website is not using HTTPS (security risk and SEO penalty)")
+
+    # 3.2 Page Load Time (5 points)
+    load_time = seo_data['load_time']
+    if load_time < 2:
+        technical_score += 5
+        strengths.append(f"✅ Fast load time ({load_time}s)")
+    elif load_time < 4:
+        technical_score += 3
+        issues.append(f"⚠️ Load time is {load_time}s (aim for under 2s)")
+    else:
+        issues.append(f"❌ Slow load time ({load_time}s). Optimize for speed")
+
+    # 3.3 Page Size (3 points)
+    page_size = seo_data['page_size_kb']
+    if page_size < 500:
+        technical_score += 3
+        strengths.append(f"✅ Good page size ({page_size:.1f} KB)")
+    elif page_size < 1000:
+        technical_score += 2
+        issues.append(f"⚠️ Page size is {page_size:.1f} KB (try to keep under 500 KB)")
+    else:
+        issues.append(f"❌ Page size is {page_size:.1f} KB (too large, affects loading speed)")
+
+    # 3.4 Mobile Viewport (3 points)
+    if seo_data['has_viewport']:
+        technical_score += 3
+        strengths.append("✅ Mobile viewport meta tag present")
+    else:
+        issues.append("❌ Missing viewport meta tag (critical for mobile SEO)")
+
+    # 3.5 Language Declaration (2 points)
+    if seo_data['has_language']:
+        technical_score += 2
+        strengths.append(f"✅ Language declared ({seo_data['language']})")
+    else:
+        issues.append("⚠️ No language declaration in HTML tag")
+
+    # 3.6 Favicon (2 points)
+    if seo_data['has_favicon']:
+        technical_score += 2
+        strengths.append("✅ Favicon present")
+    else:
+        issues.append("⚠️ No favicon found (improves brand recognition)")
+
+    # 3.7 Structured Data (5 points)
+    if seo_data['has_schema']:
+        technical_score += 5
+        schema_types = ', '.join(seo_data['schema_types'][:3])
+        if schema_types:
+            strengths.append(f"✅ Structured data found ({schema_types})")
+        else:
+            strengths.append("✅ Structured data present")
+    else:
+        issues.append("⚠️ No structured data (Schema.org). Helps search engines understand your content")
+
+    category_scores['technical'] = technical_score
+    score += technical_score
+
+    # ========================================
+    # CATEGORY 4: SOCIAL & IMAGES (10 points)
+    # ========================================
+
+    social_score = 0
+
+    # 4.1 Images Alt Text (5 points)
+    if seo_data['images'] > 0:
+        if seo_data['images_without_alt'] == 0:
+            social_score += 5
+            strengths.append(f"✅ All {seo_data['images']} images have alt text")
+        else:
+            missing_percent = (seo_data['images_without_alt'] / seo_data['images']) * 100
+            if missing_percent < 30:
+                social_score += 3
+                issues.append(f"⚠️ {seo_data['images_without_alt']} out of {seo_data['images']} images missing alt text")
+            else:
+                social_score += 1
+                issues.append(f"❌ {seo_data['images_without_alt']} out of {seo_data['images']} images missing alt text")
+    else:
+        social_score += 2
+        issues.append("⚠️ No images found on the page")
+
+    # 4.2 Open Graph Tags (3 points)
+    og_count = sum([
+        1 for x in [seo_data['og_title'], seo_data['og_description'], seo_data['og_image']]
+        if x
+    ])
+    if og_count >= 3:
+        social_score += 3
+        strengths.append("✅ Complete Open Graph tags for social sharing")
+    elif og_count > 0:
+        social_score += 1
+        issues.append(f"⚠️ Only {og_count}/3 Open Graph tags found (add more for better social sharing)")
+    else:
+        issues.append("⚠️ No Open Graph tags (important for social media previews)")
+
+    # 4.3 Twitter Cards (2 points)
+    if seo_data['twitter_card']:
+        social_score += 2
+        strengths.append("✅ Twitter Card tags present")
+    else:
+        issues.append("⚠️ No Twitter Card tags (helps with Twitter sharing)")
+
+    category_scores['social'] = social_score
+    score += social_score
+
+    # ========================================
+    # ADDITIONAL CHECKS (Not scored but reported)
+    # ========================================
+
+    # External Links
+    if seo_data['external_links'] > 0:
+        strengths.append(f"✅ Has {seo_data['external_links']} external links (good for credibility)")
+    else:
+        issues.append("⚠️ No external links found (linking to authoritative sources helps SEO)")
+
+    # Calculate percentage scores for categories
+    category_percentages = {
+        'meta_tags': round((category_scores['meta_tags'] / 30) * 100),
+        'content': round((category_scores['content'] / 35) * 100),
+        'technical': round((category_scores['technical'] / 25) * 100),
+        'social': round((category_scores['social'] / 10) * 100)
+    }
+
+    return {
+        'score': score,
+        'issues': issues,
+        'strengths': strengths,
+        'category_scores': category_scores,
+        'category_percentages': category_percentages,
+        'seo_data': seo_data
+    }
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run(count=50000, profile=None, seed=1):
+    """Time each scoring mode over `count` synthetic pages and print a report"""
+    rng = random.Random(seed)
+    pages = [random_seo_data(rng) for _ in range(count)]
+    scorer = get_profile(profile)
+
+    per_page_time, analyses = timed(lambda: [analyze_seo(seo_data, scorer) for seo_data in pages])
+    columns = to_columns(pages, scorer.column_evaluator().metrics)
+    timings = {
+        'per_page': per_page_time,
+        'columns_from_dicts': timed(lambda: analyze_columns(pages, scorer))[0],
+        'columns_prebuilt': timed(lambda: scorer.score_columns(columns))[0],
+    }
+    messages_time, scored = timed(lambda: analyze_columns(pages, scorer, messages=True))
+    timings['columns_with_messages'] = messages_time
+
+    mismatches = 0
+    for i, analysis in enumerate(analyses):
+        if (scored['score'][i] != analysis['score']
+                or scored['issues'][i] != analysis['issues']
+                or scored['strengths'][i] != analysis['strengths']
+                or any(values[i] != analysis['category_scores'][category]
+                       for category, values in scored['category_scores'].items())):
+            mismatches += 1
+
+    print(f"{'mode':24} {'seconds':>9} {'us/page':>9} {'speedup':>8}")
+    for mode, seconds in timings.items():
+        print(f"{mode:24} {seconds:>9.3f} {seconds / count * 1e6:>9.2f} {per_page_time / seconds:>7.2f}x")
+    print(f"\n{count} pages, profile '{scorer.name}', {mismatches} page(s) scored differently")
+    return {
+        'pages': count,
+        'profile': scorer.name,
+        'seconds': {mode: round(seconds, 4) for mode, seconds in timings.items()},
+        'mismatches': mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50000, help='number of synthetic pages')
+    parser.add_argument('--profile', help='scoring profile (default rules if not given)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the synthetic pages')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    report = run(args.pages, args.profile, args.seed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
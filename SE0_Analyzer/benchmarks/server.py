@@ -0,0 +1,128 @@
+"""
+Local stand-in for real websites, for benchmarks
+
+Serves a fixed set of pages from memory on 127.0.0.1 and can make the
+connection look like a real one: latency is added before the response
+starts and bandwidth limits pace the body as it is written.
+
+Usage (from the SE0_Analyzer directory), serving the benchmark corpus:
+    python -m benchmarks.server [--port 8800] [--latency-ms 80] [--bandwidth-kbps 2000]
+
+Pages are served at /<name>.html; anything else is a 404.
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bytes written between bandwidth checks
+WRITE_CHUNK = 16 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, delayed ACKs
+    # add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        content = server.pages.get(self.path.split('?', 1)[0].lstrip('/'))
+        if server.latency:
+            time.sleep(server.latency)
+        if content is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if not server.bandwidth:
+            self.wfile.write(content)
+            return
+
+        # Pace the body so that it never runs ahead of the bandwidth limit
+        start = time.perf_counter()
+        sent = 0
+        for offset in range(0, len(content), WRITE_CHUNK):
+            chunk = content[offset:offset + WRITE_CHUNK]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            ahead = sent / server.bandwidth - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkServer:
+    """
+    Threaded HTTP server for {name: bytes} pages, served at /<name>.html.
+    latency is in seconds, bandwidth in bytes per second (None for no limit).
+    Use as a context manager, or call start() and stop().
+    """
+
+    def __init__(self, pages, latency=0.0, bandwidth=None, port=0):
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self._server.daemon_threads = True
+        self._server.pages = {f"{name}.html": content for name, content in pages.items()}
+        self._server.latency = latency
+        self._server.bandwidth = bandwidth
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.port}/{name}.html"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='benchmark-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    from benchmarks.corpus import build_corpus
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8800, help='port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay before each response')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='body speed limit in KB/s (0: none)')
+    args = parser.parse_args(argv)
+
+    bandwidth = args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None
+    server = BenchmarkServer(build_corpus(), args.latency_ms / 1000, bandwidth, args.port)
+    print(f"🌐 Serving the benchmark corpus on http://127.0.0.1:{server.port}/ (Ctrl+C to stop)")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Benchmark suite: per-stage timings and peak memory over the benchmark corpus
+
+Usage (from the SE0_Analyzer directory):
+    python -m benchmarks.suite [--repeat N] [--pages tiny,typical]
+                               [--latency-ms MS] [--bandwidth-kbps KBPS]
+                               [--out results.json] [--baseline baseline.json]
+
+Every page of the generated corpus (see benchmarks.corpus) is served by the
+local stand-in server (benchmarks.server) and taken through the stages of
+an analysis from the web form:
+
+    fetch    fetch_page over HTTP, with the configured latency/bandwidth
+    parse    parse_html with the active parser backend
+    extract  extract_seo_data
+    score    analyze_seo
+    render   results.html rendered by the Flask app
+
+Stage times are the median of the runs; the fastest run is kept as well.
+A stage only counts as slower than the baseline when even its fastest run
+is slower than the baseline's median, so neither a busy machine during the
+runs nor one lucky baseline run fails the comparison. Peak memory is measured in a separate run with tracemalloc
+(Python allocations only, so the timings are not skewed by tracing).
+--out writes the results as JSON; --baseline compares them with an
+earlier --out file and exits with status 1 when a stage got slower (or a
+page hungrier) by more than --tolerance.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import GENERATORS, build_corpus
+from benchmarks.server import BenchmarkServer
+
+STAGES = ('fetch', 'parse', 'extract', 'score', 'render')
+
+# Timed runs per page
+DEFAULT_REPEAT = 9
+# Differences below these are noise, whatever the relative change
+MIN_DELTA_MS = 2.0
+MIN_DELTA_KB = 64
+
+
+def _render_context(url, seo_data, analysis):
+    """The template context analyze_website builds (without AI suggestions)"""
+    return {
+        'industry': 'Benchmark',
+        'url': url,
+        'score': analysis['score'],
+        'issues': analysis['issues'],
+        'strengths': analysis['strengths'],
+        'analysis': analysis,
+        'seo_data': seo_data,
+        'suggestions': None,
+    }
+
+
+class _Stages:
+    """Runs the stages of one page analysis, timing each one"""
+
+    def __init__(self):
+        # Imported here so that loading the modules is not timed as a stage
+        from flask import render_template
+        from app import app
+        from analyzer import analyze_seo
+        from extractor import extract_seo_data
+        from parsers import parse_html
+        from scraper import fetch_page
+
+        self.app = app
+        self.render_template = render_template
+        self.analyze_seo = analyze_seo
+        self.extract_seo_data = extract_seo_data
+        self.parse_html = parse_html
+        self.fetch_page = fetch_page
+
+    def run(self, url):
+        """Analyze one page; returns {stage: seconds}"""
+        timings = {}
+        clock = time.perf_counter
+
+        start = clock()
+        page = self.fetch_page(url, use_cache=False)
+        timings['fetch'] = clock() - start
+
+        start = clock()
+        soup = self.parse_html(page['content'])
+        timings['parse'] = clock() - start
+
+        start = clock()
+        seo_data = self.extract_seo_data(soup, page['url'], status_code=page['status_code'],
+                                         load_time=page['load_time'],
+                                         page_size_kb=page.get('size_bytes', len(page['content'])) / 1024)
+        timings['extract'] = clock() - start
+
+        start = clock()
+        analysis = self.analyze_seo(seo_data)
+        timings['score'] = clock() - start
+
+        start = clock()
+        with self.app.test_request_context():
+            self.render_template('results.html', **_render_context(url, seo_data, analysis))
+        timings['render'] = clock() - start
+        return timings
+
+
+def _peak_memory_kb(stages, url):
+    """Peak traced Python memory of one full page analysis, in KB"""
+    tracemalloc.start()
+    try:
+        stages.run(url)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KB elsewhere
+    return round(rss / 1024) if sys.platform == 'darwin' else rss
+
+
+def run(pages=None, repeat=DEFAULT_REPEAT, latency=0.0, bandwidth=None):
+    """Benchmark the corpus pages and return the results dictionary"""
+    from parsers import get_parser_backend
+
+    corpus = build_corpus(pages)
+    stages = _Stages()
+    results = {
+        'meta': {
+            'created_at': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parser': get_parser_backend().name,
+            'repeat': repeat,
+            'latency_ms': round(latency * 1000, 1),
+            'bandwidth_kbps': round(bandwidth / 1024, 1) if bandwidth else None,
+        },
+        'pages': {},
+    }
+
+    with BenchmarkServer(corpus, latency, bandwidth) as server:
+        for name, content in corpus.items():
+            url = server.url(name)
+            stages.run(url)  # warm-up: connection pool, template cache
+            runs = [stages.run(url) for _ in range(repeat)]
+            results['pages'][name] = {
+                'size_kb': round(len(content) / 1024, 1),
+                'ms': {stage: round(statistics.median(r[stage] for r in runs) * 1000, 3) for stage in STAGES},
+                'ms_min': {stage: round(min(r[stage] for r in runs) * 1000, 3) for stage in STAGES},
+                'peak_memory_kb': _peak_memory_kb(stages, url),
+            }
+
+    results['totals_ms'] = {stage: round(sum(page['ms'][stage] for page in results['pages'].values()), 3)
+                            for stage in STAGES}
+    results['max_rss_kb'] = _max_rss_kb()
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Regressions of results against a baseline: stages whose fastest run is
+    more than `tolerance` (a fraction) above the baseline median, and peak
+    memory more than `tolerance` above the baseline, ignoring tiny absolute
+    differences. Returns a list of messages.
+    """
+    regressions = []
+    for name, page in results['pages'].items():
+        base = baseline.get('pages', {}).get(name)
+        if base is None:
+            continue
+        for stage, best in page['ms_min'].items():
+            old = base.get('ms', {}).get(stage)
+            if old is not None and best > old * (1 + tolerance) and best - old > MIN_DELTA_MS:
+                ms = page['ms'][stage]
+                regressions.append(f"{name} {stage}: {old:.2f} ms -> {ms:.2f} ms (+{(ms / old - 1) * 100:.0f}%, "
+                                   f"fastest run {best:.2f} ms)")
+        old = base.get('peak_memory_kb')
+        new = page['peak_memory_kb']
+        if old and new > old * (1 + tolerance) and new - old > MIN_DELTA_KB:
+            regressions.append(f"{name} peak memory: {old:.0f} KB -> {new:.0f} KB (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'page':10} {'KB':>8} " + ' '.join(f"{stage + ' ms':>11}" for stage in STAGES) + f" {'peak KB':>10}")
+    for name, page in results['pages'].items():
+        print(f"{name:10} {page['size_kb']:>8} " + ' '.join(f"{page['ms'][stage]:>11.2f}" for stage in STAGES) +
+              f" {page['peak_memory_kb']:>10.0f}")
+    print(f"{'total':10} {'':>8} " + ' '.join(f"{results['totals_ms'][stage]:>11.2f}" for stage in STAGES))
+    meta = results['meta']
+    print(f"\nParser: {meta['parser']}, median of {meta['repeat']} run(s), latency {meta['latency_ms']} ms, "
+          f"bandwidth {meta['bandwidth_kbps'] or 'unlimited'} KB/s, max RSS {results['max_rss_kb']} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed runs per page (the median is kept)')
+    parser.add_argument('--pages', help=f"comma-separated subset of: {', '.join(GENERATORS)}")
+    parser.add_argument('--latency-ms', type=float, default=0, help='server delay before each response')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='server speed limit in KB/s (0: none)')
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, as a fraction (default 0.25)')
+    args = parser.parse_args(argv)
+
+    pages = [name.strip() for name in args.pages.split(',') if name.strip()] if args.pages else None
+    bandwidth = args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None
+    results = run(pages, max(1, args.repeat), args.latency_ms / 1000, bandwidth)
+    print_report(results)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('parser', 'latency_ms', 'bandwidth_kbps'):
+            if baseline.get('meta', {}).get(key) != results['meta'][key]:
+                print(f"⚠️ Baseline was recorded with a different {key}: {baseline['meta'].get(key)}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
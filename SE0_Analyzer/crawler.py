@@ -0,0 +1,358 @@
+"""
+Multi-page site crawler
+
+Starts from one URL, follows internal links breadth-first and analyzes every
+page it reaches, up to a depth and page budget. Per-page results are folded
+into a site-level report as they arrive, so memory stays bounded by the
+budget rather than by the size of the site.
+
+Command line (from the SE0_Analyzer directory):
+    python crawler.py example.com --max-pages 500 --max-depth 3 --out report.json
+"""
+import argparse
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+from politeness import HostScheduler, polite_fetch
+from scraper import normalize_url, scheduled_fetch_page
+from urls import canonicalize_url, site_host
+from workers import analyze_page, attach_seo_data, get_worker_pool
+
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_DEPTH = 5
+DEFAULT_CONCURRENCY = 8
+
+# Above this many pages the seen-set switches to a Bloom filter
+BLOOM_THRESHOLD = 20000
+
+# Links to files that are not HTML pages
+NON_HTML_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp',
+    '.pdf', '.zip', '.gz', '.rar', '.7z', '.tar', '.dmg', '.exe',
+    '.mp3', '.mp4', '.avi', '.mov', '.webm', '.wav',
+    '.css', '.js', '.json', '.xml', '.txt', '.csv',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+)
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for the crawl's seen-URLs. Uses about
+    1.2 bytes per expected item at a 1% false-positive rate; a false
+    positive only means an occasional page is skipped.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.bit_count = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / self.capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class SiteReport:
+    """
+    Running aggregate of per-page analyze_seo results. Only counters and a
+    few fixed-size lists are kept, never the pages themselves.
+    """
+
+    def __init__(self, start_url, keep_worst=20):
+        self.start_url = start_url
+        self.keep_worst = keep_worst
+        self.pages = 0
+        self.errors = Counter()
+        self.failed_pages = []  # the first keep_worst (url, error) pairs
+        self.score_total = 0
+        self.category_totals = Counter()
+        self.score_buckets = Counter()
+        self.pages_by_depth = Counter()
+        self.issue_counts = Counter()
+        self.missing = Counter()
+        self.worst_pages = []  # min-heap of (-score, url)
+        self.started = time.time()
+
+    def add_page(self, url, depth, analysis):
+        seo_data = analysis['seo_data']
+        score = analysis['score']
+
+        self.pages += 1
+        self.score_total += score
+        self.category_totals.update(analysis['category_scores'])
+        self.score_buckets[min(score // 10 * 10, 90)] += 1
+        self.pages_by_depth[depth] += 1
+
+        # Group issues that only differ by numbers ("Only 2 H2 tag(s)")
+        for issue in analysis['issues']:
+            self.issue_counts[re.sub(r'\b\d+(\.\d+)?\b', 'N', issue)] += 1
+
+        if not seo_data.get('title'):
+            self.missing['title'] += 1
+        if not seo_data.get('meta_description'):
+            self.missing['meta_description'] += 1
+        if not seo_data.get('h1_tags'):
+            self.missing['h1'] += 1
+        if not seo_data.get('canonical_url'):
+            self.missing['canonical_url'] += 1
+
+        entry = (-score, url)
+        if len(self.worst_pages) < self.keep_worst:
+            heapq.heappush(self.worst_pages, entry)
+        elif entry > self.worst_pages[0]:
+            heapq.heapreplace(self.worst_pages, entry)
+
+    def add_error(self, url, error):
+        error = error.split(':')[0]
+        self.errors[error] += 1
+        if len(self.failed_pages) < self.keep_worst:
+            self.failed_pages.append((url, error))
+
+    def to_dict(self):
+        pages = self.pages or 1
+        return {
+            'start_url': self.start_url,
+            'pages_analyzed': self.pages,
+            'pages_failed': sum(self.errors.values()),
+            'errors': dict(self.errors),
+            'failed_pages': [{'url': url, 'error': error} for url, error in self.failed_pages],
+            'duration_seconds': round(time.time() - self.started, 1),
+            'average_score': round(self.score_total / pages, 1),
+            'average_category_scores': {k: round(v / pages, 1) for k, v in self.category_totals.items()},
+            'score_distribution': {f"{k}-{k + 9 if k < 90 else 100}": v for k, v in sorted(self.score_buckets.items())},
+            'pages_by_depth': dict(sorted(self.pages_by_depth.items())),
+            'pages_missing': dict(self.missing),
+            'top_issues': self.issue_counts.most_common(20),
+            'lowest_scoring_pages': [
+                {'url': url, 'score': -neg_score} for neg_score, url in sorted(self.worst_pages, reverse=True)
+            ],
+        }
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawler over one site.
+
+    max_pages caps the number of pages fetched and max_depth the number of
+    link hops from the start URL. concurrency bounds fetches in flight (all
+    to the same host, so keep it modest); a HostScheduler additionally
+    paces them (rate limit, Crawl-delay, backoff) and, unless
+    respect_robots is False, skips pages disallowed by robots.txt. With
+    workers set, parsing and scoring run on the shared process pool.
+    on_page, if given, is called with (url, depth, analysis) for every
+    analyzed page.
+    """
+
+    def __init__(self, start_url, max_pages=DEFAULT_MAX_PAGES, max_depth=DEFAULT_MAX_DEPTH,
+                 concurrency=DEFAULT_CONCURRENCY, workers=None, on_page=None, respect_robots=True):
+        self.start_url = canonicalize_url(normalize_url(start_url))
+        self.host = site_host(self.start_url)
+        self.max_pages = max(1, max_pages)
+        self.max_depth = max(0, max_depth)
+        self.concurrency = max(1, concurrency)
+        self.workers = workers
+        self.on_page = on_page
+        self.respect_robots = respect_robots
+
+        # The frontier never holds more than the remaining page budget, so
+        # the seen-set is the only structure that grows with the site.
+        if self.max_pages > BLOOM_THRESHOLD:
+            self.seen = BloomFilter(self.max_pages * 20)
+        else:
+            self.seen = set()
+        self.enqueued = 0
+        self.report = SiteReport(self.start_url)
+        # Created by crawl(), around that crawl's fetch thread pool
+        self.scheduler = None
+
+    def is_crawlable(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            return False
+        if site_host(url) != self.host:
+            return False
+        return not parts.path.lower().endswith(NON_HTML_EXTENSIONS)
+
+    def _enqueue(self, frontier, url, depth):
+        """Add a URL to the frontier unless seen or over budget"""
+        if self.enqueued >= self.max_pages:
+            return
+        url = canonicalize_url(url)
+        if url in self.seen or not self.is_crawlable(url):
+            return
+        self.seen.add(url)
+        self.enqueued += 1
+        frontier.put_nowait((url, depth))
+
+    async def crawl(self):
+        """Run the crawl and return the site report dictionary"""
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='seo-crawl')
+        if self.workers:
+            cpu_pool = get_worker_pool(self.workers).executor
+        else:
+            cpu_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='seo-crawl-parse')
+
+        self.scheduler = HostScheduler(per_host=self.concurrency, respect_robots=self.respect_robots,
+                                       executor=io_pool)
+        frontier = asyncio.Queue()
+        self._enqueue(frontier, self.start_url, 0)
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    await self._process(loop, io_pool, cpu_pool, frontier, url, depth)
+                except Exception as e:
+                    # A worker that died here would leave its share of the frontier
+                    # undrained and frontier.join() waiting forever
+                    metrics.error('crawl', e)
+                    self.report.add_error(url, type(e).__name__)
+                finally:
+                    frontier.task_done()
+
+        tasks = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            await frontier.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            io_pool.shutdown(wait=False)
+            if not self.workers:
+                cpu_pool.shutdown(wait=False)
+
+        return self.report.to_dict()
+
+    async def _process(self, loop, io_pool, cpu_pool, frontier, url, depth):
+        rules = await self.scheduler.robots(url)
+        if not rules.allowed(url):
+            self.report.add_error(url, 'RobotsUnreachable' if rules.unreachable else 'BlockedByRobots')
+            return
+        try:
+            page = await polite_fetch(self.scheduler, url, scheduled_fetch_page, io_pool)
+        except requests.exceptions.RequestException as e:
+            metrics.error('fetch', e)
+            self.report.add_error(url, type(e).__name__)
+            return
+
+        # Redirects count as seen too, so the target is not crawled twice
+        final_url = canonicalize_url(page.get('final_url') or url)
+        if final_url != url:
+            if final_url in self.seen or not self.is_crawlable(final_url):
+                return
+            self.seen.add(final_url)
+            page['url'] = final_url
+            # Parse results are cached under the requested URL only
+            page['cached'] = False
+
+        try:
+            seo_data, analysis = await loop.run_in_executor(cpu_pool, analyze_page, page, True)
+        except Exception as e:
+            metrics.error('parse', e)
+            self.report.add_error(url, type(e).__name__)
+            return
+
+        internal_urls = seo_data.pop('internal_urls', [])
+        seo_data.pop('external_urls', None)
+        analysis = attach_seo_data(seo_data, analysis)
+
+        self.report.add_page(page['url'], depth, analysis)
+        if self.on_page is not None:
+            try:
+                self.on_page(page['url'], depth, analysis)
+            except Exception as e:
+                # The page is analyzed and its links still get crawled
+                metrics.error('crawl', e)
+                print(f"⚠️ on_page failed for {page['url']}: {str(e)}")
+
+        if depth < self.max_depth:
+            for link in internal_urls:
+                self._enqueue(frontier, link, depth + 1)
+
+        done = self.report.pages + sum(self.report.errors.values())
+        if done % 50 == 0:
+            print(f"🕷️ Crawled {done} pages ({frontier.qsize()} queued, {self.enqueued}/{self.max_pages} budget used)")
+
+
+def crawl_site(start_url, **options):
+    """Synchronous helper: crawl a site and return its report"""
+    return asyncio.run(SiteCrawler(start_url, **options).crawl())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Crawl a site and report site-wide SEO results')
+    parser.add_argument('url', help='start URL')
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help='page budget')
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH, help='maximum link depth')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='fetches in flight')
+    parser.add_argument('--workers', type=int, help='parse/score in this many worker processes')
+    parser.add_argument('--out', help='write the site report as JSON to this file')
+    parser.add_argument('--pages', help='also stream per-page scores as NDJSON to this file')
+    parser.add_argument('--ignore-robots', action='store_true', help='also crawl pages disallowed by robots.txt')
+    args = parser.parse_args(argv)
+
+    pages_out = open(args.pages, 'w', encoding='utf-8') if args.pages else None
+
+    def on_page(url, depth, analysis):
+        if pages_out is not None:
+            pages_out.write(json.dumps({
+                'url': url,
+                'depth': depth,
+                'score': analysis['score'],
+                'category_scores': analysis['category_scores'],
+                'issues': analysis['issues'],
+            }) + '\n')
+
+    try:
+        report = crawl_site(
+            args.url,
+            max_pages=args.max_pages,
+            max_depth=args.max_depth,
+            concurrency=args.concurrency,
+            workers=args.workers,
+            on_page=on_page,
+            respect_robots=not args.ignore_robots,
+        )
+    finally:
+        if pages_out is not None:
+            pages_out.close()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"✅ Crawled {report['pages_analyzed']} pages, average score {report['average_score']}")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
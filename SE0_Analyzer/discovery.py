@@ -0,0 +1,343 @@
+"""
+URL discovery from robots.txt and XML sitemaps
+
+Finds the pages of a site without crawling it: the Sitemap: lines of its
+robots.txt (or /sitemap.xml when there are none) are followed through any
+sitemap indexes down to the URL sets, and every <url> is yielded as a
+SitemapEntry(url, lastmod) as soon as it is parsed. Sitemaps are streamed
+and parsed incrementally (each element is dropped once read), so memory
+stays flat however many entries a site lists. Gzipped sitemaps, both
+.xml.gz files and gzip Content-Encoding, and plain-text sitemaps (one URL
+per line) are supported.
+
+The entries feed straight into the bulk pipeline, which in incremental
+mode skips the pages whose lastmod is older than their last analysis.
+
+Command line (from the SE0_Analyzer directory):
+    python discovery.py example.com [--limit 1000] [--since 2024-01-01] [--out urls.txt]
+"""
+import argparse
+import calendar
+import functools
+import gzip
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+import metrics
+from env import env_float
+from fetcher import fetch
+from robots import get_robots
+from scraper import normalize_url
+from urls import site_host
+
+# One page listed in a sitemap; lastmod is a Unix timestamp, or None
+SitemapEntry = namedtuple('SitemapEntry', ['url', 'lastmod'])
+
+# The sitemap protocol caps a sitemap at 50 MB uncompressed; anything past
+# the cap (a gzip bomb, say) is ignored
+MAX_SITEMAP_BYTES = int(env_float('SEO_SITEMAP_MAX_MB', 50) * 1024 * 1024)
+# Sitemap indexes may in theory list other indexes; real sites nest a level or two
+MAX_SITEMAP_DEPTH = 3
+
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+# Downloaded sitemaps bigger than this are spooled to a temporary file
+SPOOL_BYTES = 1024 * 1024
+
+DISCOVERED = metrics.counter('seo_discovered_urls_total', 'URLs found in sitemaps')
+
+LASTMOD_PATTERN = re.compile(
+    r'(\d{4})(?:-(\d{2})(?:-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?)?)?'
+    r'\s*(Z|[+-]\d{2}:?\d{2})?$')
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_lastmod(value):
+    """
+    Parse a W3C datetime (2024, 2024-05, 2024-05-01, 2024-05-01T10:30Z,
+    2024-05-01T10:30:00.5+02:00...) into a Unix timestamp. Dates without
+    a time zone are taken as UTC. Returns None for anything else.
+    """
+    match = LASTMOD_PATTERN.match(value.strip()) if value else None
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, zone = match.groups()
+    try:
+        timestamp = calendar.timegm((int(year), int(month or 1), int(day or 1),
+                                     int(hour or 0), int(minute or 0), int(second or 0)))
+    except (ValueError, OverflowError):
+        return None
+    if zone and zone != 'Z':
+        sign = -1 if zone[0] == '-' else 1
+        digits = zone[1:].replace(':', '')
+        timestamp -= sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    return float(timestamp)
+
+
+# ========================================
+# Sitemaps
+# ========================================
+
+class _LimitedReader:
+    """File-like view of a byte stream that ends after max_bytes"""
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.remaining = max_bytes
+        self.truncated = False
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            if not self.truncated and self.stream.read(1):
+                self.truncated = True
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _local_name(tag):
+    """Tag name without its XML namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _download_sitemap(sitemap_url):
+    """
+    Download a sitemap into a spooled temporary file (in memory while
+    small, on disk beyond SPOOL_BYTES) and return it, rewound. HTTP content
+    encodings are decoded; a gzipped file is left compressed. Downloading
+    first frees the connection straight away, however slowly the entries
+    are consumed afterwards.
+    """
+    response = fetch(sitemap_url, stream=True)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        response.raise_for_status()
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            spool.write(chunk)
+            size += len(chunk)
+            if size > MAX_SITEMAP_BYTES:
+                print(f"⚠️ Sitemap {sitemap_url} is larger than {MAX_SITEMAP_BYTES // (1024 * 1024)} MB, "
+                      f"only the start of it is read")
+                break
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        response.close()
+    spool.seek(0)
+    return spool
+
+
+def _open_sitemap(spool):
+    """
+    Readable stream over a downloaded sitemap, gunzipped if it is a gzip
+    file, and its first bytes
+    """
+    gzipped = spool.read(2) == GZIP_MAGIC
+
+    def open_stream():
+        spool.seek(0)
+        return _LimitedReader(gzip.GzipFile(fileobj=spool, mode='rb') if gzipped else spool, MAX_SITEMAP_BYTES)
+
+    head = open_stream().read(64)
+    return open_stream(), head
+
+
+def _parse_xml_sitemap(stream, sitemap_url, children):
+    """
+    Yield the SitemapEntry of every <url> of a URL set. The <loc> of every
+    <sitemap> of an index is appended to children instead.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if root is None:
+            root = element
+            continue
+        if event != 'end':
+            continue
+        name = _local_name(element.tag)
+        if name == 'url' or name == 'sitemap':
+            loc = lastmod = None
+            for child in element:
+                child_name = _local_name(child.tag)
+                if child_name == 'loc':
+                    loc = (child.text or '').strip()
+                elif child_name == 'lastmod':
+                    lastmod = child.text
+            if loc:
+                if not loc.startswith(('http://', 'https://')):
+                    loc = urljoin(sitemap_url, loc)
+                if name == 'url':
+                    yield SitemapEntry(loc, parse_lastmod(lastmod))
+                else:
+                    children.append(loc)
+            # Finished entries are dropped, so the tree never grows
+            root.clear()
+
+
+def _parse_text_sitemap(stream):
+    """Yield the entries of a plain-text sitemap (one URL per line)"""
+    pending = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop() if chunk else b''
+        for line in lines:
+            line = line.strip().decode('utf-8', errors='replace')
+            if line.startswith(('http://', 'https://')):
+                yield SitemapEntry(line, None)
+        if not chunk:
+            return
+
+
+def iter_sitemap(sitemap_url, max_depth=MAX_SITEMAP_DEPTH, seen=None):
+    """
+    Yield the SitemapEntry of every page listed in a sitemap, following
+    sitemap indexes down to max_depth. A sitemap that cannot be fetched or
+    parsed is reported and skipped (entries read before a parse error are
+    still yielded); seen holds the sitemap URLs already visited.
+    """
+    seen = set() if seen is None else seen
+    if sitemap_url in seen:
+        return
+    seen.add(sitemap_url)
+
+    try:
+        spool = _download_sitemap(sitemap_url)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Could not fetch sitemap {sitemap_url}: {e}")
+        metrics.error('discovery', e)
+        return
+
+    children = []
+    count = 0
+    stream = None
+    try:
+        stream, head = _open_sitemap(spool)
+        if head.lstrip().startswith(b'<'):
+            entries = _parse_xml_sitemap(stream, sitemap_url, children)
+        else:
+            entries = _parse_text_sitemap(stream)
+        for entry in entries:
+            count += 1
+            yield entry
+    except (ElementTree.ParseError, OSError, EOFError) as e:
+        # (A sitemap cut off at the size cap is reported below instead)
+        if stream is None or not stream.truncated:
+            print(f"⚠️ Could not parse sitemap {sitemap_url} after {count} URLs: {e}")
+            metrics.error('discovery', e)
+    finally:
+        spool.close()
+        DISCOVERED.inc(count)
+    if stream is not None and stream.truncated:
+        print(f"⚠️ Sitemap {sitemap_url} unpacks to more than {MAX_SITEMAP_BYTES // (1024 * 1024)} MB, "
+              f"only its first {count} URLs were read")
+
+    if children:
+        if max_depth <= 0:
+            print(f"⚠️ Sitemap index {sitemap_url} nests too deep, {len(children)} sitemaps skipped")
+            return
+        print(f"🗺️ Sitemap index {sitemap_url} lists {len(children)} sitemaps")
+        for child in children:
+            yield from iter_sitemap(child, max_depth - 1, seen)
+
+
+def sitemap_urls(site_url, robots=None):
+    """
+    Sitemaps of a site: those named in its robots.txt, or /sitemap.xml when
+    there are none.
+    """
+    site_url = normalize_url(site_url)
+    if robots is None:
+        robots = get_robots(site_url)
+    sitemaps = robots.sitemaps
+    if sitemaps:
+        return sitemaps
+    parts = urlsplit(site_url)
+    return [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+
+
+def discover_urls(source, since=None, limit=None, respect_robots=True):
+    """
+    Yield SitemapEntry tuples for the pages of a site.
+
+    source is a site (example.com, https://example.com/) whose sitemaps
+    are found through robots.txt, or the URL of a sitemap or sitemap index
+    (any URL with a path). Pages on other hosts are skipped, as the sitemap
+    protocol requires, as are pages disallowed by robots.txt when
+    respect_robots is set. With since (a Unix timestamp) only pages
+    modified after it, or without a lastmod, are yielded. Pages listed in
+    several sitemaps are yielded each time.
+    """
+    source = normalize_url(source)
+    robots = get_robots(source) if respect_robots else None
+    if urlsplit(source).path.strip('/'):
+        sitemaps = [source]
+    else:
+        sitemaps = sitemap_urls(source, robots or get_robots(source))
+
+    host = site_host(source)
+    same_host = {}  # netloc -> whether it is on the site
+    seen = set()
+    count = 0
+    for sitemap in sitemaps:
+        for entry in iter_sitemap(sitemap, seen=seen):
+            netloc = entry.url.split('/', 3)[2] if '://' in entry.url else ''
+            allowed_host = same_host.get(netloc)
+            if allowed_host is None:
+                allowed_host = site_host(entry.url) == host
+                if len(same_host) < 1024:
+                    same_host[netloc] = allowed_host
+            if not allowed_host:
+                continue
+            if since is not None and entry.lastmod is not None and entry.lastmod <= since:
+                continue
+            if robots is not None and not robots.allowed(entry.url):
+                continue
+            yield entry
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the pages of a site from its robots.txt and sitemaps')
+    parser.add_argument('source', help='site (example.com) or sitemap URL')
+    parser.add_argument('--limit', type=int, help='stop after this many URLs')
+    parser.add_argument('--since', help='only pages modified after this date (YYYY-MM-DD or W3C datetime)')
+    parser.add_argument('--ignore-robots', action='store_true', help='keep pages disallowed by robots.txt')
+    parser.add_argument('--out', help='write the URLs to this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    since = None
+    if args.since:
+        since = parse_lastmod(args.since)
+        if since is None:
+            parser.error(f"Invalid --since date: {args.since}")
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    count = 0
+    try:
+        for entry in discover_urls(args.source, since=since, limit=args.limit,
+                                   respect_robots=not args.ignore_robots):
+            out.write(entry.url + '\n')
+            count += 1
+    finally:
+        if args.out:
+            out.close()
+    print(f"✅ Discovered {count} URLs", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
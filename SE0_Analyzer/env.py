@@ -0,0 +1,29 @@
+"""
+Numeric settings from environment variables
+
+An unset or empty variable gives the default; a value that is not a number
+is reported and ignored rather than stopping the import of the module that
+reads it.
+"""
+import os
+
+
+def _env_number(name, default, convert):
+    value = os.getenv(name, '').strip()
+    if not value:
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        print(f"⚠️ Ignoring {name}={value!r}: not a valid number, using {default}")
+        return default
+
+
+def env_int(name, default):
+    """The integer set in environment variable name, else default"""
+    return _env_number(name, default, int)
+
+
+def env_float(name, default):
+    """The number set in environment variable name, else default"""
+    return _env_number(name, default, float)
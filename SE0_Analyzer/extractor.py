@@ -0,0 +1,333 @@
+from urllib.parse import urlparse, urljoin
+
+from bs4 import Tag, NavigableString, CData
+
+import metrics
+from records import SeoData
+
+# Bump when a change to the extraction alters seo_data for the same page,
+# so that parse results cached by older versions are not reused
+EXTRACTOR_VERSION = 2
+
+# The extraction is one walk over the tree followed by a finishing step that
+# builds the text, heading and link fields from what the walk collected
+EXTRACT_SECONDS = metrics.histogram('seo_extract_seconds', 'Time per extraction step', ['section'])
+
+# Only plain strings count as page text; comments, doctypes and the special
+# containers BeautifulSoup uses for <script>/<style>/<template> are ignored,
+# exactly like Tag.get_text() does by default.
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+# Subtrees that are dropped before the content analysis (section 7). Anything
+# inside them is invisible to the content and technical checks, but is still
+# seen by the meta, heading, image and link checks, which run on the full page.
+SKIPPED_SUBTREES = frozenset(['script', 'style', 'nav', 'footer', 'header'])
+
+# How many headings of each level are kept in seo_data
+HEADING_LIMITS = {'h1': None, 'h2': 10, 'h3': 10, 'h4': 5}
+
+# <meta name="..."> values we care about, mapped to the seo_data key
+META_NAME_FIELDS = {
+    'description': 'meta_description',
+    'keywords': 'meta_keywords',
+    'robots': 'meta_robots',
+    'twitter:card': 'twitter_card',
+    'twitter:title': 'twitter_title',
+    'twitter:description': 'twitter_description',
+}
+
+# <meta property="..."> values we care about, mapped to the seo_data key
+META_PROPERTY_FIELDS = {
+    'og:title': 'og_title',
+    'og:description': 'og_description',
+    'og:image': 'og_image',
+    'og:type': 'og_type',
+}
+
+
+def new_seo_data(url, status_code=200, load_time=0.0, page_size_kb=0.0):
+    """
+    Create an empty seo_data record (see records.SeoData) with every field
+    at its default
+    """
+    return SeoData(url, status_code, load_time, page_size_kb)
+
+
+def _tokens(value):
+    """Return a multi-valued attribute (like rel) as a list of tokens"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return value.split()
+
+
+class _Extraction:
+    """
+    State for one pass over the document.
+
+    Every element is visited exactly once; the handler for its tag name (see
+    HANDLERS) records whatever the element contributes to seo_data. Text is
+    gathered in the same walk through "collectors": a title, heading or
+    paragraph opens a collector when entered and closes it when its subtree
+    is done, and every string in between is appended to the open collectors.
+    Strings inside SKIPPED_SUBTREES only go to the collectors that keep them:
+    titles and headings do (they were read from the full page), paragraphs
+    do not (they were counted after those subtrees were dropped).
+    """
+
+    def __init__(self, seo_data, collect_links=False):
+        self.seo_data = seo_data
+        self.url = seo_data['url']
+        self.domain = urlparse(self.url).netloc
+
+        # Absolute link URLs (as dict keys, to dedupe in document order)
+        self.collect_links = collect_links
+        self.internal_urls = {}
+        self.external_urls = {}
+
+        self.title = None
+        self.seen_meta = set()
+        self.headings = {'h1': [], 'h2': [], 'h3': [], 'h4': []}
+        self.paragraphs = []
+        self.text_parts = []
+        self.collectors = []
+
+    # ----------------------------------------
+    # Tag handlers, all called with (tag, skipped). Each returns a collector
+    # for the text of the element's subtree, (list, keeps skipped text), or
+    # None if the text is not needed.
+    # ----------------------------------------
+
+    def on_title(self, _tag, _skipped):
+        if self.title is None:
+            self.title = []
+            return self.title, True
+        return None
+
+    def on_meta(self, tag, skipped):
+        seo_data = self.seo_data
+        attrs = tag.attrs
+
+        name = attrs.get('name')
+        field = META_NAME_FIELDS.get(name) if isinstance(name, str) else None
+        if field and field not in self.seen_meta:
+            # Only the first matching tag counts
+            self.seen_meta.add(field)
+            content = attrs.get('content', '')
+            if field == 'meta_description':
+                if content:
+                    seo_data['meta_description'] = content.strip()
+                    seo_data['meta_description_length'] = len(seo_data['meta_description'])
+            else:
+                seo_data[field] = content.strip()
+
+        prop = attrs.get('property')
+        field = META_PROPERTY_FIELDS.get(prop) if isinstance(prop, str) else None
+        if field and field not in self.seen_meta:
+            self.seen_meta.add(field)
+            seo_data[field] = attrs.get('content', '').strip()
+
+        if not skipped:
+            if name == 'viewport':
+                seo_data['has_viewport'] = True
+            if 'charset' in attrs or attrs.get('http-equiv') == 'Content-Type':
+                seo_data['has_charset'] = True
+        return None
+
+    def on_link(self, tag, skipped):
+        seo_data = self.seo_data
+        rel = _tokens(tag.attrs.get('rel'))
+
+        if 'canonical' in rel and 'canonical' not in self.seen_meta:
+            self.seen_meta.add('canonical')
+            seo_data['canonical_url'] = tag.attrs.get('href', '').strip()
+
+        if not skipped and 'icon' in ' '.join(rel).lower():
+            seo_data['has_favicon'] = True
+        return None
+
+    def on_heading(self, tag, _skipped):
+        texts = []
+        self.headings[tag.name].append(texts)
+        return texts, True
+
+    def on_img(self, tag, _skipped):
+        seo_data = self.seo_data
+        seo_data['images'] += 1
+        if tag.attrs.get('alt', '').strip():
+            seo_data['images_with_alt'] += 1
+        else:
+            seo_data['images_without_alt'] += 1
+        return None
+
+    def on_a(self, tag, _skipped):
+        href = tag.attrs.get('href')
+        if href is None:
+            return None
+        href = href.strip()
+
+        # Skip empty, anchor, javascript, and mailto links
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            return None
+
+        # Convert relative URLs to absolute and classify
+        absolute_url = urljoin(self.url, href)
+        link_domain = urlparse(absolute_url).netloc
+        if self.domain in link_domain or link_domain in self.domain:
+            self.seo_data['internal_links'] += 1
+            if self.collect_links:
+                self.internal_urls[absolute_url] = None
+        else:
+            self.seo_data['external_links'] += 1
+            if self.collect_links:
+                self.external_urls[absolute_url] = None
+        return None
+
+    def on_p(self, _tag, skipped):
+        if skipped:
+            return None
+        texts = []
+        self.paragraphs.append(texts)
+        return texts, False
+
+    def on_html(self, tag, skipped):
+        # Only the first <html> element is checked for a language
+        if skipped or 'html' in self.seen_meta:
+            return None
+        self.seen_meta.add('html')
+        lang = tag.attrs.get('lang')
+        if lang:
+            self.seo_data['has_language'] = True
+            self.seo_data['language'] = lang
+        return None
+
+    HANDLERS = {
+        'title': on_title,
+        'meta': on_meta,
+        'link': on_link,
+        'h1': on_heading,
+        'h2': on_heading,
+        'h3': on_heading,
+        'h4': on_heading,
+        'img': on_img,
+        'a': on_a,
+        'p': on_p,
+        'html': on_html,
+    }
+
+    # ----------------------------------------
+    # The walk
+    # ----------------------------------------
+
+    def run(self, soup):
+        """Extract seo_data from the tree: walk() followed by finish()"""
+        self.walk(soup)
+        self.finish()
+        return self.seo_data
+
+    def walk(self, soup):
+        """Visit every node of the tree once, in document order"""
+        handlers = self.HANDLERS
+        seo_data = self.seo_data
+        text_parts = self.text_parts
+        collectors = self.collectors
+        exit_marker = None
+
+        # Stack entries are (node, skipped). A (None, collector) entry marks
+        # the end of a subtree whose collector must be closed.
+        stack = [(child, False) for child in reversed(soup.contents)]
+        while stack:
+            node, skipped = stack.pop()
+
+            if node is exit_marker:
+                # Subtrees nest, so the collector to close is the newest one
+                collectors.pop()
+                continue
+
+            if isinstance(node, Tag):
+                name = node.name
+                child_skipped = skipped or name in SKIPPED_SUBTREES
+
+                if not child_skipped and not seo_data['has_schema'] and 'itemtype' in node.attrs:
+                    # Microdata
+                    seo_data['has_schema'] = True
+
+                handler = handlers.get(name)
+                if handler is not None:
+                    collector = handler(self, node, skipped)
+                    if collector is not None:
+                        collectors.append(collector)
+                        stack.append((exit_marker, collector))
+
+                contents = node.contents
+                for i in range(len(contents) - 1, -1, -1):
+                    stack.append((contents[i], child_skipped))
+
+            elif type(node) in TEXT_STRING_TYPES:
+                if skipped:
+                    for texts, keeps_skipped in collectors:
+                        if keeps_skipped:
+                            texts.append(node)
+                else:
+                    text_parts.append(node)
+                    for texts, _ in collectors:
+                        texts.append(node)
+
+    def finish(self):
+        """Turn the collected pieces into the final seo_data fields"""
+        seo_data = self.seo_data
+
+        # 1. Title
+        if self.title is not None:
+            seo_data['title'] = ''.join(self.title).strip()
+            seo_data['title_length'] = len(seo_data['title'])
+
+        # 4. Headings
+        for level, limit in HEADING_LIMITS.items():
+            texts = [''.join(parts).strip() for parts in self.headings[level]]
+            texts = [text for text in texts if text]
+            seo_data[level + '_tags'] = texts[:limit] if limit else texts
+
+        # 7. Content
+        text_content = ''.join(self.text_parts)
+        lines = (line.strip() for line in text_content.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = ' '.join(chunk for chunk in chunks if chunk)
+
+        seo_data['text_content'] = text[:3000]  # First 3000 chars for LLM
+        seo_data['word_count'] = len(text.split())
+        seo_data['paragraph_count'] = len([
+            parts for parts in self.paragraphs if ''.join(parts).strip()
+        ])
+
+        # 6. Link URLs, only when asked for
+        if self.collect_links:
+            seo_data['internal_urls'] = list(self.internal_urls)
+            seo_data['external_urls'] = list(self.external_urls)
+
+
+def extract_seo_data(soup, url, status_code=200, load_time=0.0, page_size_kb=0.0,
+                     collect_links=False):
+    """
+    Single-pass SEO data extraction from a parsed page.
+
+    Produces the same seo_data dictionary as the section-by-section checks
+    it replaced, but walks the tree once instead of once per tag. Note that
+    JSON-LD schema detection was already shadowed by the removal of <script>
+    subtrees before the structured data check, so only microdata sets
+    has_schema here as well.
+
+    With collect_links=True, seo_data also gets 'internal_urls' and
+    'external_urls': the deduplicated absolute URLs of the counted links.
+    """
+    seo_data = new_seo_data(url, status_code, load_time, page_size_kb)
+    extraction = _Extraction(seo_data, collect_links)
+    if not metrics.ENABLED:
+        return extraction.run(soup)
+
+    with EXTRACT_SECONDS.time(section='walk'):
+        extraction.walk(soup)
+    with EXTRACT_SECONDS.time(section='finish'):
+        extraction.finish()
+    return seo_data
@@ -0,0 +1,287 @@
+import importlib.util
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+import metrics
+from env import env_float, env_int
+
+# Brotli responses can only be decoded when a brotli module is installed
+BROTLI_AVAILABLE = any(importlib.util.find_spec(name) is not None for name in ('brotli', 'brotlicffi'))
+
+# Set headers to mimic a real browser
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class FetchConfig:
+    """
+    Settings for the shared HTTP session. Defaults can be overridden with
+    SEO_FETCH_* environment variables or by calling configure_fetcher().
+    """
+
+    def __init__(self, **overrides):
+        # Number of hosts whose connection pools are kept alive
+        self.pool_connections = env_int('SEO_FETCH_POOL_HOSTS', 50)
+        # Maximum open connections per host
+        self.pool_maxsize = env_int('SEO_FETCH_MAX_PER_HOST', 8)
+        # Wait for a free connection instead of opening extra ones past the limit
+        self.pool_block = True
+        # Retry/backoff for connection errors and transient status codes
+        self.retries = env_int('SEO_FETCH_RETRIES', 2)
+        self.backoff_factor = env_float('SEO_FETCH_BACKOFF', 0.5)
+        self.retry_statuses = (429, 500, 502, 503, 504)
+        # Default (connect, read) timeout in seconds
+        self.timeout = env_float('SEO_FETCH_TIMEOUT', 15)
+        # Largest page body read into memory; bigger pages are cut off here
+        self.max_bytes = int(env_float('SEO_FETCH_MAX_MB', 10) * 1024 * 1024)
+        # Time allowed for the whole download, headers and body (seconds)
+        self.total_timeout = env_float('SEO_FETCH_TOTAL_TIMEOUT', 30)
+        self.headers = dict(DEFAULT_HEADERS)
+
+        for key, value in overrides.items():
+            if not hasattr(self, key):
+                raise TypeError(f"Unknown fetch setting '{key}'")
+            setattr(self, key, value)
+
+
+# Page download phases: connect (new connections only: DNS, TCP and TLS),
+# ttfb (request sent until response headers, including any connect) and
+# download (reading the body)
+FETCH_SECONDS = metrics.histogram('seo_fetch_seconds', 'Page download time by phase', ['phase'])
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        with FETCH_SECONDS.time(phase='connect'):
+            super().connect()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with FETCH_SECONDS.time(phase='connect'):
+            super().connect()
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+# Bytes read from the socket at a time when streaming a body
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadTimeout(requests.exceptions.Timeout):
+    """The whole download took longer than the configured total timeout"""
+
+
+_config = FetchConfig()
+_session = None
+# Same pool settings, without status retries (see get_session)
+_unretried_session = None
+_session_lock = threading.Lock()
+
+
+def build_session(config, timed_connections=False, status_retries=True):
+    """
+    Create a pooled keep-alive session from the config. With
+    timed_connections, setting up each new connection is recorded as the
+    'connect' phase of seo_fetch_seconds. Without status_retries, only
+    connection and read errors are retried: transient statuses (429, 503...)
+    are returned straight away.
+    """
+    retry = Retry(
+        total=config.retries,
+        connect=config.retries,
+        read=config.retries,
+        status=config.retries if status_retries else 0,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=config.retry_statuses if status_retries else (),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=config.pool_block,
+        max_retries=retry,
+    )
+
+    if timed_connections:
+        adapter.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+    session = requests.Session()
+    session.headers.update(config.headers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def configure_fetcher(**overrides):
+    """
+    Replace the fetch settings (see FetchConfig) and rebuild the shared
+    session. Existing pooled connections are closed.
+    """
+    global _config
+
+    with _session_lock:
+        _config = FetchConfig(**overrides)
+        _close_sessions()
+    return _config
+
+
+def get_session(status_retries=True):
+    """
+    Return the process-wide pooled session, creating it on first use.
+    Fetches paced by politeness.HostScheduler ask for the session without
+    status retries, so that the scheduler alone retries and backs off when
+    a host throttles.
+    """
+    global _session, _unretried_session
+
+    session = _session if status_retries else _unretried_session
+    if session is None:
+        with _session_lock:
+            if status_retries:
+                if _session is None:
+                    _session = build_session(_config, timed_connections=metrics.ENABLED)
+                session = _session
+            else:
+                if _unretried_session is None:
+                    _unretried_session = build_session(_config, timed_connections=metrics.ENABLED,
+                                                       status_retries=False)
+                session = _unretried_session
+    return session
+
+
+def get_fetch_config():
+    """Return the active fetch settings"""
+    return _config
+
+
+def fetch(url, method='GET', timeout=None, status_retries=True, **kwargs):
+    """
+    Fetch a URL through the shared session, reusing keep-alive connections
+    to hosts that were contacted before. Returns the requests Response.
+    """
+    if timeout is None:
+        timeout = _config.timeout
+    return get_session(status_retries).request(method, url, timeout=timeout, **kwargs)
+
+
+def _response_socket(response):
+    """The socket a streamed response is read from, or None if not found"""
+    raw = response.raw
+    sock = getattr(getattr(raw, 'connection', None), 'sock', None)
+    if sock is None:
+        # http.client drops the connection's socket when the response ends
+        # with the connection (HTTP/1.0, Connection: close); the response's
+        # file still reads from it
+        fp = getattr(getattr(raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+    return sock
+
+
+def _limit_read_time(response, deadline):
+    """
+    Make the response's socket reads give up at the deadline. Returns True
+    if the deadline is now what limits them (rather than the read timeout).
+    """
+    sock = _response_socket(response)
+    if sock is None:
+        return False
+    remaining = max(deadline - time.time(), 0.001)
+    timeout = sock.gettimeout()
+    if timeout is None or remaining < timeout:
+        sock.settimeout(remaining)
+        return True
+    return False
+
+
+def read_body(response, max_bytes=None, deadline=None):
+    """
+    Read a response fetched with stream=True, keeping at most max_bytes of
+    (decoded) body. Stops early once the cap is reached and raises
+    DownloadTimeout if the deadline (a time.time() value) passes first:
+    each socket read waits at most until the deadline. The connection is
+    released either way.
+
+    Returns (content, size_bytes, truncated). size_bytes is the full body
+    size: the bytes read, or Content-Length when the body was cut off and
+    the header gives its uncompressed size.
+    """
+    if max_bytes is None:
+        max_bytes = _config.max_bytes
+
+    chunks = []
+    received = 0
+    truncated = False
+    # Whether a read timeout means the deadline passed
+    limited = False
+    try:
+        if deadline is not None:
+            limited = _limit_read_time(response, deadline)
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            received += len(chunk)
+            # A body of exactly max_bytes is complete: only more than that is cut off
+            if received > max_bytes:
+                truncated = True
+                break
+            if deadline is not None:
+                if time.time() > deadline:
+                    raise DownloadTimeout(f"Download took longer than {_config.total_timeout}s", response=response)
+                limited = _limit_read_time(response, deadline)
+    except requests.exceptions.ConnectionError as e:
+        # A read cut short by the deadline surfaces as a read timeout
+        if limited and e.args and isinstance(e.args[0], ReadTimeoutError):
+            raise DownloadTimeout(f"Download took longer than {_config.total_timeout}s", response=response) from e
+        raise
+    finally:
+        response.close()
+
+    content = b''.join(chunks)
+    size = received
+    if truncated:
+        content = content[:max_bytes]
+        encoding = response.headers.get('Content-Encoding', 'identity').lower()
+        try:
+            declared = int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            declared = 0
+        if encoding == 'identity' and declared > size:
+            size = declared
+    return content, size, truncated
+
+
+def _close_sessions():
+    global _session, _unretried_session
+
+    for session in (_session, _unretried_session):
+        if session is not None:
+            session.close()
+    _session = _unretried_session = None
+
+
+def close_session():
+    """Close all pooled connections (e.g. at process shutdown)"""
+    with _session_lock:
+        _close_sessions()
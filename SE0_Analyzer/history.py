@@ -0,0 +1,266 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from urls import canonicalize_url, site_host
+
+# Where analysis history is kept (SEO_HISTORY=0 turns recording off)
+HISTORY_ENABLED = os.getenv('SEO_HISTORY', '1') != '0'
+HISTORY_PATH = os.getenv('SEO_HISTORY_PATH', os.path.join(
+    os.getenv('SEO_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seo_data')),
+    'history.sqlite3'))
+
+# Numbers stored in their own columns so trend and aggregate queries never
+# have to open the compressed payload
+METRIC_COLUMNS = (
+    'score', 'meta_tags', 'content', 'technical', 'social',
+    'status_code', 'load_time', 'page_size_kb', 'word_count',
+    'images', 'images_without_alt', 'internal_links', 'external_links',
+    'broken_links', 'issue_count',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    industry TEXT,
+    title TEXT,
+    score INTEGER NOT NULL,
+    meta_tags INTEGER NOT NULL,
+    content INTEGER NOT NULL,
+    technical INTEGER NOT NULL,
+    social INTEGER NOT NULL,
+    status_code INTEGER,
+    load_time REAL,
+    page_size_kb REAL,
+    word_count INTEGER,
+    images INTEGER,
+    images_without_alt INTEGER,
+    internal_links INTEGER,
+    external_links INTEGER,
+    broken_links INTEGER,
+    issue_count INTEGER,
+    content_hash TEXT,
+    analysis_version TEXT,
+    payload BLOB NOT NULL,
+    text BLOB
+);
+CREATE INDEX IF NOT EXISTS snapshots_url_time ON snapshots (url, created_at);
+CREATE INDEX IF NOT EXISTS snapshots_domain_time ON snapshots (domain, created_at);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (created_at);
+"""
+
+# Columns added after the first release, created on older databases at startup
+_ADDED_COLUMNS = (('content_hash', 'TEXT'), ('analysis_version', 'TEXT'))
+
+
+def _compress(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _decompress(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class HistoryStore:
+    """
+    SQLite store of analysis snapshots.
+
+    Every snapshot keeps the category scores and key metrics in indexed
+    columns; the full seo_data/analysis (minus the page text) is kept as a
+    compressed JSON payload and the page text is compressed separately, so
+    listing and aggregating never decompress anything.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        existing = {row['name'] for row in conn.execute('PRAGMA table_info(snapshots)')}
+        for name, kind in _ADDED_COLUMNS:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE snapshots ADD COLUMN {name} {kind}')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, seo_data, analysis, industry=None, created_at=None,
+               content_hash=None, analysis_version=None, suggestions=None):
+        """
+        Store one analysis; returns the snapshot id. content_hash and
+        analysis_version let a later incremental run recognise an unchanged
+        page; suggestions are kept so they can be reused along with it.
+        """
+        url = canonicalize_url(seo_data['url'])
+        scores = analysis['category_scores']
+        text = seo_data.get('text_content')
+        payload = {
+            'seo_data': {k: seo_data[k] for k in seo_data if k != 'text_content'},
+            'analysis': {k: v for k, v in analysis.items() if k != 'seo_data'},
+        }
+        if suggestions:
+            payload['suggestions'] = suggestions
+        row = (
+            url, site_host(url), created_at or time.time(), industry, seo_data.get('title'),
+            analysis['score'], scores['meta_tags'], scores['content'], scores['technical'], scores['social'],
+            seo_data.get('status_code'), seo_data.get('load_time'), seo_data.get('page_size_kb'),
+            seo_data.get('word_count'), seo_data.get('images'), seo_data.get('images_without_alt'),
+            seo_data.get('internal_links'), seo_data.get('external_links'), seo_data.get('broken_links'),
+            len(analysis['issues']), content_hash, analysis_version,
+            _compress(payload), _compress(text) if text else None,
+        )
+        cursor = self._connection().execute(
+            'INSERT INTO snapshots (url, domain, created_at, industry, title, ' + ', '.join(METRIC_COLUMNS) +
+            ', content_hash, analysis_version, payload, text) VALUES (' + ', '.join('?' * len(row)) + ')', row)
+        return cursor.lastrowid
+
+    def latest_snapshot(self, url):
+        """
+        Columns of the most recent snapshot of a URL (id, created_at, score,
+        content_hash, analysis_version), or None. Nothing is decompressed;
+        use get_snapshot() for the full record.
+        """
+        row = self._connection().execute(
+            'SELECT id, created_at, score, content_hash, analysis_version FROM snapshots'
+            ' WHERE url = ? ORDER BY created_at DESC LIMIT 1', (canonicalize_url(url),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def score_history(self, url, since=None, until=None, limit=None):
+        """Scores of one URL over time, oldest first"""
+        query = ('SELECT id, created_at, score, meta_tags, content, technical, social, load_time, word_count,'
+                 ' issue_count FROM snapshots WHERE url = ?')
+        params = [canonicalize_url(url)]
+        query, params = _time_range(query, params, since, until)
+        if limit:
+            # The latest `limit` snapshots, still returned oldest first
+            query = f'SELECT * FROM ({query} ORDER BY created_at DESC LIMIT ?) ORDER BY created_at'
+            params.append(int(limit))
+        else:
+            query += ' ORDER BY created_at'
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def domain_summary(self, domain, since=None, until=None):
+        """
+        Aggregates for a whole domain: snapshot and page counts, average,
+        minimum and maximum overall score and average category scores.
+        """
+        query = ('SELECT COUNT(*) AS snapshots, COUNT(DISTINCT url) AS pages,'
+                 ' AVG(score) AS avg_score, MIN(score) AS min_score, MAX(score) AS max_score,'
+                 ' AVG(meta_tags) AS avg_meta_tags, AVG(content) AS avg_content,'
+                 ' AVG(technical) AS avg_technical, AVG(social) AS avg_social,'
+                 ' AVG(load_time) AS avg_load_time, SUM(COALESCE(broken_links, 0)) AS broken_links,'
+                 ' MIN(created_at) AS first_seen, MAX(created_at) AS last_seen'
+                 ' FROM snapshots WHERE domain = ?')
+        params = [_domain_key(domain)]
+        query, params = _time_range(query, params, since, until)
+        summary = dict(self._connection().execute(query, params).fetchone())
+        for key, value in summary.items():
+            if key.startswith('avg_') and value is not None:
+                summary[key] = round(value, 2)
+        summary['domain'] = params[0]
+        return summary
+
+    def domain_pages(self, domain, limit=100):
+        """Latest snapshot of each page of a domain, lowest score first"""
+        host = _domain_key(domain)
+        rows = self._connection().execute(
+            'SELECT s.id, s.url, s.created_at, s.title, s.score, s.meta_tags, s.content, s.technical, s.social,'
+            ' s.issue_count FROM snapshots s'
+            ' JOIN (SELECT url, MAX(created_at) AS latest FROM snapshots WHERE domain = ? GROUP BY url) l'
+            ' ON s.url = l.url AND s.created_at = l.latest'
+            ' ORDER BY s.score, s.url LIMIT ?', (host, int(limit)))
+        return [dict(row) for row in rows]
+
+    def domain_trend(self, domain, bucket=86400, since=None, until=None):
+        """Average domain score per time bucket (seconds, a day by default)"""
+        query = ('SELECT CAST(created_at / ? AS INTEGER) * ? AS period, COUNT(*) AS snapshots,'
+                 ' AVG(score) AS avg_score FROM snapshots WHERE domain = ?')
+        host = _domain_key(domain)
+        params = [bucket, bucket, host]
+        query, params = _time_range(query, params, since, until)
+        query += ' GROUP BY period ORDER BY period'
+        return [{'period': row['period'], 'snapshots': row['snapshots'], 'avg_score': round(row['avg_score'], 2)}
+                for row in self._connection().execute(query, params)]
+
+    def get_snapshot(self, snapshot_id, include_text=False):
+        """The stored seo_data, analysis (and any suggestions) of one snapshot, or None"""
+        row = self._connection().execute(
+            'SELECT id, url, created_at, industry, payload, text FROM snapshots WHERE id = ?',
+            (snapshot_id,)).fetchone()
+        if row is None:
+            return None
+        snapshot = _decompress(row['payload'])
+        snapshot.update({'id': row['id'], 'url': row['url'], 'created_at': row['created_at'],
+                         'industry': row['industry']})
+        if include_text:
+            snapshot['seo_data']['text_content'] = _decompress(row['text']) if row['text'] else ''
+        return snapshot
+
+    def stats(self):
+        entries, urls = self._connection().execute(
+            'SELECT COUNT(*), COUNT(DISTINCT url) FROM snapshots').fetchone()
+        return {'snapshots': entries, 'urls': urls, 'size_mb': round(os.path.getsize(self.path) / (1024 * 1024), 2)}
+
+
+def _domain_key(domain):
+    """Accept 'example.com', 'www.example.com' or a full URL"""
+    return site_host(domain if '://' in domain else '//' + domain)
+
+
+def _time_range(query, params, since, until):
+    if since is not None:
+        query += ' AND created_at >= ?'
+        params.append(since)
+    if until is not None:
+        query += ' AND created_at < ?'
+        params.append(until)
+    return query, params
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store, or None when recording is off"""
+    global _store
+
+    if not HISTORY_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
+
+
+def record_analysis(seo_data, analysis, industry=None, **details):
+    """
+    Record an analysis if history is enabled (details are passed on to
+    HistoryStore.record); never lets a storage error escape
+    """
+    store = get_history_store()
+    if store is None:
+        return None
+    try:
+        return store.record(seo_data, analysis, industry, **details)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not record analysis history: {e}")
+        return None
@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from env import env_float
+from records import as_record
+from urls import canonicalize_url
+
+# Where the cache lives and how big it may grow (SEO_FETCH_CACHE=0 disables it)
+CACHE_ENABLED = os.getenv('SEO_FETCH_CACHE', '1') != '0'
+CACHE_DIR = os.getenv('SEO_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seo_cache'))
+CACHE_MAX_MB = env_float('SEO_FETCH_CACHE_MB', 256)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    status_code INTEGER NOT NULL,
+    load_time REAL NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    parse_signature TEXT,
+    seo_data BLOB
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+# Response headers worth keeping with the body
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'content-length')
+
+
+class FetchCache:
+    """
+    On-disk cache of fetched pages for conditional revalidation.
+
+    Responses that carry an ETag or Last-Modified header are stored with
+    their (compressed) body, headers and original download time, keyed on
+    the canonical URL. The next fetch of the same URL sends If-None-Match /
+    If-Modified-Since; on a 304 the stored page, and the seo_data parsed
+    from it, are reused. Total stored size is capped and the least recently
+    used entries are evicted first. Safe to share between threads and
+    worker processes (SQLite handles the locking).
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._init_lock:
+            self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # One connection per thread (and per process, since forked workers
+        # must not reuse the parent's); sqlite3 connections are not thread-safe
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def lookup(self, url):
+        """
+        Return the stored entry for a URL as a dict, or None. The entry has
+        the body and the validators needed for a conditional request.
+        """
+        row = self._connection().execute(
+            'SELECT url, etag, last_modified, status_code, load_time, headers, body,'
+            ' parse_signature, seo_data FROM responses WHERE key = ?',
+            (canonicalize_url(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'url': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'status_code': row[3],
+            'load_time': row[4],
+            'headers': json.loads(row[5]),
+            'body': row[6],
+            'parse_signature': row[7],
+            'seo_data': row[8],
+        }
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Request headers that revalidate a stored entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def is_cacheable(response):
+        """Only responses that can be revalidated later are worth storing"""
+        if response.status_code != 200:
+            return False
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return False
+        return bool(response.headers.get('ETag') or response.headers.get('Last-Modified'))
+
+    def store(self, url, response, content, load_time):
+        """Store a fresh 200 response (no-op if it has no validators)"""
+        if not self.is_cacheable(response):
+            return False
+
+        body = zlib.compress(content, 6)
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO responses (key, url, etag, last_modified, status_code, load_time,'
+            ' headers, body, size, fetched_at, last_access, parse_signature, seo_data)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)',
+            (canonicalize_url(url), url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+             response.status_code, load_time, json.dumps(headers), body, len(body), now, now),
+        )
+        self._evict()
+        return True
+
+    def touch(self, url, response=None):
+        """Mark an entry as used, picking up refreshed validators from a 304"""
+        conn = self._connection()
+        key = canonicalize_url(url)
+        conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        if response is not None:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag:
+                conn.execute('UPDATE responses SET etag = ? WHERE key = ?', (etag, key))
+            if last_modified:
+                conn.execute('UPDATE responses SET last_modified = ? WHERE key = ?', (last_modified, key))
+
+    def store_parse(self, url, signature, seo_data):
+        """Attach parse results (in the binary SeoData form) to a stored response"""
+        self._connection().execute(
+            'UPDATE responses SET parse_signature = ?, seo_data = ? WHERE key = ?',
+            (signature, as_record(seo_data).to_bytes(), canonicalize_url(url)),
+        )
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under 90% of its cap"""
+        conn = self._connection()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        doomed = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': entries, 'size_mb': round(size / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2)}
+
+    def clear(self):
+        self._connection().execute('DELETE FROM responses')
+
+
+def decompress_body(entry):
+    """The original page bytes of a cache entry"""
+    return zlib.decompress(entry['body'])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_fetch_cache():
+    """Return the process-wide fetch cache, or None when it is disabled"""
+    global _cache
+
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FetchCache(os.path.join(CACHE_DIR, 'responses.sqlite3'),
+                                    int(CACHE_MAX_MB * 1024 * 1024))
+    return _cache
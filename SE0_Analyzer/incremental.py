@@ -0,0 +1,129 @@
+import hashlib
+
+from analyzer import SCORING_VERSION
+from extractor import EXTRACTOR_VERSION
+from llm_helper import prompt_inputs
+
+# A stored snapshot can only stand in for a new analysis when it was made
+# by the same extractor and scoring rules
+ANALYSIS_VERSION = f"{EXTRACTOR_VERSION}.{SCORING_VERSION}"
+
+# Text fields reported when their value changes
+TEXT_FIELDS = {
+    'title': 'Title',
+    'meta_description': 'Meta description',
+    'canonical_url': 'Canonical URL',
+    'meta_robots': 'Meta robots',
+    'og_title': 'Open Graph title',
+    'og_description': 'Open Graph description',
+    'og_image': 'Open Graph image',
+    'twitter_card': 'Twitter card',
+    'language': 'Language',
+    'status_code': 'Status code',
+}
+
+# Yes/no checks; losing one is a regression
+FLAG_FIELDS = {
+    'has_https': 'HTTPS',
+    'has_viewport': 'Viewport meta tag',
+    'has_favicon': 'Favicon',
+    'has_language': 'Language attribute',
+    'has_charset': 'Charset declaration',
+    'has_schema': 'Structured data',
+}
+
+# Counters: (label, whether an increase is bad, relative change worth reporting)
+COUNT_FIELDS = {
+    'images_without_alt': ('Images without alt text', True, 0),
+    'broken_links': ('Broken links', True, 0),
+    'word_count': ('Word count', False, 0.1),
+    'paragraph_count': ('Paragraphs', False, 0.1),
+    'images': ('Images', False, 0),
+    'internal_links': ('Internal links', False, 0.1),
+    'external_links': ('External links', False, 0.1),
+}
+
+# Lists compared item by item
+LIST_FIELDS = {
+    'h1_tags': 'H1',
+    'h2_tags': 'H2',
+    'schema_types': 'Schema type',
+}
+
+
+def content_hash(content):
+    """Fingerprint of the fetched page bytes"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _change(field, old, new, message, regression=False):
+    return {'field': field, 'old': old, 'new': new, 'regression': regression, 'message': message}
+
+
+def diff_seo_data(old, new):
+    """
+    Field-level differences between two seo_data dictionaries, as a list
+    of {'field', 'old', 'new', 'regression', 'message'} (lists report the
+    added and removed items instead of old/new).
+    """
+    changes = []
+
+    for field, label in TEXT_FIELDS.items():
+        before, after = old.get(field), new.get(field)
+        if before == after:
+            continue
+        if not after:
+            changes.append(_change(field, before, after, f"⚠️ {label} removed (was '{before}')", regression=True))
+        elif not before:
+            changes.append(_change(field, before, after, f"✅ {label} added: '{after}'"))
+        else:
+            changes.append(_change(field, before, after, f"✏️ {label} changed: '{before}' → '{after}'"))
+
+    for field, label in FLAG_FIELDS.items():
+        before, after = bool(old.get(field)), bool(new.get(field))
+        if before and not after:
+            changes.append(_change(field, before, after, f"⚠️ {label} lost", regression=True))
+        elif after and not before:
+            changes.append(_change(field, before, after, f"✅ {label} added"))
+
+    for field, (label, increase_is_bad, threshold) in COUNT_FIELDS.items():
+        before, after = old.get(field) or 0, new.get(field) or 0
+        if before == after or abs(after - before) <= threshold * max(before, 1):
+            continue
+        worse = (after > before) == increase_is_bad
+        if increase_is_bad:
+            icon = '⚠️' if worse else '✅'
+        else:
+            icon = '✏️'
+        changes.append(_change(field, before, after, f"{icon} {label}: {before} → {after}",
+                               regression=increase_is_bad and worse))
+
+    for field, label in LIST_FIELDS.items():
+        before, after = old.get(field) or [], new.get(field) or []
+        removed = [item for item in before if item not in after]
+        added = [item for item in after if item not in before]
+        if not removed and not added:
+            continue
+        messages = [f"⚠️ {label} removed: '{item}'" for item in removed]
+        messages += [f"✏️ {label} added: '{item}'" for item in added]
+        changes.append({
+            'field': field,
+            'added': added,
+            'removed': removed,
+            # Losing the last H1 (or all structured data) hurts the score
+            'regression': bool(removed) and not after and field != 'h2_tags',
+            'message': '; '.join(messages),
+        })
+
+    return changes
+
+
+def suggestion_inputs_changed(industry, previous, seo_data, issues):
+    """
+    Whether the AI suggestions stored with a previous snapshot are stale:
+    True unless the prompt would be built from exactly the same values.
+    """
+    if not previous or not previous.get('suggestions'):
+        return True
+    old_inputs = prompt_inputs(industry, previous['seo_data'], previous['analysis']['issues'])
+    return old_inputs != prompt_inputs(industry, seo_data, issues)
@@ -0,0 +1,277 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from env import env_int
+from scraper import scrape_website
+from analyzer import analyze_seo
+from history import record_analysis
+from llm_helper import get_seo_suggestions
+
+
+# Analyses running at the same time
+JOB_WORKERS = env_int('SEO_JOB_WORKERS', 4)
+# Jobs waiting for a worker before new submissions are refused
+JOB_QUEUE_SIZE = env_int('SEO_JOB_QUEUE_SIZE', 100)
+# How long finished jobs (and their results) are kept, in seconds
+JOB_TTL = env_int('SEO_JOB_TTL', 3600)
+# Suggestions are only requested below this score
+SUGGESTION_THRESHOLD = 70
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Progress stages, in the order they are reported (a job ends in 'done' or 'failed').
+# Between 'scored' and 'suggestions', a 'suggestion' event carries each AI
+# suggestion section as it streams in.
+STAGES = ('queued', 'fetched', 'parsed', 'scored', 'suggestions', DONE)
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class Job:
+    """
+    One analysis request. Progress events are appended as the stages
+    complete; readers wait on the job's condition for new events.
+    """
+
+    def __init__(self, industry, url):
+        self.id = uuid.uuid4().hex
+        self.industry = industry
+        self.url = url
+        self.status = QUEUED
+        self.events = []
+        self.result = None
+        # results.html context without the AI suggestions, once scored
+        self.partial = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._condition = threading.Condition()
+        self.add_event('queued')
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def stage(self):
+        return self.events[-1]['stage']
+
+    def set_partial(self, context):
+        self.partial = context
+
+    def add_event(self, stage, detail=None):
+        event = {'stage': stage, 'time': round(time.time() - self.created_at, 3)}
+        if detail:
+            event.update(detail)
+        with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self._condition:
+            self.result = result
+            self.error = error
+            self.status = FAILED if error else DONE
+            self.finished_at = time.time()
+            event = {'stage': self.status, 'time': round(self.finished_at - self.created_at, 3)}
+            if error:
+                event['error'] = error
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def wait_for_events(self, seen, timeout):
+        """Block until there are more than `seen` events or the timeout passes; return the new ones"""
+        with self._condition:
+            if len(self.events) <= seen and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[seen:]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'industry': self.industry,
+            'url': self.url,
+            'status': self.status,
+            'stage': self.stage,
+            'events': list(self.events),
+            'error': self.error,
+        }
+
+
+def _no_progress(stage, detail=None):
+    pass
+
+
+def analyze_website(industry, website_url, progress=None, partial=None):
+    """
+    Run the full analysis (scrape, score, suggestions) and return the
+    context for results.html. progress(stage, detail) is called as each
+    stage completes, and for each AI suggestion section as it streams in.
+    partial(context) gets the context as soon as the page is scored, before
+    the suggestions (with 'streaming' set when they are on their way).
+    Returns {'error': ...} when the site can't be analyzed.
+    """
+    if progress is None:
+        progress = _no_progress
+
+    print(f"\n{'='*60}")
+    print("🚀 STARTING ENHANCED SEO ANALYSIS")
+    print(f"{'='*60}")
+    print(f"Industry: {industry}")
+    print(f"Website: {website_url}")
+    print(f"{'='*60}\n")
+
+    # Step 1: Scrape the website (enhanced with more data)
+    print("📡 Step 1: Scraping website with enhanced crawler...")
+    seo_data = scrape_website(website_url, progress=progress)
+
+    if 'error' in seo_data:
+        return {'error': seo_data['error']}
+
+    print(f"✅ Scraping complete - extracted {len(seo_data)} data points\n")
+
+    # Step 2: Analyze SEO (enhanced scoring system)
+    print("📊 Step 2: Analyzing SEO with comprehensive scoring...")
+    analysis = analyze_seo(seo_data)
+    result = {
+        'industry': industry,
+        'url': website_url,
+        'score': analysis['score'],
+        'issues': analysis['issues'],
+        'strengths': analysis['strengths'],
+        'analysis': analysis,
+        'seo_data': seo_data,
+        'suggestions': None,
+    }
+    if partial is not None:
+        partial(dict(result, streaming=analysis['score'] < SUGGESTION_THRESHOLD))
+    progress('scored', {'score': analysis['score']})
+
+    print("✅ Analysis complete!")
+    print(f"   Overall Score: {analysis['score']}/100")
+    print(f"   Meta Tags: {analysis['category_scores']['meta_tags']}/30")
+    print(f"   Content: {analysis['category_scores']['content']}/35")
+    print(f"   Technical: {analysis['category_scores']['technical']}/25")
+    print(f"   Social: {analysis['category_scores']['social']}/10\n")
+
+    # Step 3: Get AI suggestions if score is low
+    suggestions = None
+    if analysis['score'] < SUGGESTION_THRESHOLD:
+        print(f"🤖 Step 3: Score is {analysis['score']}/100 - Getting enhanced AI suggestions...")
+        suggestions = get_seo_suggestions(
+            industry, seo_data, analysis['issues'],
+            on_section=lambda section, value: progress('suggestion', {'section': section, 'value': value}))
+
+        if suggestions:
+            print("✅ AI Suggestions generated:")
+            print(f"   - Optimized Title: {suggestions['optimized_title'][:50]}...")
+            print(f"   - Optimized Meta Desc: {suggestions['optimized_meta_description'][:50]}...")
+            print(f"   - Content Outline: {len(suggestions['content_outline'])} sections")
+            print(f"   - Keywords: {len(suggestions['keywords'])} keywords")
+            print(f"   - Blog Topics: {len(suggestions['blog_topics'])} topics")
+        progress('suggestions', {'generated': bool(suggestions)})
+    else:
+        print(f"✅ Score is {analysis['score']}/100 - Great! No AI suggestions needed.")
+        progress('suggestions', {'generated': False})
+
+    print(f"\n{'='*60}")
+    print("✅ ANALYSIS COMPLETE!")
+    print(f"{'='*60}\n")
+
+    result['suggestions'] = suggestions
+    return result
+
+
+class JobQueue:
+    """
+    Bounded pool of analysis workers. submit() returns immediately with a
+    Job; the job's events and result can be read while and after it runs.
+    Finished jobs are dropped after `ttl` seconds.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE, ttl=JOB_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='seo-job')
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, industry, url):
+        with self._lock:
+            self._expire()
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"{self._pending} analyses are already waiting")
+            job = Job(industry, url)
+            self._jobs[job.id] = job
+            self._pending += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        with self._lock:
+            self._pending -= 1
+        job.status = RUNNING
+        try:
+            with metrics.STAGE_SECONDS.time(stage='job'):
+                result = analyze_website(job.industry, job.url, progress=job.add_event, partial=job.set_partial)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            traceback.print_exc()
+            metrics.error('job', e)
+            job.finish(error=f"An error occurred: {str(e)}")
+            return
+        if 'error' in result:
+            job.finish(error=result['error'])
+        else:
+            record_analysis(result['seo_data'], result['analysis'], job.industry)
+            job.finish(result=result)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            return {'jobs': len(self._jobs), 'pending': self._pending, 'running': running}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it on first use"""
+    global _queue
+
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
+
+
+def _queue_stat(name):
+    return None if _queue is None else _queue.stats()[name]
+
+
+metrics.gauge('seo_jobs_pending', 'Analysis jobs waiting for a worker', lambda: _queue_stat('pending'))
+metrics.gauge('seo_jobs_running', 'Analysis jobs being worked on', lambda: _queue_stat('running'))
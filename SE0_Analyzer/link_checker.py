@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+from env import env_float
+from fetcher import FetchConfig, build_session
+
+
+# Overall time allowed for checking one page's links (seconds)
+DEFAULT_TIME_BUDGET = env_float('SEO_LINK_CHECK_BUDGET', 5)
+# Most links checked per page
+DEFAULT_MAX_LINKS = int(env_float('SEO_LINK_CHECK_MAX_LINKS', 100))
+# Timeout for a single HEAD/GET
+LINK_TIMEOUT = env_float('SEO_LINK_CHECK_TIMEOUT', 4)
+# Minimum gap between two checks against the same host
+HOST_INTERVAL = env_float('SEO_LINK_CHECK_HOST_INTERVAL', 0.2)
+# How long a link's status is remembered
+CACHE_TTL = env_float('SEO_LINK_CHECK_CACHE_TTL', 3600)
+CACHE_SIZE = 50000
+CHECK_THREADS = 16
+
+# Statuses that mean the link is broken. Others (401/403/429, 5xx, bot
+# walls, timeouts) say nothing reliable about the link and are not counted.
+BROKEN_STATUSES = frozenset([404, 410])
+
+# Servers that reject HEAD answer with one of these; retry with GET
+HEAD_UNSUPPORTED = frozenset([400, 403, 405, 501])
+
+BROKEN = 'broken'
+OK = 'ok'
+UNKNOWN = 'unknown'
+
+
+class LinkCache:
+    """Thread-safe map of URL -> link status with TTL and a size bound"""
+
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            status, expires = entry
+            if expires < time.time():
+                del self._entries[url]
+                return None
+            return status
+
+    def set(self, url, status):
+        with self._lock:
+            if url not in self._entries and len(self._entries) >= self.max_size:
+                # Dicts keep insertion order, so this drops the oldest entry
+                del self._entries[next(iter(self._entries))]
+            self._entries[url] = (status, time.time() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least `interval` seconds"""
+
+    def __init__(self, interval=HOST_INTERVAL):
+        self.interval = interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host, deadline=None):
+        """
+        Reserve the next slot for a host and return when it starts, or None
+        (reserving nothing) if it would not start before the deadline
+        """
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.get(host, now))
+            if deadline is not None and slot >= deadline:
+                return None
+            self._next_slot[host] = slot + self.interval
+            return slot
+
+
+# Shared across all analyses in the process
+_cache = LinkCache()
+_limiter = HostRateLimiter()
+_executor = ThreadPoolExecutor(max_workers=CHECK_THREADS, thread_name_prefix='seo-links')
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Pooled session without retries, so a bad link cannot eat the budget"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session(FetchConfig(retries=0, timeout=LINK_TIMEOUT))
+    return _session
+
+
+def check_link(url, deadline=None):
+    """
+    Check one link with HEAD (falling back to GET) and return 'ok', 'broken'
+    or 'unknown'. Results are cached; unknown results are not.
+    """
+    status = _cache.get(url)
+    metrics.cache_lookup('links', status is not None)
+    if status is not None:
+        return status
+
+    slot = _limiter.reserve(urlparse(url).netloc, deadline)
+    if slot is None:
+        return UNKNOWN
+    if slot > time.time():
+        time.sleep(slot - time.time())
+
+    session = _get_session()
+    try:
+        response = session.head(url, allow_redirects=True, timeout=LINK_TIMEOUT)
+        if response.status_code in HEAD_UNSUPPORTED:
+            response = session.get(url, allow_redirects=True, timeout=LINK_TIMEOUT, stream=True)
+            response.close()
+    except requests.exceptions.Timeout:
+        # Slow or overloaded, not gone (ConnectTimeout is also a ConnectionError)
+        return UNKNOWN
+    except (requests.exceptions.ConnectionError, requests.exceptions.InvalidURL,
+            requests.exceptions.TooManyRedirects):
+        # DNS failures, refused connections and redirect loops
+        status = BROKEN
+    except requests.exceptions.RequestException:
+        # Anything else: can't tell
+        return UNKNOWN
+    else:
+        code = response.status_code
+        if code in BROKEN_STATUSES:
+            status = BROKEN
+        elif code < 400:
+            status = OK
+        else:
+            # 5xx and the like are often transient: check again next time
+            return UNKNOWN
+
+    _cache.set(url, status)
+    return status
+
+
+def check_links(urls, time_budget=DEFAULT_TIME_BUDGET, max_links=DEFAULT_MAX_LINKS):
+    """
+    Check links concurrently within a hard time budget.
+
+    Returns a summary dictionary:
+        checked     - links with a definite answer
+        broken      - number of broken links
+        broken_urls - the broken links themselves
+        unchecked   - links skipped, out of budget or with no clear answer
+    """
+    urls = list(dict.fromkeys(urls))
+    selected = urls[:max_links]
+    deadline = time.time() + time_budget
+
+    summary = {'checked': 0, 'broken': 0, 'broken_urls': [], 'unchecked': len(urls) - len(selected)}
+
+    pending = {}
+    for url in selected:
+        status = _cache.get(url)
+        if status is None:
+            pending[_executor.submit(check_link, url, deadline)] = url
+        else:
+            _record(summary, url, status)
+
+    while pending:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        finished, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in finished:
+            url = pending.pop(future)
+            try:
+                status = future.result()
+            except Exception:
+                status = UNKNOWN
+            _record(summary, url, status)
+
+    # Anything still running finishes in the background and fills the cache
+    for future in pending:
+        future.cancel()
+    summary['unchecked'] += len(pending)
+    return summary
+
+
+def verify_page_links(seo_data, time_budget=DEFAULT_TIME_BUDGET, max_links=DEFAULT_MAX_LINKS):
+    """
+    Fill in broken_links for a page extracted with collect_links=True.
+    The collected link URLs are removed from seo_data afterwards; a few of
+    the broken ones are kept in broken_link_urls for the report.
+    """
+    urls = seo_data.pop('internal_urls', []) + seo_data.pop('external_urls', [])
+    summary = check_links(urls, time_budget, max_links)
+
+    seo_data['broken_links'] = summary['broken']
+    seo_data['links_checked'] = summary['checked']
+    seo_data['broken_link_urls'] = summary['broken_urls'][:10]
+    return summary
+
+
+def _record(summary, url, status):
+    if status == UNKNOWN:
+        summary['unchecked'] += 1
+        return
+    summary['checked'] += 1
+    if status == BROKEN:
+        summary['broken'] += 1
+        summary['broken_urls'].append(url)
@@ -0,0 +1,382 @@
+"""
+Shared Gemini client
+
+One configured model instance for the whole process, used from any thread:
+
+    text = get_llm_client(api_key).generate(prompt)
+
+Every call goes through, in order:
+
+    - a circuit breaker: after BREAKER_FAILURES failures in a row the API is
+      considered down and calls fail at once with LLMUnavailable, for
+      BREAKER_COOLDOWN seconds; then a single trial call decides whether it
+      is back
+    - a token bucket matched to the quota (SEO_LLM_RPM requests per minute)
+    - a semaphore bounding calls in flight (SEO_LLM_CONCURRENCY)
+    - a deadline (SEO_LLM_TIMEOUT seconds) covering all of the above and
+      the model's answer; a call that runs past it raises LLMTimeout
+
+With SEO_LLM_HEDGE_AFTER set, a call still unanswered after that many
+seconds is sent a second time if the limits allow it right away, and the
+first answer wins. This cuts the tail latency of the odd stuck request at
+the cost of some duplicate calls (and quota). stream() yields the answer as
+the model writes it, under the same limits (but never hedged).
+
+The model runs on a worker thread, so a deadline frees the caller even
+though the underlying request cannot be cancelled; its concurrency slot is
+only given back once that request really ends.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+
+import metrics
+from env import env_float
+
+
+# Model and generation settings (llm_helper keys its suggestion cache on them)
+MODEL_NAME = 'gemini-1.5-flash'
+TEMPERATURE = 0.7
+MAX_OUTPUT_TOKENS = 2000
+
+# Requests per minute allowed by the API quota, and how many may be sent
+# back to back
+LLM_RPM = env_float('SEO_LLM_RPM', 15)
+LLM_BURST = env_float('SEO_LLM_BURST', 3)
+# Calls in flight at once
+LLM_CONCURRENCY = int(env_float('SEO_LLM_CONCURRENCY', 4))
+# Seconds a call may take, waiting for the limits included
+LLM_TIMEOUT = env_float('SEO_LLM_TIMEOUT', 30)
+# Seconds before a duplicate request is sent (0: never)
+LLM_HEDGE_AFTER = env_float('SEO_LLM_HEDGE_AFTER', 0)
+# Failures in a row that open the circuit, and how long it stays open
+BREAKER_FAILURES = int(env_float('SEO_LLM_BREAKER_FAILURES', 3))
+BREAKER_COOLDOWN = env_float('SEO_LLM_BREAKER_COOLDOWN', 60)
+
+CALLS = metrics.counter('seo_llm_calls_total', 'Gemini calls by outcome', ['outcome'])
+
+
+class LLMError(Exception):
+    """The model could not answer"""
+
+
+class LLMUnavailable(LLMError):
+    """The call was not made: the circuit is open or the limits left no time"""
+
+
+class LLMTimeout(LLMError):
+    """The model did not answer before the deadline"""
+
+
+def _is_quota_error(error):
+    return type(error).__name__ == 'ResourceExhausted' or 'quota' in str(error).lower()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, at most burst saved up"""
+
+    def __init__(self, rate, burst):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, deadline=None):
+        """
+        Take a token, waiting for one until the deadline (a time.monotonic()
+        value; None waits as long as needed). Returns False if none came in time.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+    def try_take(self):
+        return self.take(deadline=time.monotonic())
+
+    def drain(self):
+        """Spend everything saved up (after the API reports the quota is exhausted)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class CircuitBreaker:
+    """
+    Closed while calls succeed. `failures` failures in a row open it for
+    `cooldown` seconds, after which one trial call is let through: success
+    closes it, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failed = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("✅ Gemini API answering again, circuit closed")
+            self.state = self.CLOSED
+            self._failed = 0
+
+    def failure(self):
+        with self._lock:
+            self._failed += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failed >= self.failures):
+                if self.state == self.CLOSED:
+                    print(f"⚠️ Gemini API failed {self._failed} times in a row, "
+                          f"using fallback suggestions for {self.cooldown:g}s")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Rate-limited, deadline-bound access to one Gemini model (see the module docstring)"""
+
+    def __init__(self, api_key, model_name=MODEL_NAME, rpm=LLM_RPM, burst=LLM_BURST,
+                 concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT, hedge_after=LLM_HEDGE_AFTER,
+                 breaker=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+        # Room for hedged duplicates and calls outliving their deadline
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency) * 2, thread_name_prefix='seo-llm')
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.generation_config = genai.types.GenerationConfig(
+            temperature=TEMPERATURE,
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+        )
+
+    def _call(self, prompt, generation_config):
+        try:
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+            return response.text
+        finally:
+            self._slots.release()
+
+    def _reserve(self, deadline):
+        """Wait for a token and a concurrency slot until the deadline"""
+        if not self.bucket.take(deadline):
+            return False
+        return self._slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _no_capacity(self):
+        CALLS.inc(outcome='rate_limited')
+        if self.breaker.state == CircuitBreaker.HALF_OPEN:
+            # The trial call never happened: try again after another cooldown
+            self.breaker.failure()
+        return LLMUnavailable("Gemini rate limit left no time for this call")
+
+    def _failed(self, error):
+        self.breaker.failure()
+        CALLS.inc(outcome='error')
+        if _is_quota_error(error):
+            self.bucket.drain()
+
+    def _start(self, prompt, generation_config, deadline, wait_for_limits=True):
+        """Submit one request once the limits allow, or return None"""
+        if wait_for_limits:
+            if not self._reserve(deadline):
+                return None
+        else:
+            if not self._slots.acquire(blocking=False):
+                return None
+            if not self.bucket.try_take():
+                self._slots.release()
+                return None
+        try:
+            return self._executor.submit(self._call, prompt, generation_config)
+        except RuntimeError:
+            # Closed since (the API key changed)
+            self._slots.release()
+            return None
+
+    def generate(self, prompt, timeout=None, max_output_tokens=None):
+        """
+        The model's answer to the prompt, as text; max_output_tokens
+        overrides MAX_OUTPUT_TOKENS for this call. Raises LLMUnavailable when
+        no call was made, and LLMTimeout or the API's own error when one
+        failed; only the latter count towards opening the circuit.
+        """
+        if not self.breaker.allow():
+            CALLS.inc(outcome='circuit_open')
+            raise LLMUnavailable("Gemini API is unhealthy, circuit open")
+
+        generation_config = self.generation_config
+        if max_output_tokens:
+            generation_config = genai.types.GenerationConfig(
+                temperature=TEMPERATURE,
+                max_output_tokens=max_output_tokens,
+            )
+        deadline = time.monotonic() + (timeout or self.timeout)
+        first = self._start(prompt, generation_config, deadline)
+        if first is None:
+            raise self._no_capacity()
+        pending = {first}
+
+        with metrics.STAGE_SECONDS.time(stage='llm'):
+            if self.hedge_after and deadline - time.monotonic() > self.hedge_after:
+                done, _ = wait(pending, timeout=self.hedge_after)
+                if not done:
+                    hedge = self._start(prompt, generation_config, deadline, wait_for_limits=False)
+                    if hedge is not None:
+                        CALLS.inc(outcome='hedged')
+                        pending.add(hedge)
+
+            error = None
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        self.breaker.success()
+                        CALLS.inc(outcome='ok')
+                        return future.result()
+                    error = future.exception()
+
+        if error is not None and not pending:
+            self._failed(error)
+            raise error
+        self.breaker.failure()
+        CALLS.inc(outcome='timeout')
+        raise LLMTimeout(f"Gemini did not answer within {timeout or self.timeout:g}s")
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yield the model's answer to the prompt in text chunks as it is
+        generated. Raises like generate(); the deadline covers the whole
+        answer. Closing the generator early stops reading the answer.
+        """
+        if not self.breaker.allow():
+            CALLS.inc(outcome='circuit_open')
+            raise LLMUnavailable("Gemini API is unhealthy, circuit open")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        if not self._reserve(deadline):
+            raise self._no_capacity()
+
+        chunks = queue.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def read():
+            try:
+                response = self.model.generate_content(
+                    prompt, generation_config=self.generation_config, stream=True)
+                for chunk in response:
+                    if stop.is_set():
+                        return
+                    chunks.put(chunk.text)
+                chunks.put(end)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                self._slots.release()
+
+        try:
+            self._executor.submit(read)
+        except RuntimeError:
+            # Closed since (the API key changed)
+            self._slots.release()
+            raise LLMUnavailable("Gemini client was closed") from None
+        settled = False
+        try:
+            with metrics.STAGE_SECONDS.time(stage='llm'):
+                while True:
+                    try:
+                        item = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        settled = True
+                        self.breaker.failure()
+                        CALLS.inc(outcome='timeout')
+                        raise LLMTimeout(
+                            f"Gemini did not finish answering within {timeout or self.timeout:g}s") from None
+                    if item is end:
+                        break
+                    if isinstance(item, Exception):
+                        settled = True
+                        self._failed(item)
+                        raise item
+                    yield item
+            settled = True
+            self.breaker.success()
+            CALLS.inc(outcome='ok')
+        finally:
+            stop.set()
+            if not settled:
+                # Abandoned by the caller after the model had started answering
+                self.breaker.success()
+
+    def close(self):
+        """Let the worker threads go once the calls in flight are done"""
+        self._executor.shutdown(wait=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client(api_key):
+    """The process-wide client, created on first use (and again if the API key changes)"""
+    global _client
+
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            if _client is not None:
+                _client.close()
+            _client = LLMClient(api_key)
+        return _client
+
+
+def _breaker_state():
+    client = _client
+    if client is None:
+        return None
+    return {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}[client.breaker.state]
+
+
+metrics.gauge('seo_llm_circuit_state', 'Gemini circuit breaker: 0 closed, 1 half open, 2 open', _breaker_state)
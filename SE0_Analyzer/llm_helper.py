@@ -1,53 +1,93 @@
 import google.generativeai as genai
 import os
+import re
 
-def get_seo_suggestions(industry, seo_data, issues):
+import metrics
+from env import env_int
+from llm_client import MAX_OUTPUT_TOKENS, MODEL_NAME, TEMPERATURE, LLMTimeout, LLMUnavailable, get_llm_client
+from suggestion_cache import get_suggestion_cache, suggestion_cache_key
+
+# The model settings (see llm_client) are part of the suggestion cache key,
+# as is PROMPT_VERSION, which must be bumped whenever the prompt changes.
+PROMPT_VERSION = 1
+
+# Batch mode (get_batch_suggestions): pages per request, and the budget
+# each request must fit. Prompt tokens are estimated at 4 characters each;
+# the answer is budgeted at OUTPUT_TOKENS_PER_PAGE per page.
+BATCH_PAGES = env_int('SEO_LLM_BATCH_PAGES', 8)
+BATCH_PROMPT_TOKENS = env_int('SEO_LLM_BATCH_PROMPT_TOKENS', 6000)
+BATCH_OUTPUT_TOKENS = env_int('SEO_LLM_BATCH_OUTPUT_TOKENS', 8000)
+OUTPUT_TOKENS_PER_PAGE = 600
+
+# Suggestions that came (wholly or partly) from get_fallback_suggestions
+LLM_FALLBACKS = metrics.counter('seo_llm_fallbacks_total', 'AI suggestions replaced by fallbacks, by reason', ['reason'])
+BATCH_PAGES_TOTAL = metrics.counter('seo_llm_batch_pages_total', 'Pages sent in batched suggestion requests, by outcome',
+                                    ['outcome'])
+
+
+def prompt_inputs(industry, seo_data, issues):
     """
-    Enhanced AI suggestions with deep content analysis
-    Provides comprehensive SEO recommendations based on actual scraped data
+    Collect exactly the values the prompt is built from. Two calls with equal
+    inputs produce the same prompt, which is what the suggestion cache keys on.
     """
-    
-    # Configure API key
-    api_key = os.getenv('GEMINI_API_KEY', 'YOUR_API_KEY')
-    
-    if not api_key or api_key == 'YOUR_API_KEY_HERE':
-        print("⚠️ API key not configured properly")
-        return get_fallback_suggestions(industry, seo_data)
-    
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Build comprehensive context from scraped data
-        current_h1 = seo_data['h1_tags'][0] if seo_data.get('h1_tags') else 'None'
-        h2_list = ', '.join(seo_data['h2_tags'][:5]) if seo_data.get('h2_tags') else 'None'
-        
-        # Create detailed prompt with actual website data
-        prompt = f"""You are an expert SEO consultant analyzing a {industry} website. Based on the data below, provide SPECIFIC, ACTIONABLE recommendations.
+    current_h1 = seo_data['h1_tags'][0] if seo_data.get('h1_tags') else 'None'
+    h2_list = ', '.join(seo_data['h2_tags'][:5]) if seo_data.get('h2_tags') else 'None'
+
+    return {
+        'industry': industry,
+        'url': seo_data.get('url', 'N/A'),
+        'title': seo_data.get('title', 'Missing'),
+        'title_length': seo_data.get('title_length', 0),
+        'meta_description': seo_data.get('meta_description', 'Missing'),
+        'meta_description_length': seo_data.get('meta_description_length', 0),
+        'current_h1': current_h1,
+        'h2_list': h2_list,
+        'word_count': seo_data.get('word_count', 0),
+        'images': seo_data.get('images', 0),
+        'images_without_alt': seo_data.get('images_without_alt', 0),
+        'internal_links': seo_data.get('internal_links', 0),
+        'content_preview': seo_data.get('text_content', '')[:500],
+        'issues': chr(10).join(issues[:10]) if issues else 'No major issues',
+    }
+
+
+def batch_cache_key(inputs):
+    """
+    Suggestion cache key for a page answered in a batched request. Those
+    answers come from a summary of the page and a smaller output budget, so
+    they are kept apart from single-page answers and never served for one.
+    """
+    return suggestion_cache_key(dict(inputs, variant='batch'), MODEL_NAME, TEMPERATURE,
+                                OUTPUT_TOKENS_PER_PAGE, PROMPT_VERSION)
+
+
+def build_prompt(inputs):
+    """Create detailed prompt with actual website data"""
+    return f"""You are an expert SEO consultant analyzing a {inputs['industry']} website. Based on the data below, provide SPECIFIC, ACTIONABLE recommendations.
 
 === WEBSITE DATA ===
-URL: {seo_data.get('url', 'N/A')}
-Industry: {industry}
+URL: {inputs['url']}
+Industry: {inputs['industry']}
 
-Current Title: {seo_data.get('title', 'Missing')}
-Title Length: {seo_data.get('title_length', 0)} characters
+Current Title: {inputs['title']}
+Title Length: {inputs['title_length']} characters
 
-Current Meta Description: {seo_data.get('meta_description', 'Missing')}
-Meta Description Length: {seo_data.get('meta_description_length', 0)} characters
+Current Meta Description: {inputs['meta_description']}
+Meta Description Length: {inputs['meta_description_length']} characters
 
-Current H1: {current_h1}
-Current H2 Tags: {h2_list}
+Current H1: {inputs['current_h1']}
+Current H2 Tags: {inputs['h2_list']}
 
 Content Stats:
-- Word Count: {seo_data.get('word_count', 0)} words
-- Images: {seo_data.get('images', 0)} ({seo_data.get('images_without_alt', 0)} missing alt text)
-- Internal Links: {seo_data.get('internal_links', 0)}
+- Word Count: {inputs['word_count']} words
+- Images: {inputs['images']} ({inputs['images_without_alt']} missing alt text)
+- Internal Links: {inputs['internal_links']}
 
 Content Preview (first 500 chars):
-{seo_data.get('text_content', '')[:500]}
+{inputs['content_preview']}
 
 === SEO ISSUES FOUND ===
-{chr(10).join(issues[:10]) if issues else 'No major issues'}
+{inputs['issues']}
 
 === YOUR TASK ===
 Provide detailed, specific recommendations in these 5 categories:
@@ -55,7 +95,7 @@ Provide detailed, specific recommendations in these 5 categories:
 1. **OPTIMIZED TITLE TAG** - Write a better title tag (30-60 chars) that:
    - Includes primary keyword naturally
    - Is compelling for click-through
-   - Specific to this {industry} business
+   - Specific to this {inputs['industry']} business
 
 2. **OPTIMIZED META DESCRIPTION** - Write a better meta description (120-160 chars) that:
    - Includes primary and secondary keywords
@@ -72,7 +112,7 @@ Provide detailed, specific recommendations in these 5 categories:
    - Includes relevant keywords naturally
    - Logical flow and comprehensive coverage
 
-5. **TARGET KEYWORDS** - List 8 specific keywords for this {industry} business:
+5. **TARGET KEYWORDS** - List 8 specific keywords for this {inputs['industry']} business:
    - Mix of short-tail and long-tail keywords
    - Based on actual business and location if mentioned
    - Include search intent (informational, commercial, transactional)
@@ -80,7 +120,7 @@ Provide detailed, specific recommendations in these 5 categories:
 6. **BLOG TOPICS** - Suggest 5 blog post ideas that:
    - Address customer pain points
    - Help with SEO and organic traffic
-   - Establish authority in {industry}
+   - Establish authority in {inputs['industry']}
 
 Format your response EXACTLY like this (use exact section headers):
 
@@ -111,21 +151,23 @@ BLOG TOPICS:
 
 Be specific and actionable. Base recommendations on the actual website content and industry."""
 
-        print("🤖 Generating comprehensive AI recommendations...")
-        
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=2000,
-            )
-        )
-        
-        result_text = response.text
-        print("✅ Received detailed AI recommendations")
-        
-        # Parse the structured response
-        suggestions = {
+
+# Most items kept from each list section
+LIST_LIMITS = {'content_outline': 7, 'keywords': 8, 'blog_topics': 5}
+
+
+class SectionParser:
+    """
+    Line-based parser for the model's sectioned response that can be fed
+    the response a piece at a time, as it streams in. feed() and close()
+    return the (section, value) pairs completed by the new text: a
+    single-line section as soon as its line is read, a list section when
+    the next header (or the end of the response) arrives. The parsed
+    suggestions so far are in .suggestions.
+    """
+
+    def __init__(self):
+        self.suggestions = {
             'optimized_title': '',
             'optimized_meta_description': '',
             'improved_h1': '',
@@ -133,85 +175,240 @@ Be specific and actionable. Base recommendations on the actual website content a
             'keywords': [],
             'blog_topics': []
         }
-        
-        current_section = None
-        lines = result_text.split('\n')
-        
+        self.current_section = None
+        self._partial_line = ''
+        self._sent = {}
+
+    def feed(self, text):
+        lines = (self._partial_line + text).split('\n')
+        self._partial_line = lines.pop()
+        completed = []
         for line in lines:
-            line_stripped = line.strip()
-            
-            # Detect section headers
-            if 'OPTIMIZED TITLE:' in line_stripped.upper():
-                current_section = 'optimized_title'
-                continue
-            elif 'OPTIMIZED META DESCRIPTION:' in line_stripped.upper():
-                current_section = 'optimized_meta_description'
-                continue
-            elif 'IMPROVED H1:' in line_stripped.upper():
-                current_section = 'improved_h1'
-                continue
-            elif 'CONTENT OUTLINE:' in line_stripped.upper():
-                current_section = 'content_outline'
-                continue
-            elif 'TARGET KEYWORDS:' in line_stripped.upper() or ('KEYWORDS:' in line_stripped.upper() and 'TARGET' in line_stripped.upper()):
-                current_section = 'keywords'
-                continue
-            elif 'BLOG TOPICS:' in line_stripped.upper():
-                current_section = 'blog_topics'
-                continue
-            
-            # Skip empty lines
-            if not line_stripped:
-                continue
-            
-            # Extract content based on current section
-            if current_section in ['optimized_title', 'optimized_meta_description', 'improved_h1']:
-                # These are single-line fields
-                if not suggestions[current_section] and not line_stripped.startswith(('-', '*', '•', '#')):
-                    suggestions[current_section] = line_stripped
-            
-            elif current_section in ['content_outline', 'keywords', 'blog_topics']:
-                # These are list fields
-                if line_stripped.startswith(('-', '*', '•')) or (line_stripped[0].isdigit() and '.' in line_stripped[:3]):
-                    # Clean the line
-                    cleaned = line_stripped.lstrip('-*•0123456789. ').strip()
-                    if cleaned and len(cleaned) > 3:
-                        suggestions[current_section].append(cleaned)
-        
-        # Validation and cleanup
-        if not suggestions['optimized_title']:
-            suggestions['optimized_title'] = seo_data.get('title', f"{industry} - Professional Services")
-            print("⚠️ No title generated, using original")
-        
-        if not suggestions['optimized_meta_description']:
-            suggestions['optimized_meta_description'] = seo_data.get('meta_description', f"Leading {industry} services with professional expertise.")
-            print("⚠️ No meta description generated, using original")
+            self._line(line, completed)
+        return completed
+
+    def close(self):
+        completed = []
+        self._line(self._partial_line, completed)
+        self._partial_line = ''
+        self._complete(self.current_section, completed)
+        self.current_section = None
+        return completed
+
+    def _complete(self, section, completed):
+        if section is None:
+            return
+        value = self.suggestions[section]
+        if isinstance(value, list):
+            value = value[:LIST_LIMITS[section]]
+        if value and self._sent.get(section) != value:
+            self._sent[section] = value
+            completed.append((section, value))
+
+    def _line(self, line, completed):
+        line_stripped = line.strip()
         
-        if not suggestions['improved_h1']:
-            suggestions['improved_h1'] = current_h1 if current_h1 != 'None' else f"Welcome to {industry} Services"
-            print("⚠️ No H1 generated, using original")
+        # Detect section headers
+        header = None
+        if 'OPTIMIZED TITLE:' in line_stripped.upper():
+            header = 'optimized_title'
+        elif 'OPTIMIZED META DESCRIPTION:' in line_stripped.upper():
+            header = 'optimized_meta_description'
+        elif 'IMPROVED H1:' in line_stripped.upper():
+            header = 'improved_h1'
+        elif 'CONTENT OUTLINE:' in line_stripped.upper():
+            header = 'content_outline'
+        elif 'TARGET KEYWORDS:' in line_stripped.upper() or ('KEYWORDS:' in line_stripped.upper() and 'TARGET' in line_stripped.upper()):
+            header = 'keywords'
+        elif 'BLOG TOPICS:' in line_stripped.upper():
+            header = 'blog_topics'
+        if header is not None:
+            self._complete(self.current_section, completed)
+            self.current_section = header
+            return
         
-        if not suggestions['content_outline']:
-            suggestions['content_outline'] = get_fallback_suggestions(industry, seo_data)['content_outline']
-            print("⚠️ No content outline generated, using fallback")
+        # Skip empty lines
+        if not line_stripped:
+            return
         
-        if not suggestions['keywords']:
-            suggestions['keywords'] = get_fallback_suggestions(industry, seo_data)['keywords']
-            print("⚠️ No keywords generated, using fallback")
+        # Extract content based on current section
+        current_section = self.current_section
+        if current_section in ['optimized_title', 'optimized_meta_description', 'improved_h1']:
+            # These are single-line fields
+            if not self.suggestions[current_section] and not line_stripped.startswith(('-', '*', '•', '#')):
+                self.suggestions[current_section] = line_stripped
+                self._complete(current_section, completed)
         
-        if not suggestions['blog_topics']:
-            suggestions['blog_topics'] = get_fallback_suggestions(industry, seo_data)['blog_topics']
-            print("⚠️ No blog topics generated, using fallback")
+        elif current_section in ['content_outline', 'keywords', 'blog_topics']:
+            # These are list fields
+            if line_stripped.startswith(('-', '*', '•')) or (line_stripped[0].isdigit() and '.' in line_stripped[:3]):
+                # Clean the line
+                cleaned = line_stripped.lstrip('-*•0123456789. ').strip()
+                if cleaned and len(cleaned) > 3:
+                    self.suggestions[current_section].append(cleaned)
+
+
+def parse_sections(result_text):
+    """
+    Parse the model's sectioned response into a suggestions dict. Sections
+    the response lacks are left empty.
+    """
+    parser = SectionParser()
+    parser.feed(result_text)
+    parser.close()
+    return parser.suggestions
+
+
+def parse_suggestions(result_text, industry, seo_data, filled=None):
+    """
+    Parse the model's sectioned response into a suggestions dict, filling
+    anything missing from the original page or the fallback suggestions.
+    """
+    return complete_suggestions(parse_sections(result_text), industry, seo_data, filled)
+
+
+def complete_suggestions(suggestions, industry, seo_data, filled=None):
+    """
+    Fill the sections the model left empty and trim the lists. The names of
+    the filled sections are appended to filled, if given.
+    """
+    current_h1 = seo_data['h1_tags'][0] if seo_data.get('h1_tags') else 'None'
+    if filled is not None:
+        filled.extend(section for section, value in suggestions.items() if not value)
+    
+    # Validation and cleanup
+    if not suggestions['optimized_title']:
+        suggestions['optimized_title'] = seo_data.get('title', f"{industry} - Professional Services")
+        print("⚠️ No title generated, using original")
+    
+    if not suggestions['optimized_meta_description']:
+        suggestions['optimized_meta_description'] = seo_data.get('meta_description', f"Leading {industry} services with professional expertise.")
+        print("⚠️ No meta description generated, using original")
+    
+    if not suggestions['improved_h1']:
+        suggestions['improved_h1'] = current_h1 if current_h1 != 'None' else f"Welcome to {industry} Services"
+        print("⚠️ No H1 generated, using original")
+    
+    if not suggestions['content_outline']:
+        suggestions['content_outline'] = get_fallback_suggestions(industry, seo_data)['content_outline']
+        LLM_FALLBACKS.inc(reason='missing_section')
+        print("⚠️ No content outline generated, using fallback")
+    
+    if not suggestions['keywords']:
+        suggestions['keywords'] = get_fallback_suggestions(industry, seo_data)['keywords']
+        LLM_FALLBACKS.inc(reason='missing_section')
+        print("⚠️ No keywords generated, using fallback")
+    
+    if not suggestions['blog_topics']:
+        suggestions['blog_topics'] = get_fallback_suggestions(industry, seo_data)['blog_topics']
+        LLM_FALLBACKS.inc(reason='missing_section')
+        print("⚠️ No blog topics generated, using fallback")
+    
+    # Limit lists to reasonable sizes
+    for section, limit in LIST_LIMITS.items():
+        suggestions[section] = suggestions[section][:limit]
+
+    return suggestions
+
+
+def get_seo_suggestions(industry, seo_data, issues, on_section=None):
+    """
+    Enhanced AI suggestions with deep content analysis
+    Provides comprehensive SEO recommendations based on actual scraped data
+
+    With on_section, the model's answer is streamed and
+    on_section(section, value) is called for each section as soon as it is
+    parsed. Sections filled in afterwards (from the page or the fallbacks)
+    are reported before returning, so every section is heard about.
+    """
+    if on_section is None:
+        return _seo_suggestions(industry, seo_data, issues)
+
+    sent = {}
+
+    def report(section, value):
+        sent[section] = value
+        on_section(section, value)
+
+    suggestions = _seo_suggestions(industry, seo_data, issues, report)
+    for section, value in suggestions.items():
+        if sent.get(section) != value:
+            on_section(section, value)
+    return suggestions
+
+
+def _partial_or_fallback(parser, industry, seo_data):
+    """The sections streamed in before a failure, completed; else the fallbacks"""
+    if parser is not None and any(parser.suggestions.values()):
+        return complete_suggestions(parser.suggestions, industry, seo_data)
+    return get_fallback_suggestions(industry, seo_data)
+
+
+def _seo_suggestions(industry, seo_data, issues, on_section=None):
+    # Configure API key
+    api_key = os.getenv('GEMINI_API_KEY', 'YOUR_API_KEY')
+    
+    if not api_key or api_key == 'YOUR_API_KEY_HERE':
+        print("⚠️ API key not configured properly")
+        LLM_FALLBACKS.inc(reason='no_api_key')
+        return get_fallback_suggestions(industry, seo_data)
+    
+    # Build comprehensive context from scraped data
+    inputs = prompt_inputs(industry, seo_data, issues)
+    
+    # Identical inputs were answered before: no model round trip
+    cache = get_suggestion_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = suggestion_cache_key(inputs, MODEL_NAME, TEMPERATURE, MAX_OUTPUT_TOKENS, PROMPT_VERSION)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print("♻️ Reusing cached AI recommendations for identical inputs")
+            return cached
+    
+    parser = None
+    filled = []
+    try:
+        prompt = build_prompt(inputs)
+
+        print("🤖 Generating comprehensive AI recommendations...")
         
-        # Limit lists to reasonable sizes
-        suggestions['content_outline'] = suggestions['content_outline'][:7]
-        suggestions['keywords'] = suggestions['keywords'][:8]
-        suggestions['blog_topics'] = suggestions['blog_topics'][:5]
+        client = get_llm_client(api_key)
+        if on_section is None:
+            result_text = client.generate(prompt)
+            print("✅ Received detailed AI recommendations")
+            suggestions = parse_suggestions(result_text, industry, seo_data, filled)
+        else:
+            # Each section goes out as soon as it has been read
+            parser = SectionParser()
+            for chunk in client.stream(prompt):
+                for section, value in parser.feed(chunk):
+                    on_section(section, value)
+            for section, value in parser.close():
+                on_section(section, value)
+            print("✅ Received detailed AI recommendations")
+            suggestions = complete_suggestions(parser.suggestions, industry, seo_data, filled)
         
         print(f"✅ Parsed: Title, Meta Desc, H1, {len(suggestions['content_outline'])} outlines, {len(suggestions['keywords'])} keywords, {len(suggestions['blog_topics'])} topics")
         
+        # Only complete answers are kept: one padded with fallbacks is asked again
+        if cache is not None and not filled:
+            cache.set(cache_key, suggestions)
+        
         return suggestions
     
+    except LLMUnavailable as e:
+        # The API is known to be unhealthy or the quota is used up: no call made
+        print(f"⚠️ {e}, using fallback SEO suggestions")
+        LLM_FALLBACKS.inc(reason='unavailable')
+        return _partial_or_fallback(parser, industry, seo_data)
+    
+    except LLMTimeout as e:
+        print(f"⏱️ {e}, using fallback SEO suggestions")
+        metrics.error('llm', e)
+        LLM_FALLBACKS.inc(reason='timeout')
+        return _partial_or_fallback(parser, industry, seo_data)
+    
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Error with Gemini AI: {error_msg}")
@@ -225,7 +422,206 @@ Be specific and actionable. Base recommendations on the actual website content a
             print("⚠️ Network error. Check your internet connection.")
         
         print("🔄 Using fallback SEO suggestions...")
-        return get_fallback_suggestions(industry, seo_data)
+        metrics.error('llm', e)
+        LLM_FALLBACKS.inc(reason='error')
+        return _partial_or_fallback(parser, industry, seo_data)
+
+
+# ========================================
+# Batched suggestions
+# ========================================
+
+def build_page_summary(inputs):
+    """Compact description of one page for a batched prompt"""
+    issues = inputs['issues'].split(chr(10))[:5]
+    return f"""URL: {inputs['url']}
+Title ({inputs['title_length']} chars): {inputs['title']}
+Meta Description ({inputs['meta_description_length']} chars): {inputs['meta_description']}
+H1: {inputs['current_h1']}
+H2s: {inputs['h2_list']}
+Stats: {inputs['word_count']} words, {inputs['images']} images ({inputs['images_without_alt']} missing alt), {inputs['internal_links']} internal links
+Top Issues:
+{chr(10).join('- ' + issue for issue in issues)}
+"""
+
+
+def build_batch_prompt(industry, summaries):
+    """One request covering several pages: the instructions once, then each page's summary"""
+    return f"""You are an expert SEO consultant auditing {len(summaries)} pages of a {industry} website. For EACH page below, provide SPECIFIC, ACTIONABLE recommendations based on that page's own data.
+
+For every page give:
+- OPTIMIZED TITLE: a better title tag (30-60 chars) with the primary keyword, compelling for click-through
+- OPTIMIZED META DESCRIPTION: a better meta description (120-160 chars) with keywords and a call-to-action
+- IMPROVED H1: an H1 that states the page purpose and includes the primary keyword
+- CONTENT OUTLINE: 5-7 H2 subheadings
+- TARGET KEYWORDS: 8 keywords, mixing short-tail and long-tail
+- BLOG TOPICS: 5 blog post ideas for this {industry} business
+
+{chr(10).join(f"=== PAGE {number} ==={chr(10)}{summary}" for number, summary in enumerate(summaries, 1))}
+Answer for every page, in order, starting each answer with its page marker line exactly as given (=== PAGE n ===), and format each answer EXACTLY like this:
+
+=== PAGE 1 ===
+OPTIMIZED TITLE:
+[title]
+
+OPTIMIZED META DESCRIPTION:
+[meta description]
+
+IMPROVED H1:
+[H1]
+
+CONTENT OUTLINE:
+- H2 subheading 1
+(5-7 subheadings)
+
+TARGET KEYWORDS:
+- keyword 1
+(8 keywords)
+
+BLOG TOPICS:
+- Blog topic 1
+(5 topics)
+
+Do not merge pages or skip any. Keep each answer specific to its page."""
+
+
+def estimate_tokens(text):
+    """Rough token count of a prompt (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+# "=== PAGE 3 ===", "**PAGE 3**", "## Page 3: https://...": a line naming a page and nothing else
+PAGE_MARKER = re.compile(r'^[ \t#*=]*PAGE[ \t]+(\d+)\b[ \t#*=]*(?:[-:(][^\n]*)?$', re.IGNORECASE | re.MULTILINE)
+
+
+def parse_batch_suggestions(result_text, count):
+    """
+    Split a batched response at its page markers and parse each page's
+    section. Returns {page number (1-based): suggestions} for the pages
+    whose answer came back complete; the others are missing and need
+    asking again.
+    """
+    parsed = {}
+    markers = list(PAGE_MARKER.finditer(result_text))
+    for index, marker in enumerate(markers):
+        number = int(marker.group(1))
+        if not 1 <= number <= count or number in parsed:
+            continue
+        end = markers[index + 1].start() if index + 1 < len(markers) else len(result_text)
+        suggestions = parse_sections(result_text[marker.end():end])
+        if all(suggestions.values()):
+            for section, limit in LIST_LIMITS.items():
+                suggestions[section] = suggestions[section][:limit]
+            parsed[number] = suggestions
+    return parsed
+
+
+def plan_batches(industry, summaries, max_pages=BATCH_PAGES):
+    """
+    Group page summaries (indexes into summaries) into requests that stay
+    within the page, prompt token and output token budgets
+    """
+    overhead = estimate_tokens(build_batch_prompt(industry, []))
+    max_pages = max(1, min(max_pages, BATCH_OUTPUT_TOKENS // OUTPUT_TOKENS_PER_PAGE))
+    batches = []
+    batch = []
+    tokens = overhead
+    for index, summary in enumerate(summaries):
+        cost = estimate_tokens(summary) + 4  # (with its page marker)
+        if batch and (len(batch) >= max_pages or tokens + cost > BATCH_PROMPT_TOKENS):
+            batches.append(batch)
+            batch = []
+            tokens = overhead
+        batch.append(index)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def get_batch_suggestions(industry, pages, max_pages=BATCH_PAGES):
+    """
+    AI suggestions for several pages of a site, asked for several pages per
+    request instead of one request each. pages is a list of
+    (seo_data, issues) pairs; returns their suggestions, in order.
+
+    Pages are summarised compactly (title, meta description, headings,
+    stats, top issues) and packed into requests within the token budgets
+    above. Pages whose answer is missing or incomplete in the response are
+    asked for again on their own with get_seo_suggestions, which also
+    provides the fallbacks when the API is unavailable.
+    """
+    results = [None] * len(pages)
+    if not pages:
+        return results
+
+    api_key = os.getenv('GEMINI_API_KEY', 'YOUR_API_KEY')
+    if not api_key or api_key == 'YOUR_API_KEY_HERE':
+        print("⚠️ API key not configured properly")
+        LLM_FALLBACKS.inc(len(pages), reason='no_api_key')
+        return [get_fallback_suggestions(industry, seo_data) for seo_data, _ in pages]
+
+    # Pages answered before (on their own or in a batch) are not sent again
+    cache = get_suggestion_cache()
+    cache_keys = [None] * len(pages)
+    todo = []
+    for index, (seo_data, issues) in enumerate(pages):
+        inputs = prompt_inputs(industry, seo_data, issues)
+        if cache is not None:
+            single_key = suggestion_cache_key(inputs, MODEL_NAME, TEMPERATURE, MAX_OUTPUT_TOKENS, PROMPT_VERSION)
+            cache_keys[index] = batch_cache_key(inputs)
+            results[index] = cache.get(single_key) or cache.get(cache_keys[index])
+        if results[index] is None:
+            todo.append((index, inputs))
+    if len(todo) < len(pages):
+        print(f"♻️ Reusing cached AI recommendations for {len(pages) - len(todo)} pages")
+
+    retry = []
+    summaries = [build_page_summary(inputs) for _, inputs in todo]
+    for batch in plan_batches(industry, summaries, max_pages):
+        if len(batch) == 1:
+            # A page on its own gets the full single-page prompt
+            retry.append(todo[batch[0]][0])
+            continue
+        prompt = build_batch_prompt(industry, [summaries[position] for position in batch])
+        print(f"🤖 Generating AI recommendations for {len(batch)} pages in one request...")
+        try:
+            result_text = get_llm_client(api_key).generate(
+                prompt, max_output_tokens=min(BATCH_OUTPUT_TOKENS, OUTPUT_TOKENS_PER_PAGE * len(batch)))
+        except LLMUnavailable as e:
+            print(f"⚠️ {e}, using fallback SEO suggestions for {len(batch)} pages")
+            LLM_FALLBACKS.inc(len(batch), reason='unavailable')
+            BATCH_PAGES_TOTAL.inc(len(batch), outcome='unavailable')
+            for position in batch:
+                index = todo[position][0]
+                results[index] = get_fallback_suggestions(industry, pages[index][0])
+            continue
+        except Exception as e:
+            print(f"❌ Error with batched Gemini request: {e}")
+            metrics.error('llm', e)
+            BATCH_PAGES_TOTAL.inc(len(batch), outcome='error')
+            retry.extend(todo[position][0] for position in batch)
+            continue
+
+        parsed = parse_batch_suggestions(result_text, len(batch))
+        for number, position in enumerate(batch, 1):
+            index = todo[position][0]
+            if number in parsed:
+                results[index] = parsed[number]
+                if cache is not None:
+                    cache.set(cache_keys[index], parsed[number])
+            else:
+                retry.append(index)
+        BATCH_PAGES_TOTAL.inc(len(parsed), outcome='parsed')
+        BATCH_PAGES_TOTAL.inc(len(batch) - len(parsed), outcome='retried')
+        print(f"✅ Parsed AI recommendations for {len(parsed)}/{len(batch)} pages")
+
+    if retry:
+        print(f"🔄 Asking again for {len(retry)} pages one at a time")
+    for index in sorted(retry):
+        seo_data, issues = pages[index]
+        results[index] = get_seo_suggestions(industry, seo_data, issues)
+    return results
 
 
 def get_fallback_suggestions(industry, seo_data=None):
@@ -250,7 +646,7 @@ def get_fallback_suggestions(industry, seo_data=None):
             f"Benefits of Professional {industry}",
             f"Common {industry} Challenges We Solve",
             f"Our {industry} Service Areas",
-            f"Client Success Stories and Testimonials",
+            "Client Success Stories and Testimonials",
             f"Get Started with {industry} Today"
         ],
         'keywords': [
@@ -0,0 +1,173 @@
+import hashlib
+import marshal
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import metrics
+from analyzer import SCORING_VERSION
+from env import env_int
+from extractor import EXTRACTOR_VERSION
+from records import RECORD_FORMAT, SeoData, as_record
+
+# Memo backend: 'memory' (per process), 'sqlite' (shared between worker
+# processes and restarts) or 'off'
+MEMO_BACKEND = os.getenv('SEO_MEMO_BACKEND', 'memory').lower()
+MEMO_SIZE = env_int('SEO_MEMO_SIZE', 2000)
+MEMO_PATH = os.getenv('SEO_MEMO_PATH', os.path.join(
+    os.getenv('SEO_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seo_cache')),
+    'memo.sqlite3'))
+
+
+class MemoryMemoStore:
+    """Per-process LRU of serialised results"""
+
+    def __init__(self, max_entries=MEMO_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'backend': 'memory', 'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class SqliteMemoStore:
+    """LRU of serialised results in a SQLite file, shared across processes"""
+
+    def __init__(self, path=MEMO_PATH, max_entries=MEMO_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, value BLOB NOT NULL, last_access REAL NOT NULL)')
+        self._connection().execute('CREATE INDEX IF NOT EXISTS memo_last_access ON memo (last_access)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT value FROM memo WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute('UPDATE memo SET last_access = ? WHERE key = ?', (time.time(), key))
+        self.hits += 1
+        return zlib.decompress(row[0])
+
+    def set(self, key, value):
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO memo (key, value, last_access) VALUES (?, ?, ?)',
+                     (key, zlib.compress(value), time.time()))
+        count = conn.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+        if count > self.max_entries:
+            conn.execute('DELETE FROM memo WHERE key IN (SELECT key FROM memo ORDER BY last_access LIMIT ?)',
+                         (count - self.max_entries,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM memo')
+
+    def stats(self):
+        entries = self._connection().execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+        return {'backend': 'sqlite', 'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+
+def memo_key(page, collect_links, backend_name):
+    """
+    Content address of an analysis: the page bytes plus everything else the
+    result depends on (URL, which decides internal vs external links, the
+    parser backend and the extractor and scoring rule versions). Download
+    time and status are not part of the key; they are patched in on a hit.
+    Pages cut off at the size cap also key on their full size.
+    """
+    digest = hashlib.sha256(page['content']).hexdigest()
+    if page.get('truncated'):
+        digest = f"{digest}/{page['size_bytes']}"
+    return (f"{digest}:{page['url']}:{backend_name}:{int(collect_links)}:"
+            f"{EXTRACTOR_VERSION}:{SCORING_VERSION}:{RECORD_FORMAT}")
+
+
+def lookup(store, key, page):
+    """
+    Return (seo_data, analysis) for a memoized page, or None. analysis is
+    None when only the seo_data was stored, or when this fetch's timing or
+    status differ from the stored run and the page must be re-scored.
+    """
+    value = store.get(key)
+    metrics.cache_lookup('memo', value is not None)
+    if value is None:
+        return None
+    record, analysis = marshal.loads(value)
+    seo_data = SeoData.from_bytes(record)
+
+    load_time = round(page['load_time'], 2)
+    if seo_data['load_time'] != load_time or seo_data['status_code'] != page['status_code']:
+        seo_data['load_time'] = load_time
+        seo_data['status_code'] = page['status_code']
+        analysis = None
+    return seo_data, analysis
+
+
+def remember(store, key, seo_data, analysis=None):
+    """Store seo_data (and optionally its analysis, without embedded seo_data)"""
+    if analysis is not None:
+        analysis = {k: v for k, v in analysis.items() if k != 'seo_data'}
+    store.set(key, marshal.dumps((as_record(seo_data).to_bytes(), analysis), 4))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_memo_store():
+    """Return the process-wide memo store, or None when memoization is off"""
+    global _store
+
+    if MEMO_BACKEND == 'off':
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if MEMO_BACKEND == 'sqlite':
+                    _store = SqliteMemoStore()
+                else:
+                    _store = MemoryMemoStore()
+    return _store
@@ -0,0 +1,253 @@
+"""
+In-process metrics in the Prometheus text format
+
+Counters, histograms and callback gauges, registered at import time by the
+modules that use them and rendered by the /metrics endpoint:
+
+    STAGE_SECONDS = metrics.histogram('seo_stage_seconds', 'Time per analysis stage', ['stage'])
+    with STAGE_SECONDS.time(stage='parse'):
+        ...
+
+Metrics are off unless SEO_METRICS=1 (or enable() is called). While off,
+inc() and observe() return straight away and time() hands out a shared
+no-op context manager, so instrumented code costs little more than a function call.
+
+Values are per process: work done in the parse worker processes (see
+workers.py) is not counted.
+"""
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.getenv('SEO_METRICS', '0') == '1'
+
+# Latency buckets in seconds, from sub-millisecond parsing to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def enable(flag=True):
+    """Turn recording on or off for the whole process"""
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _NullTimer:
+    """Stands in for a timer while metrics are off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        try:
+            return tuple(labels[name] for name in self.labels)
+        except KeyError as e:
+            raise ValueError(f"Metric {self.name} needs label {e}") from None
+
+    def _samples(self):
+        """The metric's sample lines in the text exposition format"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """A count that only goes up, per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class _Timer:
+    __slots__ = ('metric', 'labels', 'start')
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metric.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds, usually) over fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the time spent inside it"""
+        if not ENABLED:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A current value, read from a callback when the metrics are rendered"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, function):
+        super().__init__(name, help_text)
+        self.function = function
+
+    def _samples(self):
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        return [] if value is None else [f"{self.name} {_number(value)}"]
+
+
+def _register(metric):
+    with _registry_lock:
+        for existing in _registry:
+            if existing.name == metric.name:
+                # Re-imports (e.g. reloading a module) get the original metric
+                return existing
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, help_text, labels=()):
+    return _register(Counter(name, help_text, labels))
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, labels, buckets))
+
+
+def gauge(name, help_text, function):
+    return _register(Gauge(name, help_text, function))
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# ========================================
+# Metrics shared by several modules
+# ========================================
+
+STAGE_SECONDS = histogram('seo_stage_seconds', 'Time spent in each analysis stage', ['stage'])
+CACHE_LOOKUPS = counter('seo_cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result'])
+ERRORS = counter('seo_errors_total', 'Errors by stage and exception type', ['stage', 'type'])
+
+
+def cache_lookup(cache, hit):
+    """Count one lookup in the named cache"""
+    if ENABLED:
+        CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def error(stage, exception):
+    """Count one error of the given stage, labelled with the exception type"""
+    if ENABLED:
+        ERRORS.inc(stage=stage, type=type(exception).__name__)
@@ -0,0 +1,127 @@
+import importlib
+import os
+
+from bs4 import BeautifulSoup
+
+from extractor import extract_seo_data
+
+# Environment variable used to pick the backend for the whole process
+PARSER_ENV_VAR = 'SEO_PARSER_BACKEND'
+
+
+class ParserBackend:
+    """
+    A way of turning raw HTML bytes into the BeautifulSoup tree that the
+    extraction engine walks. Backends only differ in the tree builder, so
+    every backend goes through exactly the same extraction code.
+    """
+
+    def __init__(self, name, features, requires=None, description=''):
+        self.name = name
+        self.features = features
+        self.requires = requires
+        self.description = description
+
+    def is_available(self):
+        """Check whether the backend's optional dependency is installed"""
+        if not self.requires:
+            return True
+        try:
+            importlib.import_module(self.requires)
+            return True
+        except ImportError:
+            return False
+
+    def parse(self, raw):
+        """Parse raw HTML (bytes or str) into a soup"""
+        return BeautifulSoup(raw, self.features)
+
+    def __repr__(self):
+        return f"ParserBackend({self.name!r})"
+
+
+# Registered backends. html.parser is the default: scores have always been
+# computed with it, and lxml repairs malformed markup differently (other
+# titles, headings, links and word counts, so other scores). lxml is opt-in.
+PARSER_BACKENDS = {
+    'html.parser': ParserBackend(
+        'html.parser', 'html.parser',
+        description="Python's built-in html.parser (the default)"),
+    'lxml': ParserBackend(
+        'lxml', 'lxml', requires='lxml',
+        description='libxml2 tokenizer via lxml (opt-in; may differ on malformed pages)'),
+}
+DEFAULT_BACKEND = 'html.parser'
+
+_active_backend = None
+
+
+def available_backends():
+    """Names of the backends that can be used in this environment"""
+    return [name for name, backend in PARSER_BACKENDS.items() if backend.is_available()]
+
+
+def set_parser_backend(name):
+    """
+    Select the parser backend for this process.
+    Raises ValueError for unknown or unavailable backends.
+    """
+    global _active_backend
+
+    backend = PARSER_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown parser backend '{name}' (choose from {', '.join(PARSER_BACKENDS)})")
+    if not backend.is_available():
+        raise ValueError(f"Parser backend '{name}' is not available (missing '{backend.requires}' module)")
+
+    _active_backend = backend
+    return backend
+
+
+def get_parser_backend():
+    """
+    Return the backend for this process, choosing it on first use:
+    SEO_PARSER_BACKEND if set, otherwise DEFAULT_BACKEND.
+    """
+    global _active_backend
+
+    if _active_backend is None:
+        requested = os.getenv(PARSER_ENV_VAR, '').strip()
+        if requested:
+            try:
+                return set_parser_backend(requested)
+            except ValueError as e:
+                print(f"⚠️ {e}. Falling back to the default parser.")
+        _active_backend = PARSER_BACKENDS[DEFAULT_BACKEND]
+        print(f"🧩 Using '{_active_backend.name}' HTML parser backend")
+
+    return _active_backend
+
+
+def parse_html(raw):
+    """Parse raw HTML with this process's backend"""
+    return get_parser_backend().parse(raw)
+
+
+def check_parity(raw, url, backends=None, reference='html.parser'):
+    """
+    Extract seo_data from the same page with several backends and compare.
+
+    Returns a dict mapping each backend name to the list of seo_data fields
+    that differ from the reference backend's output. The reference defaults
+    to html.parser, which is what scores were historically computed with.
+    An empty list everywhere means the backends agree on every field.
+    """
+    names = [reference] + [n for n in (backends or available_backends()) if n != reference]
+    results = {
+        name: extract_seo_data(PARSER_BACKENDS[name].parse(raw), url, page_size_kb=len(raw) / 1024)
+        for name in names
+    }
+
+    expected = results[reference]
+    mismatches = {}
+    for name in names:
+        data = results[name]
+        keys = set(expected) | set(data)
+        mismatches[name] = sorted(k for k in keys if expected.get(k) != data.get(k))
+    return mismatches
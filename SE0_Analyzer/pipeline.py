@@ -0,0 +1,522 @@
+"""
+Asyncio bulk analysis pipeline
+
+Takes a list of URLs and streams out one result per URL as soon as it is
+ready. Pages flow through three stages connected by bounded queues:
+
+    fetch (I/O, bounded globally and scheduled politely per host)
+      -> parse + score (CPU, fed by a queue)
+        -> optional AI suggestions (I/O, several pages per request)
+
+In incremental mode every page is compared with its last snapshot in the
+analysis history: pages whose content is unchanged are not parsed or
+scored again, changed pages get a field-level diff, and AI suggestions are
+only requested again when their inputs changed. Pages that come with a
+sitemap lastmod older than their last snapshot are not even fetched.
+
+Command line (from the SE0_Analyzer directory):
+    python pipeline.py urls.txt --out results.ndjson [--concurrency 32] [--incremental]
+    python pipeline.py --sitemap example.com --incremental [--limit 10000]
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import metrics
+from discovery import discover_urls
+from history import get_history_store, record_analysis
+from incremental import ANALYSIS_VERSION, content_hash, diff_seo_data, suggestion_inputs_changed
+from llm_helper import BATCH_PAGES, get_batch_suggestions
+from politeness import HostScheduler, polite_fetch
+from scraper import normalize_url, scheduled_fetch_page
+from workers import analyze_page, attach_seo_data, get_worker_pool
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PER_HOST = 4
+DEFAULT_SUGGEST_BELOW = 70
+
+# URLs pulled at a time from a lazy source (e.g. discover_urls)
+SOURCE_BATCH = 256
+# URLs waiting for their host's turn, per allowed fetch in flight
+PENDING_PER_FETCH = 16
+# Seconds a page waits for others to share its suggestion request
+SUGGEST_LINGER = 2.0
+
+
+def make_result(url, seo_data=None, analysis=None, suggestions=None, error=None, incremental=None):
+    """Build the dictionary the pipeline emits for one URL"""
+    result = {
+        'url': url,
+        'error': error,
+        'seo_data': seo_data,
+        'analysis': analysis,
+        'suggestions': suggestions,
+    }
+    if incremental is not None:
+        result['incremental'] = incremental
+    return result
+
+
+def compare_with_history(store, url, digest):
+    """
+    Look up the last snapshot of a URL. Returns (previous, unchanged):
+    previous holds its indexed columns and unchanged is True when the page
+    content and analysis rules are the same as then.
+    """
+    previous = store.latest_snapshot(url)
+    unchanged = (previous is not None and previous['content_hash'] == digest
+                 and previous['analysis_version'] == ANALYSIS_VERSION)
+    return previous, unchanged
+
+
+def unchanged_report(previous, **extra):
+    """The 'incremental' part of a result for a page that was not reanalyzed"""
+    report = {
+        'status': 'unchanged',
+        'previous_snapshot': previous['id'],
+        'previous_score': previous['score'],
+        'analyzed_at': previous['created_at'],
+    }
+    report.update(extra)
+    return report
+
+
+def not_modified_since(store, url, lastmod):
+    """
+    The last snapshot of a URL if it was taken (under the current analysis
+    rules) after the page's lastmod, else None
+    """
+    previous = store.latest_snapshot(url)
+    if (previous is not None and previous['analysis_version'] == ANALYSIS_VERSION
+            and previous['created_at'] >= lastmod):
+        return previous
+    return None
+
+
+def incremental_report(previous, previous_full, seo_data, analysis):
+    """The 'incremental' part of a result for a page that was (re)analyzed"""
+    if previous is None:
+        return {'status': 'new', 'changes': []}
+    changes = diff_seo_data(previous_full['seo_data'], seo_data) if previous_full else []
+    return {
+        'status': 'changed',
+        'previous_snapshot': previous['id'],
+        'previous_score': previous['score'],
+        'score_change': analysis['score'] - previous['score'],
+        'regressions': sum(1 for change in changes if change['regression']),
+        'changes': changes,
+    }
+
+
+class SuggestionBatcher:
+    """
+    Collects the pages that need AI suggestions and asks for them
+    batch_size at a time (see llm_helper.get_batch_suggestions). A batch
+    goes out when it is full or when its first page has waited linger
+    seconds, whichever comes first.
+    """
+
+    def __init__(self, industry, executor, batch_size=BATCH_PAGES, linger=SUGGEST_LINGER):
+        self.industry = industry
+        self.executor = executor
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self._waiting = []  # (seo_data, issues, future)
+        self._timer = None
+        self._requests = set()
+
+    async def suggest(self, seo_data, issues):
+        """The page's suggestions, once its batch has been answered"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((seo_data, issues, future))
+        if len(self._waiting) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        waiting, self._waiting = self._waiting, []
+        if waiting:
+            request = asyncio.ensure_future(self._request(waiting))
+            self._requests.add(request)
+            request.add_done_callback(self._requests.discard)
+
+    async def _request(self, waiting):
+        pages = [(seo_data, issues) for seo_data, issues, _ in waiting]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, get_batch_suggestions, self.industry, pages, self.batch_size)
+        except Exception as e:
+            for _, _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), suggestions in zip(waiting, results):
+            if not future.done():
+                future.set_result(suggestions)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for request in list(self._requests):
+            request.cancel()
+
+
+class BulkPipeline:
+    """
+    Concurrent fetch -> parse/score -> suggest pipeline.
+
+    concurrency bounds the number of fetches in flight overall. Fetches to
+    each host are paced by a HostScheduler (see politeness.py): per_host
+    bounds them per host, on top of the host's rate limit, Crawl-delay and
+    backoff. Pages disallowed by robots.txt are reported as errors unless
+    respect_robots is False. CPU work never blocks the event loop: it runs on
+    parse_executor if one is supplied, on the shared process pool from
+    workers.py when workers is set, and on a single worker thread otherwise.
+    When industry is set, pages scoring below suggest_below also get AI
+    suggestions, asked for suggest_batch pages per request (at most
+    concurrency; 1 sends every page on its own). record_history stores
+    every analysis in the history store; incremental (which implies it)
+    skips pages unchanged since their last snapshot.
+
+    The URLs may be any iterable, including a lazy one such as
+    discover_urls(), of URL strings or (url, lastmod) pairs like
+    SitemapEntry; lastmod is a Unix timestamp or None.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 industry=None, suggest_below=DEFAULT_SUGGEST_BELOW, suggest_batch=BATCH_PAGES,
+                 parse_executor=None, workers=None, incremental=False, record_history=False,
+                 respect_robots=True):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.respect_robots = respect_robots
+        self.industry = industry
+        self.suggest_below = suggest_below
+        self.suggest_batch = max(1, suggest_batch)
+        self.history = get_history_store() if (incremental or record_history) else None
+        if incremental and self.history is None:
+            print("⚠️ Analysis history is disabled (SEO_HISTORY=0), analyzing every page", file=sys.stderr)
+        self.incremental = incremental and self.history is not None
+        if parse_executor is None and workers:
+            parse_executor = get_worker_pool(workers).executor
+        self.parse_executor = parse_executor
+
+    async def run(self, urls):
+        """Analyze the URLs, yielding results in completion order"""
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='seo-fetch')
+        cpu_pool = self.parse_executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='seo-parse')
+
+        page_queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        result_queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        scheduler = HostScheduler(per_host=self.per_host, respect_robots=self.respect_robots, executor=io_pool)
+        fetch_slots = asyncio.Semaphore(self.concurrency)
+        # URLs taken from the source but not fetched yet (most of them
+        # waiting for their host's turn); bounds memory for huge sources
+        pending = asyncio.Semaphore(self.concurrency * PENDING_PER_FETCH)
+        fetches = set()
+        # Each scorer waits for its page's suggestions before taking the next
+        # page, so a batch larger than the scorer count could never fill
+        suggester = (SuggestionBatcher(self.industry, io_pool, min(self.suggest_batch, self.concurrency))
+                     if self.industry else None)
+        done = object()
+
+        async def batches():
+            if isinstance(urls, (list, tuple)):
+                yield urls
+                return
+            # A lazy source may do network I/O, so it is read off the event loop
+            source = iter(urls)
+            while True:
+                batch = await loop.run_in_executor(io_pool, list, itertools.islice(source, SOURCE_BATCH))
+                if not batch:
+                    return
+                yield batch
+
+        async def produce():
+            async for batch in batches():
+                for item in batch:
+                    url, lastmod = (item, None) if isinstance(item, str) else item
+                    await pending.acquire()
+                    task = asyncio.ensure_future(fetch(normalize_url(url), lastmod))
+                    fetches.add(task)
+                    task.add_done_callback(fetches.discard)
+            await asyncio.gather(*list(fetches))
+
+        async def fetch(url, lastmod):
+            try:
+                # Listed as last modified before its last analysis: no need to fetch it
+                if self.incremental and lastmod is not None:
+                    previous = await loop.run_in_executor(io_pool, not_modified_since, self.history, url, lastmod)
+                    if previous is not None:
+                        await result_queue.put(make_result(url, incremental=unchanged_report(
+                            previous, lastmod=lastmod)))
+                        return
+
+                rules = await scheduler.robots(url)
+                if not rules.allowed(url):
+                    # An unreachable robots.txt blocks the site too, but it is a fetch failure
+                    error = ("Could not fetch robots.txt / website" if rules.unreachable
+                             else "Blocked by the site's robots.txt")
+                    await result_queue.put(make_result(url, error=error))
+                    return
+                try:
+                    page = await polite_fetch(scheduler, url, scheduled_fetch_page, io_pool, fetch_slots)
+                except requests.exceptions.RequestException as e:
+                    metrics.error('fetch', e)
+                    await result_queue.put(make_result(url, error=f"Could not fetch website: {str(e)}"))
+                    return
+                await page_queue.put(page)
+            except Exception as e:
+                # Whatever went wrong, it only costs this URL its result
+                metrics.error('fetch', e)
+                await result_queue.put(make_result(url, error=f"Error fetching website: {str(e)}"))
+            finally:
+                pending.release()
+
+        async def score_stage():
+            while True:
+                page = await page_queue.get()
+                if page is None:
+                    return
+                url = page['url']
+                digest = content_hash(page['content']) if self.history is not None else None
+
+                # Same bytes as the last snapshot: nothing to parse, score or suggest
+                previous = None
+                if self.incremental:
+                    previous, unchanged = await loop.run_in_executor(
+                        io_pool, compare_with_history, self.history, url, digest)
+                    if unchanged:
+                        await result_queue.put(make_result(url, incremental=unchanged_report(previous)))
+                        continue
+
+                try:
+                    seo_data, analysis = await loop.run_in_executor(cpu_pool, analyze_page, page)
+                except Exception as e:
+                    metrics.error('parse', e)
+                    await result_queue.put(make_result(url, error=f"Error analyzing website: {str(e)}"))
+                    continue
+                attach_seo_data(seo_data, analysis)
+
+                report = previous_full = None
+                if self.incremental:
+                    if previous is not None:
+                        # With the page text, which the suggestion prompt quotes from
+                        previous_full = await loop.run_in_executor(
+                            io_pool, functools.partial(self.history.get_snapshot, previous['id'], include_text=True))
+                    report = incremental_report(previous, previous_full, seo_data, analysis)
+
+                suggestions = None
+                if self.industry and analysis['score'] < self.suggest_below:
+                    if previous_full and not suggestion_inputs_changed(
+                            self.industry, previous_full, seo_data, analysis['issues']):
+                        suggestions = previous_full['suggestions']
+                        report['suggestions_reused'] = True
+                    else:
+                        suggestions = await suggester.suggest(seo_data, analysis['issues'])
+
+                if self.history is not None:
+                    await loop.run_in_executor(
+                        io_pool, functools.partial(record_analysis, seo_data, analysis, self.industry,
+                                                   content_hash=digest, analysis_version=ANALYSIS_VERSION,
+                                                   suggestions=suggestions))
+                await result_queue.put(make_result(url, seo_data, analysis, suggestions, incremental=report))
+
+        async def supervise():
+            scorers = [asyncio.ensure_future(score_stage()) for _ in range(self.concurrency)]
+            try:
+                await produce()
+                for _ in scorers:
+                    await page_queue.put(None)
+                await asyncio.gather(*scorers)
+            finally:
+                for task in list(fetches) + scorers:
+                    task.cancel()
+                if suggester is not None:
+                    suggester.close()
+                await result_queue.put(done)
+
+        supervisor = asyncio.ensure_future(supervise())
+        try:
+            while True:
+                result = await result_queue.get()
+                if result is done:
+                    break
+                yield result
+            await supervisor
+        finally:
+            if not supervisor.done():
+                supervisor.cancel()
+            io_pool.shutdown(wait=False)
+            if self.parse_executor is None:
+                cpu_pool.shutdown(wait=False)
+
+
+def run_bulk(urls, **options):
+    """
+    Synchronous helper: analyze the URLs with a BulkPipeline and return the
+    list of results (in completion order).
+    """
+    async def collect():
+        return [result async for result in BulkPipeline(**options).run(urls)]
+    return asyncio.run(collect())
+
+
+def iter_bulk(urls, **options):
+    """
+    Synchronous generator over BulkPipeline results, for callers without an
+    event loop (e.g. a streaming Flask response). The pipeline runs on its
+    own thread and only a few finished results are buffered, so a slow
+    reader slows the pipeline down. Closing the generator early stops it.
+    """
+    results = queue.Queue(maxsize=DEFAULT_CONCURRENCY)
+    stop = threading.Event()
+    finished = object()
+
+    def offer(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def drive():
+        stream = BulkPipeline(**options).run(urls)
+        try:
+            async for result in stream:
+                if not offer(result):
+                    break
+        finally:
+            await stream.aclose()
+
+    def runner():
+        try:
+            asyncio.run(drive())
+        except Exception as e:
+            offer(e)
+        finally:
+            offer(finished)
+
+    thread = threading.Thread(target=runner, name='seo-bulk', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def result_to_json(result, include_text=False):
+    """Serialise a pipeline result, dropping the bulky text_content by default"""
+    analysis = result['analysis']
+    seo_data = result['seo_data']
+    if seo_data is not None:
+        # (keys only, so a record's compressed text is not unpacked for nothing)
+        seo_data = {k: seo_data[k] for k in seo_data if include_text or k != 'text_content'}
+    if analysis is not None:
+        analysis = {k: v for k, v in analysis.items() if k != 'seo_data'}
+    output = {
+        'url': result['url'],
+        'error': result['error'],
+        'analysis': analysis,
+        'seo_data': seo_data,
+        'suggestions': result['suggestions'],
+    }
+    if 'incremental' in result:
+        output['incremental'] = result['incremental']
+    return json.dumps(output)
+
+
+async def _write_results(urls, out, options):
+    count = errors = unchanged = 0
+    start = time.time()
+    async for result in BulkPipeline(**options).run(urls):
+        out.write(result_to_json(result) + '\n')
+        count += 1
+        if result['error']:
+            errors += 1
+        elif result.get('incremental', {}).get('status') == 'unchanged':
+            unchanged += 1
+        if count % 100 == 0:
+            rate = count / (time.time() - start)
+            total = f"/{len(urls)}" if isinstance(urls, list) else ''
+            print(f"📊 {count}{total} pages analyzed ({rate:.1f} pages/s, {errors} errors, "
+                  f"{unchanged} unchanged)", file=sys.stderr)
+    return count, errors, unchanged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk SEO analysis of a list of URLs')
+    parser.add_argument('urls', nargs='?', help='text file with one URL per line')
+    parser.add_argument('--sitemap', help="analyze the pages in a site's sitemaps (site or sitemap URL)")
+    parser.add_argument('--limit', type=int, help='with --sitemap: analyze at most this many pages')
+    parser.add_argument('--out', help='NDJSON output file (default: stdout)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='fetches in flight overall')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help='fetches in flight per host')
+    parser.add_argument('--industry', help='get AI suggestions for low-scoring pages in this industry')
+    parser.add_argument('--suggest-batch', type=int, default=BATCH_PAGES,
+                        help='pages per AI suggestion request (1: one request per page)')
+    parser.add_argument('--workers', type=int, help='parse/score in this many worker processes')
+    parser.add_argument('--incremental', action='store_true',
+                        help='skip pages unchanged since their last analysis and report what changed')
+    parser.add_argument('--record', action='store_true', help='store every analysis in the history')
+    parser.add_argument('--ignore-robots', action='store_true', help='also fetch pages disallowed by robots.txt')
+    args = parser.parse_args(argv)
+    if bool(args.urls) == bool(args.sitemap):
+        parser.error('give either a URL file or --sitemap')
+
+    if args.sitemap:
+        urls = discover_urls(args.sitemap, limit=args.limit, respect_robots=not args.ignore_robots)
+    else:
+        with open(args.urls, encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    options = {
+        'concurrency': args.concurrency,
+        'per_host': args.per_host,
+        'industry': args.industry,
+        'suggest_batch': args.suggest_batch,
+        'workers': args.workers,
+        'incremental': args.incremental,
+        'record_history': args.record,
+        'respect_robots': not args.ignore_robots,
+    }
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    try:
+        start = time.time()
+        count, errors, unchanged = asyncio.run(_write_results(urls, out, options))
+    finally:
+        if args.out:
+            out.close()
+
+    print(f"✅ Analyzed {count} pages in {time.time() - start:.1f}s ({errors} errors, {unchanged} unchanged)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
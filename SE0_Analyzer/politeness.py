@@ -0,0 +1,335 @@
+"""
+Per-host politeness for outgoing page fetches
+
+HostScheduler decides when each fetch may start. Every host gets its own
+FIFO queue of waiting fetches and its own limits:
+
+    - robots.txt, fetched once per site and cached (see robots.get_robots)
+    - a token bucket: `rate` requests per second with bursts of `burst`,
+      or one request per Crawl-delay seconds when robots.txt sets one
+    - at most `per_host` fetches in flight
+
+and adapts to how the host copes. A 429 or 503 answer doubles the gap
+between requests and pauses the host for its Retry-After (or the new
+gap). So does a time to first byte rising well above the level it had
+settled at, since that means the host is struggling under the load. Fetches that go
+well win the speed back gradually.
+
+Hosts never wait on each other: a fetch waiting for its host's turn holds
+no worker or global slot, so a slow or throttled site does not hold up the
+rest of a batch. All of this runs on one asyncio event loop:
+
+    scheduler = HostScheduler(per_host=4)
+    if await scheduler.allowed(url):
+        page = await polite_fetch(scheduler, url, scheduled_fetch_page, io_pool)
+"""
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import metrics
+from env import env_float
+from robots import RobotsRules, get_robots
+
+
+# Requests per second to one host, and how many may go out back to back
+HOST_RATE = env_float('SEO_HOST_RATE', 2)
+HOST_BURST = env_float('SEO_HOST_BURST', 4)
+# Fetches in flight to one host
+HOST_CONCURRENCY = int(env_float('SEO_HOST_CONCURRENCY', 4))
+# The longest gap backoff leaves between two requests to a host (seconds)
+MAX_INTERVAL = env_float('SEO_HOST_MAX_INTERVAL', 60)
+# Crawl-delay values above this are capped rather than obeyed literally
+MAX_CRAWL_DELAY = env_float('SEO_MAX_CRAWL_DELAY', 30)
+
+# Statuses that mean "slow down"
+THROTTLE_STATUSES = frozenset([429, 503])
+# An average TTFB this many times its reference level (the best seen, or
+# the level at the last slowdown), and at least TTFB_MARGIN seconds above
+# it, counts as the host struggling
+TTFB_SLOWDOWN = 2.5
+TTFB_MARGIN = 0.25
+# Weight of the latest TTFB in the moving average
+TTFB_ALPHA = 0.2
+# Backoff factor when slowing down and recovery factor per good fetch
+BACKOFF = 2.0
+RECOVERY = 0.9
+# Idle hosts are forgotten once more than this many are known
+MAX_HOSTS = 10000
+# Times polite_fetch tries a page again after a 429/503, once the host's
+# backoff allows
+THROTTLE_RETRIES = 2
+
+BACKOFFS = metrics.counter('seo_host_backoffs_total', 'Per-host slowdowns by reason', ['reason'])
+WAIT_SECONDS = metrics.histogram('seo_host_wait_seconds', 'Time fetches waited for their host')
+
+
+def retry_after_seconds(value):
+    """Seconds asked for by a Retry-After header (seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class _Host:
+    """Scheduling state of one host"""
+
+    __slots__ = ('name', 'robots', 'robots_loading', 'base_interval', 'interval', 'burst', 'limit',
+                 'tokens', 'updated', 'not_before', 'in_flight', 'waiters', 'timer',
+                 'ttfb', 'best_ttfb')
+
+    def __init__(self, name, rate, burst, limit):
+        self.name = name
+        self.robots = None
+        self.robots_loading = None
+        self.base_interval = 1.0 / rate
+        self.interval = self.base_interval
+        self.burst = burst
+        self.limit = limit
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self.in_flight = 0
+        self.waiters = deque()
+        self.timer = None
+        self.ttfb = None
+        self.best_ttfb = None
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    @property
+    def idle(self):
+        return not self.waiters and self.in_flight == 0 and self.robots_loading is None
+
+
+class Slot:
+    """One fetch's turn at a host; record() reports how the fetch went"""
+
+    __slots__ = ('scheduler', 'host', 'url', 'status', 'ttfb', 'retry_after')
+
+    def __init__(self, scheduler, host, url):
+        self.scheduler = scheduler
+        self.host = host
+        self.url = url
+        self.status = None
+        self.ttfb = None
+        self.retry_after = None
+
+    def record(self, status=None, ttfb=None, retry_after=None):
+        """status code, time to first byte (seconds) and Retry-After header of the response"""
+        self.status = status
+        self.ttfb = ttfb
+        self.retry_after = retry_after
+
+    async def __aenter__(self):
+        await self.scheduler._acquire(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.scheduler._release(self)
+        return False
+
+
+class HostScheduler:
+    """
+    Per-host queues, rate limits and backoff for fetches made from one
+    event loop (see the module docstring). robots.txt files are fetched on
+    executor, the loop's default executor if None.
+    """
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, per_host=HOST_CONCURRENCY,
+                 respect_robots=True, executor=None):
+        self.rate = max(0.01, rate)
+        self.burst = max(1.0, burst)
+        self.per_host = max(1, per_host)
+        self.respect_robots = respect_robots
+        self.executor = executor
+        self._hosts = {}
+
+    def _host(self, url):
+        # Host and port: what robots.txt and server capacity are per
+        name = url.split('/', 3)[2].lower() if '://' in url else url.lower()
+        host = self._hosts.get(name)
+        if host is None:
+            if len(self._hosts) >= MAX_HOSTS:
+                self._forget_idle()
+            host = self._hosts[name] = _Host(name, self.rate, self.burst, self.per_host)
+            if not self.respect_robots:
+                host.robots = RobotsRules.allow_all()
+        return host
+
+    def _forget_idle(self):
+        for name in [name for name, host in self._hosts.items() if host.idle]:
+            del self._hosts[name]
+
+    async def robots(self, url):
+        """The robots.txt rules of a URL's site, loaded once per scheduler"""
+        host = self._host(url)
+        if host.robots is None:
+            if host.robots_loading is None:
+                host.robots_loading = asyncio.ensure_future(self._load_robots(host, url))
+            # Shielded: other fetches to the host are waiting on the same load
+            await asyncio.shield(host.robots_loading)
+        return host.robots
+
+    async def _load_robots(self, host, url):
+        try:
+            robots = await asyncio.get_running_loop().run_in_executor(self.executor, get_robots, url)
+            self._apply_robots(host, robots)
+        finally:
+            host.robots_loading = None
+
+    def _apply_robots(self, host, robots):
+        host.robots = robots
+        delay = robots.crawl_delay()
+        if delay is not None and delay > 0:
+            # Crawl-delay: one request at a time, at most one per delay
+            delay = min(delay, MAX_CRAWL_DELAY)
+            host.base_interval = max(host.base_interval, delay)
+            host.interval = max(host.interval, host.base_interval)
+            host.burst = 1.0
+            host.tokens = min(host.tokens, 1.0)
+            host.limit = 1
+
+    async def allowed(self, url):
+        """Whether robots.txt lets us fetch the URL"""
+        return (await self.robots(url)).allowed(url)
+
+    def slot(self, url):
+        """Async context manager that waits for the URL's host to allow a fetch"""
+        return Slot(self, self._host(url), url)
+
+    # ========================================
+    # Queueing
+    # ========================================
+
+    async def _acquire(self, slot):
+        host = slot.host
+        if host.robots is None:
+            # (Crawl-delay must be known before the first request)
+            await self.robots(slot.url)
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        host.waiters.append(waiter)
+        self._pump(host)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller gave up: hand the turn back
+                host.in_flight -= 1
+                self._pump(host)
+            raise
+        WAIT_SECONDS.observe(time.monotonic() - start)
+
+    def _pump(self, host):
+        """Start as many waiting fetches as the host's limits allow"""
+        if host.timer is not None:
+            host.timer.cancel()
+            host.timer = None
+        now = time.monotonic()
+        while host.waiters and host.in_flight < host.limit:
+            waiter = host.waiters[0]
+            if waiter.cancelled():
+                host.waiters.popleft()
+                continue
+            host.refill(now)
+            ready_at = max(host.not_before, now + (1 - host.tokens) * host.interval if host.tokens < 1 else now)
+            if ready_at > now:
+                loop = waiter.get_loop()
+                host.timer = loop.call_at(loop.time() + (ready_at - now), self._pump, host)
+                return
+            host.waiters.popleft()
+            host.tokens -= 1
+            host.in_flight += 1
+            waiter.set_result(None)
+
+    def _release(self, slot):
+        host = slot.host
+        host.in_flight -= 1
+        self._adapt(host, slot)
+        self._pump(host)
+
+    # ========================================
+    # Adaptive backoff
+    # ========================================
+
+    def _slow_down(self, host, reason, pause=None):
+        now = time.monotonic()
+        if now < host.not_before:
+            # Answers to requests sent before the last slowdown
+            if pause is not None:
+                host.not_before = max(host.not_before, now + pause)
+            return
+        host.refill(now)
+        host.interval = min(MAX_INTERVAL, max(host.interval * BACKOFF, host.base_interval))
+        host.tokens = min(host.tokens, 0.0)
+        host.not_before = max(host.not_before, now + (pause if pause is not None else host.interval))
+        BACKOFFS.inc(reason=reason)
+        print(f"🐢 {host.name} {'is throttling us' if reason == 'throttled' else 'is slowing down'}, "
+              f"now one request per {host.interval:.1f}s")
+
+    def _adapt(self, host, slot):
+        if slot.status in THROTTLE_STATUSES:
+            self._slow_down(host, 'throttled', retry_after_seconds(slot.retry_after))
+            return
+        if slot.status is None or slot.ttfb is None:
+            return
+
+        host.ttfb = slot.ttfb if host.ttfb is None else host.ttfb + TTFB_ALPHA * (slot.ttfb - host.ttfb)
+        if host.best_ttfb is None or host.ttfb < host.best_ttfb:
+            host.best_ttfb = host.ttfb
+        if host.ttfb > host.best_ttfb * TTFB_SLOWDOWN and host.ttfb - host.best_ttfb > TTFB_MARGIN:
+            self._slow_down(host, 'slow')
+            # Only a further rise slows the host down again
+            host.best_ttfb = host.ttfb
+        elif host.interval > host.base_interval:
+            host.refill(time.monotonic())
+            host.interval = max(host.base_interval, host.interval * RECOVERY)
+
+
+async def polite_fetch(scheduler, url, fetch, executor=None, limit=None, retries=THROTTLE_RETRIES):
+    """
+    Run fetch(url), a blocking fetch_page-like function, on executor once
+    the URL's host allows it, and report the outcome to the scheduler.
+    fetch must not retry 429/503 answers itself (use
+    scraper.scheduled_fetch_page): hidden retries would keep hammering the
+    host and count their backoff sleeps as time to first byte.
+    limit, an optional asyncio semaphore, bounds fetches across all hosts;
+    it is only taken when the host's turn has come. Pages answered with a
+    429 or 503 are tried again after the host's backoff, up to retries
+    times, before the HTTPError is raised.
+    """
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        async with scheduler.slot(url) as slot:
+            try:
+                if limit is None:
+                    page = await loop.run_in_executor(executor, fetch, url)
+                else:
+                    async with limit:
+                        page = await loop.run_in_executor(executor, fetch, url)
+            except requests.exceptions.HTTPError as e:
+                response = e.response
+                if response is None:
+                    raise
+                slot.record(response.status_code, retry_after=response.headers.get('Retry-After'))
+                if response.status_code not in THROTTLE_STATUSES or attempt >= retries:
+                    raise
+            else:
+                slot.record(page['status_code'], page.get('ttfb'))
+                return page
+        attempt += 1
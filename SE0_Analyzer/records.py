@@ -0,0 +1,279 @@
+"""
+Compact per-page SEO record
+
+SeoData holds the fields extracted from one page in __slots__ instead of a
+~40-key dictionary, keeps the page text compressed until it is read and
+interns the short categorical strings (language, robots, card types...)
+that repeat across the pages of a site. It behaves like the seo_data
+dictionary it replaces (seo_data['title'], .get(), 'x' in seo_data,
+.items(), extra keys such as 'links_checked'), and its attributes work in
+templates as before.
+
+to_bytes() / from_bytes() give a fast binary form for caches and for
+passing records between processes; the text stays compressed in it and is
+only decompressed if somebody reads text_content.
+"""
+import marshal
+import sys
+import zlib
+from collections.abc import MutableMapping
+
+# Bump when the binary form changes, so stored records are not misread
+RECORD_FORMAT = 1
+
+# marshal format version used for the binary form (stable since Python 3.4)
+_MARSHAL_VERSION = 4
+
+# Text shorter than this is kept as it is; compressing it saves too little
+TEXT_COMPRESS_MIN = 256
+
+# Every field and its default, in the order seo_data has always had them.
+# A list default means a new empty list for each record.
+FIELD_DEFAULTS = (
+    ('url', None),
+    ('status_code', 200),
+    ('load_time', 0.0),
+
+    # Basic Meta Tags
+    ('title', None),
+    ('title_length', 0),
+    ('meta_description', None),
+    ('meta_description_length', 0),
+    ('meta_keywords', None),
+    ('canonical_url', None),
+    ('meta_robots', None),
+
+    # Open Graph Tags
+    ('og_title', None),
+    ('og_description', None),
+    ('og_image', None),
+    ('og_type', None),
+
+    # Twitter Cards
+    ('twitter_card', None),
+    ('twitter_title', None),
+    ('twitter_description', None),
+
+    # Heading Structure
+    ('h1_tags', []),
+    ('h2_tags', []),
+    ('h3_tags', []),
+    ('h4_tags', []),
+
+    # Images
+    ('images', 0),
+    ('images_without_alt', 0),
+    ('images_with_alt', 0),
+
+    # Links
+    ('internal_links', 0),
+    ('external_links', 0),
+    ('broken_links', 0),
+
+    # Content Analysis
+    ('word_count', 0),
+    ('text_content', ''),
+    ('paragraph_count', 0),
+
+    # Technical SEO
+    ('has_https', False),
+    ('has_viewport', False),
+    ('has_favicon', False),
+    ('has_language', False),
+    ('language', None),
+    ('has_charset', False),
+    ('page_size_kb', 0.0),
+
+    # Structured Data
+    ('has_schema', False),
+    ('schema_types', []),
+)
+FIELDS = tuple(name for name, _ in FIELD_DEFAULTS)
+_FIELD_SET = frozenset(FIELDS)
+# Fields stored in their own slot (the text lives compressed in _text)
+_SLOT_FIELDS = tuple(name for name in FIELDS if name != 'text_content')
+
+# Short strings that take the same few values on many pages
+INTERNED_FIELDS = frozenset(['language', 'meta_robots', 'og_type', 'twitter_card'])
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class SeoData(MutableMapping):
+    """
+    The seo_data of one page. Fields are attributes; keys outside FIELDS
+    are kept in a small side dictionary, created only when one is set, and
+    must hold values marshal can store (None, bools, numbers, strings,
+    bytes and lists, tuples, sets and dicts of them).
+    """
+
+    __slots__ = _SLOT_FIELDS + ('_text', '_extra')
+
+    def __init__(self, url, status_code=200, load_time=0.0, page_size_kb=0.0):
+        # Every field, with its FIELD_DEFAULTS default unless given
+        self.url = url
+        self.status_code = status_code
+        self.load_time = round(load_time, 2)
+        self.title = None
+        self.title_length = 0
+        self.meta_description = None
+        self.meta_description_length = 0
+        self.meta_keywords = None
+        self.canonical_url = None
+        self.meta_robots = None
+        self.og_title = None
+        self.og_description = None
+        self.og_image = None
+        self.og_type = None
+        self.twitter_card = None
+        self.twitter_title = None
+        self.twitter_description = None
+        self.h1_tags = []
+        self.h2_tags = []
+        self.h3_tags = []
+        self.h4_tags = []
+        self.images = 0
+        self.images_without_alt = 0
+        self.images_with_alt = 0
+        self.internal_links = 0
+        self.external_links = 0
+        self.broken_links = 0
+        self.word_count = 0
+        self._text = ''
+        self.paragraph_count = 0
+        self.has_https = url.startswith('https://')
+        self.has_viewport = False
+        self.has_favicon = False
+        self.has_language = False
+        self.language = None
+        self.has_charset = False
+        self.page_size_kb = page_size_kb
+        self.has_schema = False
+        self.schema_types = []
+        self._extra = None
+
+    @property
+    def text_content(self):
+        text = self._text
+        return zlib.decompress(text).decode('utf-8') if type(text) is bytes else text
+
+    @text_content.setter
+    def text_content(self, text):
+        if text and len(text) >= TEXT_COMPRESS_MIN:
+            text = zlib.compress(text.encode('utf-8'), 6)
+        self._text = text
+
+    # ========================================
+    # Dictionary interface
+    # ========================================
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in INTERNED_FIELDS:
+                value = _intern(value)
+            elif key == 'schema_types':
+                value = [_intern(item) for item in value]
+            setattr(self, key, value)
+        else:
+            # Extra keys go into the binary form as they are, so they must
+            # hold plain data
+            try:
+                marshal.dumps(value, _MARSHAL_VERSION)
+            except ValueError:
+                raise TypeError(f"seo_data['{key}'] must be plain data (str, numbers, lists, dicts...), "
+                                f"not {type(value).__name__}") from None
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            raise TypeError(f"'{key}' is a SeoData field and cannot be removed")
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in _FIELD_SET or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from FIELDS
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        return len(FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __repr__(self):
+        return f"SeoData({self.url!r}, status_code={self.status_code}, word_count={self.word_count})"
+
+    def to_dict(self):
+        """A plain dictionary copy (for JSON and other dict-only consumers)"""
+        return dict(self.items())
+
+    def copy(self):
+        return SeoData.from_bytes(self.to_bytes())
+
+    @classmethod
+    def from_dict(cls, data):
+        """A record holding the keys of a seo_data dictionary (missing fields get their defaults)"""
+        record = cls(data.get('url') or '')
+        for key, value in data.items():
+            record[key] = value
+        return record
+
+    # ========================================
+    # Binary form
+    # ========================================
+
+    def to_bytes(self):
+        """Compact binary form; the text goes in still compressed"""
+        values = tuple(getattr(self, name) for name in _SLOT_FIELDS)
+        return marshal.dumps((RECORD_FORMAT, values, self._text, self._extra), _MARSHAL_VERSION)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Rebuild a record from to_bytes(); raises ValueError for anything else"""
+        try:
+            record_format, values, text, extra = marshal.loads(blob)
+        except (EOFError, TypeError, ValueError) as e:
+            raise ValueError(f"Not a SeoData record: {e}") from None
+        if record_format != RECORD_FORMAT or len(values) != len(_SLOT_FIELDS):
+            raise ValueError(f"Unsupported SeoData record format {record_format}")
+        record = cls.__new__(cls)
+        for name, value in zip(_SLOT_FIELDS, values):
+            setattr(record, name, value)
+        for name in INTERNED_FIELDS:
+            setattr(record, name, _intern(getattr(record, name)))
+        record._text = text
+        record._extra = extra
+        return record
+
+    def __reduce__(self):
+        # Pickling (process pools) goes through the binary form
+        return _from_bytes, (self.to_bytes(),)
+
+
+def _from_bytes(blob):
+    return SeoData.from_bytes(blob)
+
+
+def as_record(seo_data):
+    """seo_data as a SeoData record (converting a plain dictionary)"""
+    return seo_data if isinstance(seo_data, SeoData) else SeoData.from_dict(seo_data)
@@ -0,0 +1,241 @@
+"""
+robots.txt parsing and matching
+
+Follows RFC 9309, which is what the big search engines implement: the
+group naming our product token applies, or else the * group; within it the
+longest matching rule wins, Allow winning ties, and * and $ wildcards are
+understood. Crawl-delay and Sitemap lines are kept as well.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+from fetcher import fetch, read_body
+from scraper import normalize_url
+
+# Product token matched against User-agent lines (case-insensitively)
+ROBOTS_AGENT = os.getenv('SEO_ROBOTS_AGENT', 'SEOAnalyzer')
+# Crawlers must read at least the first 500 KiB; the rest is ignored
+MAX_ROBOTS_BYTES = 500 * 1024
+# Parsed robots.txt files are reused for a day (RFC 9309 caps caching at
+# 24 hours); a fetch that failed is retried much sooner
+ROBOTS_TTL = 24 * 3600
+ROBOTS_ERROR_TTL = 300
+ROBOTS_CACHE_SIZE = 10000
+
+
+def _compile_pattern(pattern):
+    """Matcher for a rule path: str.startswith unless it has wildcards"""
+    if '*' not in pattern and not pattern.endswith('$'):
+        return None
+    anchored = pattern.endswith('$')
+    if anchored:
+        pattern = pattern[:-1]
+    regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return re.compile(regex + (r'\Z' if anchored else ''), re.S)
+
+
+class RobotsGroup:
+    """The rules of one group of User-agent lines"""
+
+    __slots__ = ('rules', 'crawl_delay')
+
+    def __init__(self):
+        # (path pattern, allow, compiled regex or None)
+        self.rules = []
+        self.crawl_delay = None
+
+    def add_rule(self, pattern, allow):
+        if pattern:
+            self.rules.append((pattern, allow, _compile_pattern(pattern)))
+
+    def allowed(self, path):
+        """Whether the path (with its query string) may be fetched"""
+        best_length = -1
+        best_allow = True
+        for pattern, allow, regex in self.rules:
+            length = len(pattern)
+            if length < best_length or (length == best_length and not allow):
+                continue
+            if regex is None:
+                if not path.startswith(pattern):
+                    continue
+            elif regex.match(path) is None:
+                continue
+            best_length = length
+            best_allow = allow
+        return best_allow
+
+
+# Used for sites whose robots.txt could not be read
+_ALLOW_EVERYTHING = RobotsGroup()
+_DISALLOW_EVERYTHING = RobotsGroup()
+_DISALLOW_EVERYTHING.add_rule('/', False)
+
+
+class RobotsRules:
+    """
+    A parsed robots.txt. allowed() checks a URL (or path) against the group
+    for an agent; crawl_delay() gives that group's Crawl-delay in seconds.
+    """
+
+    def __init__(self, groups=None, sitemaps=None, default=None, unreachable=False):
+        # lowercased agent token -> RobotsGroup
+        self.groups = groups or {}
+        self.sitemaps = sitemaps or []
+        self._default = default
+        # Disallows everything only because robots.txt could not be read
+        self.unreachable = unreachable
+
+    @classmethod
+    def allow_all(cls):
+        return cls(default=_ALLOW_EVERYTHING)
+
+    @classmethod
+    def disallow_all(cls, unreachable=False):
+        return cls(default=_DISALLOW_EVERYTHING, unreachable=unreachable)
+
+    @classmethod
+    def parse(cls, text):
+        groups = {}
+        sitemaps = []
+        current = []  # groups the lines being read apply to
+        in_rules = False
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = line.split(':', 1)
+            field = field.strip().lower()
+            value = value.strip()
+
+            if field == 'user-agent':
+                if in_rules:
+                    # A User-agent line after rules starts a new group
+                    current = []
+                    in_rules = False
+                token = value.lower()
+                group = groups.get(token)
+                if group is None:
+                    group = groups[token] = RobotsGroup()
+                current.append(group)
+            elif field in ('allow', 'disallow'):
+                in_rules = True
+                for group in current:
+                    group.add_rule(value, field == 'allow')
+            elif field == 'crawl-delay':
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for group in current:
+                    group.crawl_delay = delay
+            elif field == 'sitemap' and value:
+                sitemaps.append(value)
+        return cls(groups, sitemaps)
+
+    def group(self, agent=ROBOTS_AGENT):
+        """The group that applies to an agent (an empty one if none does)"""
+        if self._default is not None:
+            return self._default
+        group = self.groups.get(agent.lower())
+        if group is None:
+            group = self.groups.get('*', _ALLOW_EVERYTHING)
+        return group
+
+    def allowed(self, url, agent=ROBOTS_AGENT):
+        """Whether robots.txt lets the agent fetch a URL of this site"""
+        group = self.group(agent)
+        if not group.rules:
+            return True
+        return group.allowed(url_path(url))
+
+    def crawl_delay(self, agent=ROBOTS_AGENT):
+        return self.group(agent).crawl_delay
+
+
+def url_path(url):
+    """Path and query of a URL, the part robots.txt rules are matched against"""
+    if not url.startswith('/'):
+        parts = url.split('/', 3)
+        url = '/' + parts[3] if len(parts) > 3 else '/'
+    return url.split('#', 1)[0]
+
+
+def robots_url(site_url):
+    parts = urlsplit(normalize_url(site_url))
+    return f"{parts.scheme}://{parts.netloc}/robots.txt"
+
+
+def fetch_robots(site_url):
+    """
+    Fetch and parse the robots.txt of a site. A missing robots.txt, or one
+    answering with a client error, allows everything; server errors and
+    network failures disallow everything, as RFC 9309 asks.
+    """
+    url = robots_url(site_url)
+    try:
+        response = fetch(url, stream=True)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Could not fetch {url}: {e}")
+        metrics.error('robots', e)
+        return RobotsRules.disallow_all(unreachable=True)
+
+    if response.status_code >= 400:
+        response.close()
+        if response.status_code >= 500:
+            return RobotsRules.disallow_all(unreachable=True)
+        return RobotsRules.allow_all()
+    try:
+        body, _, _ = read_body(response, max_bytes=MAX_ROBOTS_BYTES)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Could not read {url}: {e}")
+        metrics.error('robots', e)
+        return RobotsRules.disallow_all(unreachable=True)
+    return RobotsRules.parse(body.decode('utf-8', errors='replace'))
+
+
+# ========================================
+# Process-wide cache
+# ========================================
+
+_cache = OrderedDict()  # robots.txt URL -> (rules, expires)
+_cache_lock = threading.Lock()
+
+
+def get_robots(url):
+    """
+    The robots.txt rules for the site of a URL, fetched on first use and
+    then cached (see ROBOTS_TTL). Thread-safe; two threads asking for the
+    same uncached site at once may both fetch it.
+    """
+    key = robots_url(url)
+    now = time.time()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[1] > now:
+            _cache.move_to_end(key)
+            metrics.cache_lookup('robots', True)
+            return entry[0]
+    metrics.cache_lookup('robots', False)
+
+    rules = fetch_robots(key)
+    ttl = ROBOTS_ERROR_TTL if rules.unreachable else ROBOTS_TTL
+    with _cache_lock:
+        _cache[key] = (rules, time.time() + ttl)
+        _cache.move_to_end(key)
+        while len(_cache) > ROBOTS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rules
+
+
+def clear_robots_cache():
+    with _cache_lock:
+        _cache.clear()
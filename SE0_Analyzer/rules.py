@@ -0,0 +1,512 @@
+"""
+Declarative scoring rules
+
+A scoring profile is plain data (a dict, or a YAML/JSON file) listing
+categories and rules. Each rule reads one metric of seo_data, checks it
+against an ordered list of bands and contributes the points and message of
+the first band that matches:
+
+    {
+        'id': 'title',
+        'category': 'meta_tags',
+        'when': {'metric': 'title', 'truthy': True},
+        'otherwise': {'issue': "❌ Missing title tag (critical SEO issue)"},
+        'metric': 'title_length',
+        'bands': [
+            {'between': [30, 60], 'points': 10, 'strength': "✅ Title tag length is optimal"},
+            {'gt': 0, 'points': 3, 'issue': "⚠️ Title tag length is {value} chars"},
+            {'issue': "❌ Title tag is empty"},
+        ],
+    }
+
+A metric is a seo_data field or one of the derived METRICS. Band tests are
+eq, ne, gt, gte, lt, lte, between (inclusive), truthy and contains (case
+insensitive); a band without tests always matches. Points can be fixed or
+points_per unit of the metric, capped at points_cap. Messages are format
+strings over {value}, seo_data fields and derived metrics. A rule without
+a category only reports.
+
+Each rule is compiled once into a closure, with its readers, band tests
+and messages prepared up front, so scoring a page only runs the tests. A
+batch scored against several profiles evaluates each distinct rule once
+per page.
+"""
+import copy
+import json
+import operator
+import os
+from string import Formatter
+
+ISSUE = 'issue'
+STRENGTH = 'strength'
+
+
+# Derived metrics, usable in rules and messages like seo_data fields
+def _h1_count(d):
+    return len(d.get('h1_tags'))
+
+
+def _h2_count(d):
+    return len(d.get('h2_tags'))
+
+
+def _og_count(d):
+    return bool(d.get('og_title')) + bool(d.get('og_description')) + bool(d.get('og_image'))
+
+
+def _missing_alt_percent(d):
+    images = d.get('images')
+    return (d.get('images_without_alt') / images) * 100 if images else 0
+
+
+def _schema_list(d):
+    return ', '.join(d.get('schema_types')[:3])
+
+
+METRICS = {
+    'h1_count': _h1_count,
+    'h2_count': _h2_count,
+    'og_count': _og_count,
+    'missing_alt_percent': _missing_alt_percent,
+    'schema_list': _schema_list,
+}
+
+
+def _between(bounds):
+    low, high = bounds
+    return lambda v: low <= v <= high
+
+
+# Band tests: name -> function of the band's argument returning the test
+# of a metric value
+_TESTS = {
+    'eq': lambda a: lambda v: v == a,
+    'ne': lambda a: lambda v: v != a,
+    'gt': lambda a: lambda v: v > a,
+    'gte': lambda a: lambda v: v >= a,
+    'lt': lambda a: lambda v: v < a,
+    'lte': lambda a: lambda v: v <= a,
+    'contains': lambda a: (lambda text: lambda v: text in (v or '').lower())(str(a).lower()),
+    'between': _between,
+    'truthy': lambda a: bool if a else operator.not_,
+}
+_BAND_KEYS = set(_TESTS) | {'points', 'points_per', 'points_cap', ISSUE, STRENGTH}
+
+# Conversions allowed in message placeholders ({value!r})
+_CONVERSIONS = {'r', 's', 'a'}
+
+
+class _Compiler:
+    """
+    Turns rule definitions into closures, checking them on the way. Rules
+    normally read seo_data mappings; with columns set they read rows keyed
+    by metric name instead, and every name read is recorded in columns.
+    """
+
+    def __init__(self, columns=False, messages=True):
+        # Names read, in order of first use (a dict as an ordered set)
+        self.columns = {} if columns else None
+        self.messages = messages
+
+    def reader(self, rule, name):
+        """Function reading a metric from a page"""
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError(f"Rule '{rule['id']}': '{name}' is not a field or metric name")
+        if self.columns is not None:
+            self.columns[name] = None
+            return operator.itemgetter(name)
+        if name in METRICS:
+            return METRICS[name]
+        return operator.methodcaller('get', name)
+
+    def message(self, rule, message):
+        """
+        The message itself when it has no placeholders, else a function of
+        (value, page) formatting them
+        """
+        # The message as a template with positional placeholders, and the
+        # function reading each one (None for the rule's own value)
+        template = []
+        reads = []
+        for literal, field, spec, conversion in Formatter().parse(message):
+            template.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+            if '{' in (spec or ''):
+                raise ValueError(f"Rule '{rule['id']}': nested format specs are not supported")
+            if conversion and conversion not in _CONVERSIONS:
+                raise ValueError(f"Rule '{rule['id']}': unknown conversion '!{conversion}'")
+            template.append('{' + str(len(reads)) + (f'!{conversion}' if conversion else '') + f':{spec or ""}}}')
+            reads.append(None if field == 'value' else self.reader(rule, field))
+        template = ''.join(template)
+
+        if not reads:
+            return template.replace('{{', '{').replace('}}', '}')
+        if reads == [None]:
+            return lambda value, d: template.format(value)
+        return lambda value, d: template.format(*[value if read is None else read(d) for read in reads])
+
+    def test(self, rule, band):
+        """Function of a metric value testing a band, or None if it always matches"""
+        tests = []
+        for key, argument in band.items():
+            if key in _TESTS:
+                tests.append(_TESTS[key](argument))
+            elif key not in _BAND_KEYS and key != 'metric':
+                raise ValueError(f"Rule '{rule['id']}': unknown band key '{key}'")
+        if len(tests) < 2:
+            return tests[0] if tests else None
+        return lambda v: all(test(v) for test in tests)
+
+    def outcome(self, rule, band):
+        """
+        A band's (points, kind, message), or a function of (value, page)
+        giving them when they depend on the page. points is None for a band
+        that adds nothing.
+        """
+        kind = ISSUE if ISSUE in band else STRENGTH if STRENGTH in band else None
+        message = None
+        if self.messages and kind and band[kind] is not None:
+            message = self.message(rule, band[kind])
+
+        if 'points_per' in band:
+            cap = band.get('points_cap', float('inf'))
+            per = band['points_per']
+            if callable(message):
+                return lambda value, d: (max(-cap, min(cap, per * value)), kind, message(value, d))
+            return lambda value, d: (max(-cap, min(cap, per * value)), kind, message)
+
+        points = band['points'] if band.get('points') else None
+        if callable(message):
+            return lambda value, d: (points, kind, message(value, d))
+        return points, kind, message
+
+    def rule(self, rule):
+        """
+        Function of a page giving the outcome (see outcome()) of the first
+        band that matches, or None when no band does
+        """
+        guard = rule.get('when')
+        guard_read = guard_test = otherwise = None
+        if guard:
+            guard_read = self.reader(rule, guard.get('metric', rule.get('metric')))
+            guard_test = self.test(rule, guard)
+            if guard_test is not None and rule.get('otherwise'):
+                otherwise = self.outcome(rule, rule['otherwise'])
+
+        read = self.reader(rule, rule.get('metric'))
+        bands = []
+        for band in rule.get('bands', []):
+            test = self.test(rule, band)
+            bands.append((test, self.outcome(rule, band)))
+            if test is None:
+                # Later bands can never match
+                break
+
+        def evaluate(d):
+            if guard_test is not None:
+                g = guard_read(d)
+                if not guard_test(g):
+                    return otherwise(g, d) if callable(otherwise) else otherwise
+            v = read(d)
+            for test, outcome in bands:
+                if test is None or test(v):
+                    return outcome(v, d) if callable(outcome) else outcome
+            return None
+        return evaluate
+
+
+def _point_range(rule):
+    """(fewest, most) points a rule can contribute"""
+    outcomes = list(rule.get('bands', []))
+    if rule.get('otherwise'):
+        outcomes.append(rule['otherwise'])
+    low = high = 0
+    for band in outcomes:
+        if 'points_per' in band:
+            # Metrics are counts, so the sign of points_per decides the direction
+            cap = band.get('points_cap', float('inf'))
+            if band['points_per'] < 0:
+                low = min(low, -cap)
+            else:
+                high = max(high, cap)
+        else:
+            low, high = min(low, band.get('points', 0)), max(high, band.get('points', 0))
+    return low, high
+
+
+def max_points(rule):
+    """Most points a rule can add (used for the category maximum)"""
+    return _point_range(rule)[1]
+
+
+def rule_key(rule):
+    """Identity of a rule definition; profiles sharing a rule evaluate it once"""
+    if 'id' not in rule:
+        raise ValueError(f"Rule without an id: {rule}")
+    return json.dumps(rule, sort_keys=True, ensure_ascii=False)
+
+
+class ScoringProfile:
+    """
+    A compiled set of categories and rules.
+
+    categories maps a category name to its settings: max (defaults to the
+    most points its rules can add, used for category_percentages) and floor
+    (lowest score the category can drop to, 0 by default).
+    """
+
+    def __init__(self, name, categories, rules):
+        self.name = name
+        self.definition = {'name': name, 'categories': copy.deepcopy(categories), 'rules': copy.deepcopy(rules)}
+        self.categories = list(categories)
+        # (id, category, definition key, can subtract points, definition)
+        self.rules = [(rule['id'], rule.get('category'), rule_key(rule), _point_range(rule)[0] < 0, rule)
+                      for rule in self.definition['rules']]
+
+        self.max_points = {}
+        self.floors = {}
+        for category, settings in categories.items():
+            settings = settings or {}
+            computed = sum(max_points(rule) for rule in rules if rule.get('category') == category)
+            self.max_points[category] = settings.get('max', computed)
+            self.floors[category] = settings.get('floor', 0)
+        for rule_id, category, _, _, _ in self.rules:
+            if category is not None and category not in self.max_points:
+                raise ValueError(f"Rule '{rule_id}' uses unknown category '{category}'")
+
+        # Compiled up front, so a bad rule fails when the profile is created
+        self.evaluate = build_evaluator([self], single=True)
+        self._column_evaluators = {}
+
+    def column_evaluator(self, messages=False):
+        """The columnar evaluator of this profile (see build_column_evaluator), built on first use"""
+        evaluator = self._column_evaluators.get(messages)
+        if evaluator is None:
+            evaluator = self._column_evaluators[messages] = build_column_evaluator(self, messages)
+        return evaluator
+
+    def score_columns(self, columns, messages=False):
+        """
+        Score pages given as columns: {metric name: sequence with one value
+        per page}, for every name in column_evaluator(messages).metrics.
+        Any sequence works; arrays with a tolist() method (NumPy, pandas)
+        are converted first. See build_column_evaluator for the result.
+        """
+        evaluate = self.column_evaluator(messages)
+        missing = [name for name in evaluate.metrics if name not in columns]
+        if missing:
+            raise ValueError(f"Missing columns for profile '{self.name}': {', '.join(missing)}")
+        data = {}
+        for name in evaluate.metrics:
+            column = columns[name]
+            data[name] = column.tolist() if hasattr(column, 'tolist') else column
+        return evaluate(data)
+
+    def derive(self, name, overrides):
+        """
+        New profile based on this one. overrides may hold:
+            categories - settings merged into the existing categories
+            rules      - rules to add, or to change (matched on id; the given
+                         keys replace the existing rule's keys)
+            disable    - ids of rules to drop
+        """
+        categories = copy.deepcopy(self.definition['categories'])
+        for category, settings in (overrides.get('categories') or {}).items():
+            categories.setdefault(category, {})
+            categories[category] = dict(categories[category] or {}, **(settings or {}))
+
+        rules = copy.deepcopy(self.definition['rules'])
+        positions = {rule['id']: i for i, rule in enumerate(rules)}
+        for rule in overrides.get('rules') or []:
+            if rule.get('id') in positions:
+                rules[positions[rule['id']]].update(copy.deepcopy(rule))
+            else:
+                positions[rule.get('id')] = len(rules)
+                rules.append(copy.deepcopy(rule))
+
+        disabled = set(overrides.get('disable') or [])
+        unknown = disabled - set(positions)
+        if unknown:
+            raise ValueError(f"Profile '{name}' disables unknown rules: {', '.join(sorted(unknown))}")
+        rules = [rule for rule in rules if rule['id'] not in disabled]
+        return ScoringProfile(name, categories, rules)
+
+
+def _add_up(profile, steps, d, outcomes, issues, strengths):
+    """
+    Category totals of one page. steps are a profile's rules as (category,
+    can subtract, floor, key, compiled rule); outcomes, if given, maps a
+    rule key to its outcome for the page, else each rule is run on d. The
+    messages are appended to issues and strengths.
+    """
+    totals = dict.fromkeys(profile.categories, 0)
+    for category, can_subtract, floor, key, rule in steps:
+        outcome = rule(d) if outcomes is None else outcomes[key]
+        if outcome is None:
+            continue
+        points, kind, message = outcome
+        if category is not None and points is not None:
+            total = totals[category] + points
+            if can_subtract and floor is not None and total < floor:
+                total = floor
+            totals[category] = total
+        if message is not None:
+            (issues if kind == ISSUE else strengths).append(message)
+    return totals
+
+
+def _steps(profile, compiled):
+    return [(category, can_subtract, profile.floors.get(category), key, compiled[key])
+            for _, category, key, can_subtract, _ in profile.rules]
+
+
+def _percentage(profile, category, total):
+    maximum = profile.max_points[category]
+    return round((total / maximum) * 100) if maximum else 0
+
+
+def _result(profile, totals, issues, strengths):
+    return {
+        'score': sum(totals.values()),
+        'issues': issues,
+        'strengths': strengths,
+        'category_scores': totals,
+        'category_percentages': {category: _percentage(profile, category, total)
+                                 for category, total in totals.items()},
+    }
+
+
+def build_evaluator(profiles, single=False):
+    """
+    Build one function that scores a page against the profiles.
+
+    Every distinct rule is compiled once. For a single profile its rules
+    run in order, adding up the category totals and messages directly. For
+    several profiles every distinct rule runs once per page and each
+    profile then adds up the outcomes of its own rules. Returns the result
+    directly when single is set, otherwise a {profile name: result}
+    dictionary.
+    """
+    compiler = _Compiler()
+    compiled = {}
+    for profile in profiles:
+        for _, _, key, _, rule in profile.rules:
+            if key not in compiled:
+                compiled[key] = compiler.rule(rule)
+
+    if single:
+        profile = profiles[0]
+        steps = _steps(profile, compiled)
+
+        def evaluate(d):
+            issues = []
+            strengths = []
+            totals = _add_up(profile, steps, d, None, issues, strengths)
+            return _result(profile, totals, issues, strengths)
+        return evaluate
+
+    all_steps = [(profile, _steps(profile, compiled)) for profile in profiles]
+
+    def evaluate_all(d):
+        outcomes = {key: rule(d) for key, rule in compiled.items()}
+        results = {}
+        for profile, steps in all_steps:
+            issues = []
+            strengths = []
+            totals = _add_up(profile, steps, d, outcomes, issues, strengths)
+            results[profile.name] = _result(profile, totals, issues, strengths)
+        return results
+    return evaluate_all
+
+
+def build_column_evaluator(profile, messages=False):
+    """
+    Build a function scoring many pages at once from columns of metric
+    values. The rules run in one loop over the zipped columns, keeping
+    only running totals; the result holds lists with one entry per page:
+
+        {'score': [...], 'category_scores': {category: [...]},
+         'category_percentages': {category: [...]}}
+
+    plus 'issues' and 'strengths' (a list of messages per page) when
+    messages is set. The function's metrics attribute lists the columns
+    it reads, in order.
+    """
+    compiler = _Compiler(columns=True, messages=messages)
+    steps = _steps(profile, {key: compiler.rule(rule) for _, _, key, _, rule in profile.rules})
+    if not compiler.columns:
+        raise ValueError(f"Profile '{profile.name}' has no rules to score columns with")
+    metrics = list(compiler.columns)
+
+    def evaluate(c):
+        score = []
+        outputs = {category: [] for category in profile.categories}
+        issues = []
+        strengths = []
+        for values in zip(*[c[name] for name in metrics]):
+            row = dict(zip(metrics, values))
+            page_issues = []
+            page_strengths = []
+            totals = _add_up(profile, steps, row, None, page_issues, page_strengths)
+            for category, total in totals.items():
+                outputs[category].append(total)
+            score.append(sum(totals.values()))
+            if messages:
+                issues.append(page_issues)
+                strengths.append(page_strengths)
+
+        result = {
+            'score': score,
+            'category_scores': outputs,
+            'category_percentages': {category: [_percentage(profile, category, total) for total in column]
+                                     for category, column in outputs.items()},
+        }
+        if messages:
+            result['issues'] = issues
+            result['strengths'] = strengths
+        return result
+
+    evaluate.metrics = metrics
+    return evaluate
+
+
+def to_columns(pages, metrics):
+    """Columns of the given metrics (seo_data fields or METRICS) from seo_data dictionaries"""
+    pages = pages if isinstance(pages, list) else list(pages)
+    columns = {}
+    for name in metrics:
+        if name in METRICS:
+            metric = METRICS[name]
+            columns[name] = [metric(d) for d in pages]
+        else:
+            columns[name] = [d.get(name) for d in pages]
+    return columns
+
+
+def score_batch(pages, profiles):
+    """
+    Score many pages against several profiles in one pass. Each distinct
+    rule is evaluated once per page however many profiles use it.
+    Yields one {profile name: result} dictionary per page.
+    """
+    evaluate = build_evaluator(list(profiles))
+    for seo_data in pages:
+        yield evaluate(seo_data)
+
+
+def load_profile_file(path):
+    """Read a profile definition from a .json, .yaml or .yml file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"PyYAML is needed to read {path}; install it or use JSON") from None
+            definition = yaml.safe_load(f)
+        else:
+            definition = json.load(f)
+    if not isinstance(definition, dict):
+        raise ValueError(f"{path} does not contain a profile definition")
+    definition.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    return definition
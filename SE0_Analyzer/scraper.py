@@ -1,302 +1,224 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
+import os
 import time
-import json
-import re
 
-def scrape_website(url):
+import requests
+
+import metrics
+from extractor import extract_seo_data, EXTRACTOR_VERSION
+from fetcher import FETCH_SECONDS, DownloadTimeout, fetch, get_fetch_config, read_body
+from http_cache import FetchCache, get_fetch_cache, decompress_body
+from link_checker import verify_page_links
+from memo import get_memo_store, memo_key, lookup as memo_lookup, remember as memo_remember
+from parsers import parse_html, get_parser_backend
+from records import RECORD_FORMAT, SeoData
+
+# Check every link on the page for /analyze (off by default: up to 100
+# outbound requests per analysis; SEO_CHECK_LINKS=1 turns it on)
+CHECK_LINKS = os.getenv('SEO_CHECK_LINKS', '0') == '1'
+
+
+def normalize_url(url):
+    """Add https:// if no scheme is present"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def fetch_page(url, use_cache=True, status_retries=True):
+    """
+    Fetch a page and return the raw response facts needed for extraction.
+    Raises requests exceptions on network errors and HTTP error statuses.
+    Without status_retries, a 429 or 503 answer is raised straight away
+    instead of being retried (see scheduled_fetch_page).
+
+    When the fetch cache holds the page, the request is conditional; on a
+    304 the stored body and original download time are returned instead,
+    together with any seo_data parsed from them before.
+    """
+    cache = get_fetch_cache() if use_cache else None
+    entry = cache.lookup(url) if cache is not None else None
+    headers = FetchCache.conditional_headers(entry) if entry is not None else None
+
+    # Fetch the webpage with timing (pooled keep-alive session). The body is
+    # streamed so huge pages stop at the size cap instead of filling memory.
+    # total_timeout covers the whole download: no attempt may wait longer
+    # for the headers, and headers that arrive past it (after retries) fail
+    config = get_fetch_config()
+    start_time = time.time()
+    deadline = start_time + config.total_timeout
+    response = fetch(url, headers=headers, stream=True, status_retries=status_retries,
+                     timeout=min(config.timeout, config.total_timeout))
+    headers_time = time.time()
+    if metrics.ENABLED:
+        FETCH_SECONDS.observe(headers_time - start_time, phase='ttfb')
+        if cache is not None:
+            metrics.cache_lookup('fetch', entry is not None and response.status_code == 304)
+    if headers_time > deadline:
+        response.close()
+        raise DownloadTimeout(f"No response within {config.total_timeout}s", response=response)
+
+    if entry is not None and response.status_code == 304:
+        response.close()
+        cache.touch(url, response)
+        if metrics.ENABLED:
+            metrics.STAGE_SECONDS.observe(headers_time - start_time, stage='fetch')
+        return {
+            'url': url,
+            'final_url': url,
+            'status_code': entry['status_code'],
+            'load_time': entry['load_time'],
+            'content': decompress_body(entry),
+            'ttfb': headers_time - start_time,
+            'not_modified': True,
+            'cached': True,
+            'parse_signature': entry['parse_signature'],
+            'cached_seo_data': entry['seo_data'],
+        }
+
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()
+    content, size_bytes, truncated = read_body(response, config.max_bytes, deadline)
+    load_time = time.time() - start_time
+    if metrics.ENABLED:
+        FETCH_SECONDS.observe(load_time - (headers_time - start_time), phase='download')
+        metrics.STAGE_SECONDS.observe(load_time, stage='fetch')
+
+    cached = False
+    if truncated:
+        print(f"✂️ Page is larger than {config.max_bytes // (1024 * 1024)} MB, analyzing the first part only")
+    elif cache is not None:
+        # Only complete bodies are worth revalidating later
+        cached = cache.store(url, response, content, load_time)
+
+    page = {
+        'url': url,
+        'final_url': response.url,
+        'status_code': response.status_code,
+        'load_time': load_time,
+        'ttfb': headers_time - start_time,
+        'content': content,
+        'cached': cached,
+    }
+    if truncated:
+        page['truncated'] = True
+        page['size_bytes'] = size_bytes
+    return page
+
+
+def scheduled_fetch_page(url):
+    """
+    fetch_page for fetches paced by politeness.HostScheduler: throttling
+    answers come straight back, so the scheduler sees every 429/503 and is
+    the only layer that waits and retries
+    """
+    return fetch_page(url, status_retries=False)
+
+
+def html_prefix(content):
     """
-    Enhanced scraper with comprehensive SEO data extraction
+    The part of a cut-off page that is safe to parse: everything up to the
+    last complete tag, so a partial tag or multi-byte character at the cut
+    is not misread. Raises ValueError when not even one tag made it in.
+    """
+    end = content.rfind(b'>')
+    if end == -1:
+        raise ValueError("Page is too large and its beginning contains no HTML")
+    return content[:end + 1]
+
+
+def parse_signature(collect_links=False):
+    """Identifies how seo_data was produced, for reusing cached parses"""
+    return f"{EXTRACTOR_VERSION}:{RECORD_FORMAT}:{get_parser_backend().name}:{int(collect_links)}"
+
+
+def parse_page(page, collect_links=False):
+    """
+    Parse a fetched page (see fetch_page) and extract its seo_data.
+    This is the CPU-bound half of scraping and does no network I/O.
+    """
+    signature = parse_signature(collect_links)
+
+    # Unchanged page (304) that was parsed the same way before
+    if page.get('not_modified'):
+        reusable = bool(page.get('cached_seo_data')) and page.get('parse_signature') == signature
+        metrics.cache_lookup('parse', reusable)
+        if reusable:
+            return SeoData.from_bytes(page['cached_seo_data'])
+
+    # Parse HTML with the process-wide parser backend (only the safe prefix
+    # of a page cut off at the size cap)
+    content = html_prefix(page['content']) if page.get('truncated') else page['content']
+    with metrics.STAGE_SECONDS.time(stage='parse'):
+        soup = parse_html(content)
+
+    # Extract all SEO data in a single pass over the document
+    with metrics.STAGE_SECONDS.time(stage='extract'):
+        seo_data = extract_seo_data(
+            soup,
+            page['url'],
+            status_code=page['status_code'],
+            load_time=page['load_time'],
+            page_size_kb=page.get('size_bytes', len(page['content'])) / 1024,
+            collect_links=collect_links,
+        )
+    if page.get('truncated'):
+        # Counts (words, links, images...) cover the analyzed part only
+        seo_data['page_truncated'] = True
+
+    if page.get('cached'):
+        get_fetch_cache().store_parse(page['url'], signature, seo_data)
+    return seo_data
+
+
+def scrape_website(url, check_links=CHECK_LINKS, progress=None):
+    """
+    Enhanced scraper with comprehensive SEO data extraction.
+    progress, if given, is called as progress(stage, detail) after the
+    'fetched' and 'parsed' stages.
     """
     try:
         # Add https:// if not present
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        
-        # Set headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Fetch the webpage with timing
+        url = normalize_url(url)
+
         print(f"Fetching URL: {url}")
-        start_time = time.time()
-        response = requests.get(url, headers=headers, timeout=15)
-        load_time = time.time() - start_time
-        response.raise_for_status()
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Initialize SEO data dictionary
-        seo_data = {
-            'url': url,
-            'status_code': response.status_code,
-            'load_time': round(load_time, 2),
-            
-            # Basic Meta Tags
-            'title': None,
-            'title_length': 0,
-            'meta_description': None,
-            'meta_description_length': 0,
-            'meta_keywords': None,
-            'canonical_url': None,
-            'meta_robots': None,
-            
-            # Open Graph Tags
-            'og_title': None,
-            'og_description': None,
-            'og_image': None,
-            'og_type': None,
-            
-            # Twitter Cards
-            'twitter_card': None,
-            'twitter_title': None,
-            'twitter_description': None,
-            
-            # Heading Structure
-            'h1_tags': [],
-            'h2_tags': [],
-            'h3_tags': [],
-            'h4_tags': [],
-            
-            # Images
-            'images': 0,
-            'images_without_alt': 0,
-            'images_with_alt': 0,
-            
-            # Links
-            'internal_links': 0,
-            'external_links': 0,
-            'broken_links': 0,
-            
-            # Content Analysis
-            'word_count': 0,
-            'text_content': '',
-            'paragraph_count': 0,
-            
-            # Technical SEO
-            'has_https': url.startswith('https://'),
-            'has_viewport': False,
-            'has_favicon': False,
-            'has_language': False,
-            'language': None,
-            'has_charset': False,
-            'page_size_kb': len(response.content) / 1024,
-            
-            # Structured Data
-            'has_schema': False,
-            'schema_types': [],
-        }
-        
-        # ========================================
-        # 1. BASIC META TAGS
-        # ========================================
-        
-        # Title Tag
-        title_tag = soup.find('title')
-        if title_tag:
-            seo_data['title'] = title_tag.get_text().strip()
-            seo_data['title_length'] = len(seo_data['title'])
-        
-        # Meta Description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            seo_data['meta_description'] = meta_desc.get('content', '').strip()
-            seo_data['meta_description_length'] = len(seo_data['meta_description'])
-        
-        # Meta Keywords (legacy but still checked)
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords:
-            seo_data['meta_keywords'] = meta_keywords.get('content', '').strip()
-        
-        # Canonical URL
-        canonical = soup.find('link', attrs={'rel': 'canonical'})
-        if canonical:
-            seo_data['canonical_url'] = canonical.get('href', '').strip()
-        
-        # Meta Robots
-        meta_robots = soup.find('meta', attrs={'name': 'robots'})
-        if meta_robots:
-            seo_data['meta_robots'] = meta_robots.get('content', '').strip()
-        
-        # ========================================
-        # 2. OPEN GRAPH TAGS
-        # ========================================
-        
-        og_title = soup.find('meta', property='og:title')
-        if og_title:
-            seo_data['og_title'] = og_title.get('content', '').strip()
-        
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc:
-            seo_data['og_description'] = og_desc.get('content', '').strip()
-        
-        og_image = soup.find('meta', property='og:image')
-        if og_image:
-            seo_data['og_image'] = og_image.get('content', '').strip()
-        
-        og_type = soup.find('meta', property='og:type')
-        if og_type:
-            seo_data['og_type'] = og_type.get('content', '').strip()
-        
-        # ========================================
-        # 3. TWITTER CARDS
-        # ========================================
-        
-        twitter_card = soup.find('meta', attrs={'name': 'twitter:card'})
-        if twitter_card:
-            seo_data['twitter_card'] = twitter_card.get('content', '').strip()
-        
-        twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
-        if twitter_title:
-            seo_data['twitter_title'] = twitter_title.get('content', '').strip()
-        
-        twitter_desc = soup.find('meta', attrs={'name': 'twitter:description'})
-        if twitter_desc:
-            seo_data['twitter_description'] = twitter_desc.get('content', '').strip()
-        
-        # ========================================
-        # 4. HEADING STRUCTURE
-        # ========================================
-        
-        # H1 Tags
-        h1_tags = soup.find_all('h1')
-        seo_data['h1_tags'] = [h1.get_text().strip() for h1 in h1_tags if h1.get_text().strip()]
-        
-        # H2 Tags
-        h2_tags = soup.find_all('h2')
-        seo_data['h2_tags'] = [h2.get_text().strip() for h2 in h2_tags if h2.get_text().strip()][:10]
-        
-        # H3 Tags
-        h3_tags = soup.find_all('h3')
-        seo_data['h3_tags'] = [h3.get_text().strip() for h3 in h3_tags if h3.get_text().strip()][:10]
-        
-        # H4 Tags
-        h4_tags = soup.find_all('h4')
-        seo_data['h4_tags'] = [h4.get_text().strip() for h4 in h4_tags if h4.get_text().strip()][:5]
-        
-        # ========================================
-        # 5. IMAGES ANALYSIS
-        # ========================================
-        
-        images = soup.find_all('img')
-        seo_data['images'] = len(images)
-        
-        for img in images:
-            alt_text = img.get('alt', '').strip()
-            if alt_text:
-                seo_data['images_with_alt'] += 1
-            else:
-                seo_data['images_without_alt'] += 1
-        
-        # ========================================
-        # 6. LINKS ANALYSIS
-        # ========================================
-        
-        domain = urlparse(url).netloc
-        links = soup.find_all('a', href=True)
-        
-        for link in links:
-            href = link['href'].strip()
-            
-            # Skip empty, anchor, javascript, and mailto links
-            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-                continue
-            
-            # Convert relative URLs to absolute
-            absolute_url = urljoin(url, href)
-            link_domain = urlparse(absolute_url).netloc
-            
-            # Classify as internal or external
-            if domain in link_domain or link_domain in domain:
-                seo_data['internal_links'] += 1
-            else:
-                seo_data['external_links'] += 1
-        
-        # ========================================
-        # 7. CONTENT ANALYSIS
-        # ========================================
-        
-        # Remove script and style elements
-        for script in soup(['script', 'style', 'nav', 'footer', 'header']):
-            script.decompose()
-        
-        # Get text content
-        text_content = soup.get_text()
-        lines = (line.strip() for line in text_content.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        seo_data['text_content'] = text[:3000]  # First 3000 chars for LLM
-        seo_data['word_count'] = len(text.split())
-        
-        # Count paragraphs
-        paragraphs = soup.find_all('p')
-        seo_data['paragraph_count'] = len([p for p in paragraphs if p.get_text().strip()])
-        
-        # ========================================
-        # 8. TECHNICAL SEO
-        # ========================================
-        
-        # Viewport meta tag
-        viewport = soup.find('meta', attrs={'name': 'viewport'})
-        seo_data['has_viewport'] = viewport is not None
-        
-        # Favicon
-        favicon = soup.find('link', rel=lambda x: x and 'icon' in x.lower())
-        seo_data['has_favicon'] = favicon is not None
-        
-        # Language declaration
-        html_tag = soup.find('html')
-        if html_tag and html_tag.get('lang'):
-            seo_data['has_language'] = True
-            seo_data['language'] = html_tag.get('lang')
-        
-        # Charset
-        charset = soup.find('meta', attrs={'charset': True})
-        if not charset:
-            charset = soup.find('meta', attrs={'http-equiv': 'Content-Type'})
-        seo_data['has_charset'] = charset is not None
-        
-        # ========================================
-        # 9. STRUCTURED DATA (Schema.org)
-        # ========================================
-        
-        # Look for JSON-LD
-        json_ld_scripts = soup.find_all('script', type='application/ld+json')
-        if json_ld_scripts:
-            seo_data['has_schema'] = True
-            for script in json_ld_scripts[:3]:  # Check first 3
-                try:
-                    data = json.loads(script.string)
-                    if '@type' in data:
-                        seo_data['schema_types'].append(data['@type'])
-                    elif isinstance(data, list):
-                        for item in data:
-                            if '@type' in item:
-                                seo_data['schema_types'].append(item['@type'])
-                except:
-                    pass
-        
-        # Look for Microdata
-        if not seo_data['has_schema']:
-            microdata = soup.find_all(attrs={'itemtype': True})
-            if microdata:
-                seo_data['has_schema'] = True
-        
+        page = fetch_page(url)
+        if progress is not None:
+            progress('fetched', {'status_code': page['status_code'], 'load_time': round(page['load_time'], 2)})
+
+        # Same content as a previous run: skip the parse
+        store = get_memo_store()
+        key = memo_key(page, check_links, get_parser_backend().name) if store is not None else None
+        hit = memo_lookup(store, key, page) if store is not None else None
+        if hit is not None:
+            seo_data = hit[0]
+            print("♻️ Page content unchanged since last analysis, reusing extracted data")
+        else:
+            seo_data = parse_page(page, collect_links=check_links)
+            if store is not None:
+                memo_remember(store, key, seo_data)
+        if progress is not None:
+            progress('parsed', {'word_count': seo_data['word_count']})
+
+        # Verify links concurrently, within a fixed time budget
+        if check_links:
+            with metrics.STAGE_SECONDS.time(stage='link_check'):
+                summary = verify_page_links(seo_data)
+            print(f"🔗 Checked {summary['checked']} links: {summary['broken']} broken, {summary['unchecked']} unchecked")
+
         print("✅ Scraping completed successfully!")
         print(f"   - Found {seo_data['word_count']} words")
         print(f"   - {len(seo_data['h1_tags'])} H1 tags, {len(seo_data['h2_tags'])} H2 tags")
         print(f"   - {seo_data['images']} images ({seo_data['images_with_alt']} with alt text)")
         print(f"   - Load time: {seo_data['load_time']}s")
-        
+
         return seo_data
-    
+
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching website: {e}")
+        metrics.error('fetch', e)
         return {'error': f"Could not fetch website: {str(e)}"}
     except Exception as e:
         print(f"❌ Error parsing website: {e}")
+        metrics.error('parse', e)
         return {'error': f"Error analyzing website: {str(e)}"}
\ No newline at end of file
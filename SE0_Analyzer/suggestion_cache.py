@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+from env import env_float, env_int
+
+# Persistent cache of parsed AI suggestions (SEO_SUGGESTION_CACHE=0 disables it)
+CACHE_ENABLED = os.getenv('SEO_SUGGESTION_CACHE', '1') != '0'
+CACHE_PATH = os.getenv('SEO_SUGGESTION_CACHE_PATH', os.path.join(
+    os.getenv('SEO_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seo_cache')),
+    'suggestions.sqlite3'))
+CACHE_TTL = env_float('SEO_SUGGESTION_TTL', 7 * 24 * 3600)
+CACHE_SIZE = env_int('SEO_SUGGESTION_CACHE_SIZE', 5000)
+
+
+def suggestion_cache_key(inputs, model_name, temperature, max_output_tokens, prompt_version):
+    """
+    Canonical hash of everything that shapes the model's answer: the prompt
+    inputs plus the model, generation config and prompt version.
+    """
+    canonical = json.dumps({
+        'inputs': inputs,
+        'model': model_name,
+        'temperature': temperature,
+        'max_output_tokens': max_output_tokens,
+        'prompt_version': prompt_version,
+    }, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SuggestionCache:
+    """
+    SQLite-backed cache of suggestion dicts with a TTL and a maximum number
+    of entries (least recently used are evicted first). Keeps hit/miss
+    counters for this process.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS suggestions ('
+            ' key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS suggestions_last_access ON suggestions (last_access)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, hit):
+        metrics.cache_lookup('suggestions', hit)
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Return the cached suggestions dict, or None if missing or expired"""
+        conn = self._connection()
+        row = conn.execute('SELECT value, created_at FROM suggestions WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        if row is None or row[1] + self.ttl < now:
+            if row is not None:
+                conn.execute('DELETE FROM suggestions WHERE key = ?', (key,))
+            self._count(False)
+            return None
+        conn.execute('UPDATE suggestions SET last_access = ? WHERE key = ?', (now, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def set(self, key, suggestions):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('INSERT OR REPLACE INTO suggestions (key, value, created_at, last_access) VALUES (?, ?, ?, ?)',
+                     (key, json.dumps(suggestions), now, now))
+        count = conn.execute('SELECT COUNT(*) FROM suggestions').fetchone()[0]
+        if count > self.max_entries:
+            # Expired entries go first, then the least recently used
+            conn.execute('DELETE FROM suggestions WHERE created_at < ?', (now - self.ttl,))
+            count = conn.execute('SELECT COUNT(*) FROM suggestions').fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    'DELETE FROM suggestions WHERE key IN'
+                    ' (SELECT key FROM suggestions ORDER BY last_access LIMIT ?)',
+                    (count - self.max_entries,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM suggestions')
+
+    def stats(self):
+        entries = self._connection().execute('SELECT COUNT(*) FROM suggestions').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_suggestion_cache():
+    """Return the process-wide suggestion cache, or None when it is disabled"""
+    global _cache
+
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SuggestionCache()
+    return _cache
@@ -0,0 +1,132 @@
+"""
+Scoring profiles loaded from a directory, and batch vs. columnar scoring
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer  # noqa: E402
+from benchmarks.scoring import random_seo_data  # noqa: E402
+
+CLIENT_PROFILE = {
+    'categories': {'social': {'max': 20}},
+    'rules': [
+        {'id': 'word_count', 'bands': [{'gte': 800, 'points': 10, 'strength': "✅ {value} words"},
+                                       {'issue': "⚠️ Only {value} words"}]},
+        {'id': 'og_image', 'category': 'social', 'metric': 'og_image',
+         'bands': [{'truthy': True, 'points': 10, 'strength': "✅ Has an og:image"}]},
+    ],
+    'disable': ['twitter_card'],
+}
+
+
+class ProfilesDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = analyzer.PROFILES_DIR, dict(analyzer._profiles), analyzer._profiles_loaded
+        self.dir = tempfile.TemporaryDirectory()
+        analyzer.PROFILES_DIR = self.dir.name
+        analyzer._profiles_loaded = False
+
+    def tearDown(self):
+        analyzer.PROFILES_DIR, profiles, analyzer._profiles_loaded = self.saved
+        analyzer._profiles.clear()
+        analyzer._profiles.update(profiles)
+        self.dir.cleanup()
+
+    def write(self, filename, content):
+        with open(os.path.join(self.dir.name, filename), 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def load(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            names = analyzer.list_profiles()
+        return names, output.getvalue()
+
+    def test_good_and_bad_files(self):
+        self.write('client.json', CLIENT_PROFILE)
+        self.write('named.json', {'name': 'shop', 'extends': 'client', 'disable': ['og_image']})
+        self.write('broken.json', '{"rules": [')
+        self.write('unknown_category.json', {'rules': [{'id': 'x', 'category': 'nope', 'bands': []}]})
+        self.write('not_a_dict.json', '[1, 2]')
+        self.write('notes.txt', 'not a profile')
+
+        names, output = self.load()
+        self.assertEqual(names, sorted([analyzer.DEFAULT_PROFILE_NAME, 'client', 'shop']))
+        for filename in ('broken.json', 'unknown_category.json', 'not_a_dict.json'):
+            self.assertIn(f"Skipping scoring profile {filename}", output)
+        self.assertNotIn('notes.txt', output)
+
+        client = analyzer.get_profile('client')
+        self.assertEqual(client.max_points['social'], 20)
+        self.assertNotIn('twitter_card', [rule_id for rule_id, _, _, _, _ in client.rules])
+
+    def test_loaded_once(self):
+        self.load()
+        self.write('late.json', CLIENT_PROFILE)
+        names, _ = self.load()
+        self.assertNotIn('late', names)
+        with self.assertRaises(ValueError):
+            analyzer.get_profile('late')
+
+    def test_missing_dir(self):
+        analyzer.PROFILES_DIR = os.path.join(self.dir.name, 'missing')
+        self.assertEqual(self.load()[0], [analyzer.DEFAULT_PROFILE_NAME])
+
+
+class BatchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        analyzer.register_profile(dict(CLIENT_PROFILE, name='test-client'))
+        rng = random.Random(5)
+        cls.pages = [random_seo_data(rng) for _ in range(300)]
+
+    @classmethod
+    def tearDownClass(cls):
+        analyzer._profiles.pop('test-client', None)
+
+    def test_batch_matches_columns(self):
+        names = [analyzer.DEFAULT_PROFILE_NAME, 'test-client']
+        batch = list(analyzer.analyze_batch(self.pages, names))
+        self.assertEqual(len(batch), len(self.pages))
+        for name in names:
+            with self.subTest(profile=name):
+                columns = analyzer.analyze_columns(self.pages, name, messages=True)
+                for i, analyses in enumerate(batch):
+                    analysis = analyses[name]
+                    self.assertEqual(analysis['score'], columns['score'][i])
+                    self.assertEqual(analysis['issues'], columns['issues'][i])
+                    self.assertEqual(analysis['strengths'], columns['strengths'][i])
+                    for key in ('category_scores', 'category_percentages'):
+                        self.assertEqual(analysis[key], {category: values[i] for category, values in columns[key].items()})
+
+    def test_batch_matches_per_page(self):
+        for seo_data, analyses in zip(self.pages, analyzer.analyze_batch(self.pages, ['test-client'])):
+            expected = analyzer.analyze_seo(seo_data, 'test-client')
+            del expected['seo_data']
+            self.assertEqual(analyses['test-client'], expected)
+
+    def test_columns_without_messages(self):
+        numbers = analyzer.analyze_columns(self.pages)
+        self.assertNotIn('issues', numbers)
+        self.assertEqual(numbers['score'], analyzer.analyze_columns(self.pages, messages=True)['score'])
+
+    def test_columns_reject_failed_pages(self):
+        with self.assertRaises(ValueError):
+            analyzer.analyze_columns(self.pages[:2] + [{'error': 'timeout'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+JSON API: /api/analyze, /api/batch (NDJSON and the running batch limit)
+and /api/history*. Scraping, the bulk pipeline and AI suggestions are
+replaced with local fakes; history goes to a temporary store.
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer  # noqa: E402
+import app as app_module  # noqa: E402
+from analyzer import analyze_seo, register_profile  # noqa: E402
+from extractor import new_seo_data  # noqa: E402
+from history import HistoryStore  # noqa: E402
+from llm_helper import get_fallback_suggestions  # noqa: E402
+from pipeline import make_result  # noqa: E402
+
+URL = 'https://example.com/page'
+
+
+def fake_seo_data(url):
+    seo_data = new_seo_data(url, 200, 0.5, 40.0)
+    seo_data['title'] = 'Example page'
+    seo_data['title_length'] = 12
+    seo_data['word_count'] = 150
+    seo_data['text_content'] = 'Example text ' * 40
+    return seo_data
+
+
+def fake_scrape(url):
+    if 'unreachable' in url:
+        return {'error': 'Could not reach the site'}
+    return fake_seo_data(url)
+
+
+class ApiTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = HistoryStore(os.path.join(self.dir.name, 'history.sqlite3'))
+        self.suggested = []
+        patches = [
+            mock.patch.object(app_module, 'scrape_website', fake_scrape),
+            mock.patch.object(app_module, 'get_seo_suggestions', self.fake_suggestions),
+            mock.patch.object(app_module, 'record_analysis', self.store.record),
+            mock.patch.object(app_module, 'get_history_store', lambda: self.store),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        output = contextlib.redirect_stdout(io.StringIO())
+        output.__enter__()
+        self.addCleanup(output.__exit__, None, None, None)
+        self.client = app_module.app.test_client()
+
+    def fake_suggestions(self, industry, seo_data, issues):
+        self.suggested.append(seo_data['url'])
+        return get_fallback_suggestions(industry, seo_data)
+
+
+class AnalyzeApiTest(ApiTestCase):
+
+    def test_analyze(self):
+        response = self.client.post('/api/analyze', json={'url': URL})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        expected = analyze_seo(fake_seo_data(URL))
+        self.assertEqual(body['url'], URL)
+        self.assertEqual(body['analysis']['score'], expected['score'])
+        self.assertEqual(body['analysis']['issues'], expected['issues'])
+        self.assertNotIn('text_content', body['seo_data'])
+        self.assertIsNone(body['suggestions'])
+        self.assertEqual(self.suggested, [])
+        self.assertEqual(len(self.store.score_history(URL)), 1)
+
+    def test_form_parameters_and_text(self):
+        response = self.client.post('/api/analyze', data={'website_url': URL, 'include_text': 'yes'})
+        self.assertEqual(response.get_json()['seo_data']['text_content'], 'Example text ' * 40)
+
+    def test_suggestions_for_low_scores(self):
+        body = self.client.post('/api/analyze', json={'url': URL, 'industry': 'plumbing'}).get_json()
+        self.assertLess(body['analysis']['score'], app_module.SUGGESTION_THRESHOLD)
+        self.assertEqual(self.suggested, [URL])
+        self.assertEqual(body['suggestions']['keywords'], get_fallback_suggestions('plumbing')['keywords'])
+
+    def test_other_profiles_are_not_recorded(self):
+        register_profile({'name': 'test-api', 'disable': ['twitter_card']})
+        self.addCleanup(analyzer._profiles.pop, 'test-api', None)
+        response = self.client.post('/api/analyze', json={'url': URL, 'profile': 'test-api'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.store.score_history(URL), [])
+
+    def test_errors(self):
+        self.assertEqual(self.client.post('/api/analyze', json={}).status_code, 400)
+        response = self.client.post('/api/analyze', json={'url': URL, 'profile': 'no-such-profile'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('no-such-profile', response.get_json()['error'])
+
+        response = self.client.post('/api/analyze', json={'url': 'https://unreachable.example/'})
+        self.assertEqual(response.status_code, 502)
+        body = response.get_json()
+        self.assertEqual((body['error'], body['analysis']), ('Could not reach the site', None))
+
+
+class BatchApiTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.options = []
+        # Set to hold batches after their first result
+        self.hold = threading.Event()
+        self.hold.set()
+        patch = mock.patch.object(app_module, 'iter_bulk', self.fake_iter_bulk)
+        patch.start()
+        self.addCleanup(patch.stop)
+        patch = mock.patch.object(app_module, '_batch_slots', threading.BoundedSemaphore(1))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def fake_iter_bulk(self, urls, **options):
+        self.options.append(options)
+
+        def results():
+            for index, url in enumerate(urls):
+                if index == 1:
+                    self.hold.wait(5)
+                seo_data = fake_scrape(url)
+                if 'error' in seo_data:
+                    yield make_result(url, error=seo_data['error'])
+                else:
+                    yield make_result(url, seo_data, analyze_seo(seo_data))
+        return results()
+
+    def lines(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_ndjson(self):
+        urls = [URL, 'https://unreachable.example/', 'https://example.com/other']
+        response = self.client.post('/api/batch', json={'urls': urls})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        results = self.lines(response)
+        self.assertEqual([result['url'] for result in results], urls)
+        self.assertEqual(results[1]['error'], 'Could not reach the site')
+        self.assertIsNotNone(results[2]['analysis']['score'])
+        self.assertNotIn('text_content', results[0]['seo_data'])
+
+    def test_urls_as_text_and_options(self):
+        response = self.client.post('/api/batch', data={
+            'urls': f"{URL}\n\n  https://example.com/other  \n", 'concurrency': '100000', 'per_host': '0',
+            'industry': ' plumbing ', 'incremental': 'true', 'ignore_robots': '1', 'include_text': 'on'})
+        results = self.lines(response)
+        self.assertEqual([result['url'] for result in results], [URL, 'https://example.com/other'])
+        self.assertIn('text_content', results[0]['seo_data'])
+        options = self.options[0]
+        self.assertEqual(options['concurrency'], app_module.MAX_BATCH_CONCURRENCY)
+        self.assertEqual(options['per_host'], 1)
+        self.assertEqual((options['industry'], options['incremental'], options['respect_robots']),
+                         ('plumbing', True, False))
+
+    def test_sitemap(self):
+        with mock.patch.object(app_module, 'discover_urls', return_value=[URL]) as discover:
+            results = self.lines(self.client.post('/api/batch', json={'sitemap': 'example.com'}))
+        self.assertEqual([result['url'] for result in results], [URL])
+        self.assertEqual(discover.call_args[1]['limit'], app_module.MAX_BATCH_URLS)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post('/api/batch', json={'urls': []}).status_code, 400)
+        self.assertEqual(self.client.post('/api/batch', json={'urls': ' \n '}).status_code, 400)
+        too_many = [f'https://example.com/{i}' for i in range(app_module.MAX_BATCH_URLS + 1)]
+        self.assertEqual(self.client.post('/api/batch', json={'urls': too_many}).status_code, 413)
+        self.assertEqual(self.options, [])
+
+    def test_running_batch_limit(self):
+        self.hold.clear()
+        first = self.client.post('/api/batch', json={'urls': [URL, URL]}, buffered=False)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(next(iter(first.response)))['url'], URL)
+
+        busy = self.client.post('/api/batch', json={'urls': [URL]})
+        self.assertEqual(busy.status_code, 503)
+
+        # Closing the stream (finished or abandoned) frees the slot
+        self.hold.set()
+        first.close()
+        self.assertEqual(self.client.post('/api/batch', json={'urls': [URL]}).status_code, 200)
+
+
+class HistoryApiTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        seo_data = fake_seo_data(URL)
+        analysis = analyze_seo(seo_data)
+        self.ids = [self.store.record(seo_data, analysis, 'plumbing', created_at=1000 + day * 86400)
+                    for day in range(3)]
+        other = fake_seo_data('https://www.example.com/other')
+        self.store.record(other, analyze_seo(other), created_at=1000)
+
+    def test_url_history(self):
+        body = self.client.get('/api/history', query_string={'url': URL}).get_json()
+        self.assertEqual([entry['id'] for entry in body['history']], self.ids)
+
+        body = self.client.get('/api/history', query_string={'url': URL, 'limit': 2}).get_json()
+        self.assertEqual([entry['id'] for entry in body['history']], self.ids[1:])
+
+        body = self.client.get('/api/history', query_string={'url': URL, 'since': 1000 + 86400,
+                                                             'until': 1000 + 2 * 86400}).get_json()
+        self.assertEqual([entry['id'] for entry in body['history']], self.ids[1:2])
+
+        self.assertEqual(self.client.get('/api/history').status_code, 400)
+
+    def test_domain_history(self):
+        body = self.client.get('/api/history/domain/example.com').get_json()
+        self.assertEqual((body['summary']['snapshots'], body['summary']['pages']), (4, 2))
+        self.assertEqual([period['snapshots'] for period in body['trend']], [2, 1, 1])
+        # www. and the bare domain are one site
+        self.assertEqual(sorted(page['url'] for page in body['pages']), [URL, 'https://www.example.com/other'])
+
+        body = self.client.get('/api/history/domain/example.com', query_string={'pages': 1}).get_json()
+        self.assertEqual(len(body['pages']), 1)
+
+    def test_snapshot(self):
+        body = self.client.get(f'/api/history/snapshots/{self.ids[0]}').get_json()
+        self.assertEqual((body['id'], body['url'], body['industry']), (self.ids[0], URL, 'plumbing'))
+        self.assertNotIn('text_content', body['seo_data'])
+
+        body = self.client.get(f'/api/history/snapshots/{self.ids[0]}?include_text=1').get_json()
+        self.assertEqual(body['seo_data']['text_content'], 'Example text ' * 40)
+
+        self.assertEqual(self.client.get('/api/history/snapshots/999999').status_code, 404)
+
+    def test_history_disabled(self):
+        with mock.patch.object(app_module, 'get_history_store', lambda: None):
+            for path in ('/api/history?url=x', '/api/history/domain/example.com', '/api/history/snapshots/1'):
+                with self.subTest(path=path):
+                    self.assertEqual(self.client.get(path).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Numeric settings from environment variables
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from env import env_float, env_int  # noqa: E402
+
+
+class EnvTest(unittest.TestCase):
+
+    def test_values(self):
+        with mock.patch.dict(os.environ, {'SEO_TEST_INT': ' 12 ', 'SEO_TEST_FLOAT': '0.25'}):
+            self.assertEqual(env_int('SEO_TEST_INT', 3), 12)
+            self.assertEqual(env_float('SEO_TEST_FLOAT', 3), 0.25)
+            self.assertEqual(env_float('SEO_TEST_INT', 3), 12.0)
+
+    def test_unset_and_empty(self):
+        with mock.patch.dict(os.environ, {'SEO_TEST_INT': ''}):
+            os.environ.pop('SEO_TEST_FLOAT', None)
+            self.assertEqual(env_int('SEO_TEST_INT', 3), 3)
+            self.assertEqual(env_float('SEO_TEST_FLOAT', 1.5), 1.5)
+
+    def test_bad_values_fall_back(self):
+        output = io.StringIO()
+        with mock.patch.dict(os.environ, {'SEO_TEST_INT': '2.5', 'SEO_TEST_FLOAT': 'lots'}), \
+                contextlib.redirect_stdout(output):
+            self.assertEqual(env_int('SEO_TEST_INT', 3), 3)
+            self.assertEqual(env_float('SEO_TEST_FLOAT', 1.5), 1.5)
+        self.assertIn("SEO_TEST_FLOAT='lots'", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Single-pass extraction parity with the legacy section-by-section checks
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsers  # noqa: E402
+from benchmarks.corpus import build_corpus  # noqa: E402
+from benchmarks.extraction import diff_fields, legacy_extract  # noqa: E402
+from extractor import extract_seo_data  # noqa: E402
+
+URL = 'https://example.com/'
+
+# Markup where text inside nav/header/footer/script/style meets the
+# collectors: headings and titles keep it, paragraphs and page text do not
+SNIPPETS = {
+    'p_around_nav': '<p><nav>menu</nav></p><p>x</p>',
+    'p_around_header': '<p><header>hdr</header></p>',
+    'p_around_footer_and_text': '<p>before <footer>ftr</footer> after</p>',
+    'heading_in_nav': '<nav><h2>Menu heading</h2><p>menu text</p></nav><h2>Body</h2>',
+    'nav_in_heading': '<h1>Top <nav>links</nav></h1>',
+    'title_with_script': '<html><head><title>Shop <script>x()</script></title></head></html>',
+    'nested_paragraphs': '<p>outer <span>inner</span></p><p> </p><p><style>p{}</style></p>',
+    'heading_in_header': '<header><h1>Site</h1></header><main><h1>Page</h1><p>Body text here</p></main>',
+}
+
+
+def _backends():
+    return [name for name in ('html.parser', 'lxml') if parsers.PARSER_BACKENDS[name].is_available()]
+
+
+class LegacyParityTest(unittest.TestCase):
+
+    def assertParity(self, raw):
+        for backend in _backends():
+            with self.subTest(backend=backend):
+                parse = parsers.PARSER_BACKENDS[backend].parse
+                expected = legacy_extract(parse(raw), URL)
+                actual = extract_seo_data(parse(raw), URL)
+                self.assertEqual(diff_fields(expected, actual), [],
+                                 {k: (expected.get(k), actual.get(k)) for k in diff_fields(expected, actual)})
+
+    def test_skipped_subtrees(self):
+        for name, html in SNIPPETS.items():
+            with self.subTest(snippet=name):
+                self.assertParity(html)
+
+    def test_paragraphs_ignore_nav_and_header_text(self):
+        for backend in _backends():
+            parse = parsers.PARSER_BACKENDS[backend].parse
+            with self.subTest(backend=backend):
+                self.assertEqual(extract_seo_data(parse(SNIPPETS['p_around_nav']), URL)['paragraph_count'], 1)
+                self.assertEqual(extract_seo_data(parse(SNIPPETS['p_around_header']), URL)['paragraph_count'], 0)
+
+    def test_headings_keep_nav_text(self):
+        data = extract_seo_data(parsers.PARSER_BACKENDS['html.parser'].parse(SNIPPETS['heading_in_nav']), URL)
+        self.assertEqual(data['h2_tags'], ['Menu heading', 'Body'])
+
+    def test_corpus(self):
+        for name, raw in build_corpus().items():
+            with self.subTest(page=name):
+                self.assertParity(raw)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Reading page bodies: the size cap and the download deadline, against a
+local server
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import gzip
+import http.server
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher  # noqa: E402
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # /bytes/N: N bytes with a Content-Length; /unsized/N: N bytes ending
+    # with the connection; /gzip/N: N bytes gzipped; /slow: a few bytes,
+    # then a long pause before the rest (/slow/close: on a connection that
+    # is not kept alive)
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        kind, _, size = self.path.strip('/').partition('/')
+        body = b'x' * int(size) if size.isdigit() else b''
+        self.send_response(200)
+        if kind == 'unsized' or size == 'close':
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        if kind == 'slow':
+            self.send_header('Content-Length', '2000')
+            self.end_headers()
+            self.wfile.write(b'x' * 1000)
+            self.wfile.flush()
+            time.sleep(3)
+            self.wfile.write(b'x' * 1000)
+            return
+        if kind == 'gzip':
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if kind != 'unsized':
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReadBodyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def read(self, path, max_bytes, deadline=None):
+        response = fetcher.fetch(self.base + path, stream=True)
+        return fetcher.read_body(response, max_bytes, deadline)
+
+    def test_body_under_and_at_the_cap(self):
+        for path in ('/bytes/100000', '/unsized/100000'):
+            with self.subTest(path=path):
+                self.assertEqual(self.read(path, 200000), (b'x' * 100000, 100000, False))
+                self.assertEqual(self.read(path, 100000), (b'x' * 100000, 100000, False))
+
+    def test_body_over_the_cap(self):
+        content, size, truncated = self.read('/bytes/100000', 99999)
+        self.assertEqual((len(content), size, truncated), (99999, 100000, True))
+
+        content, size, truncated = self.read('/unsized/300000', 1000)
+        self.assertEqual(len(content), 1000)
+        self.assertTrue(truncated)
+        self.assertLess(size, 300000)
+
+    def test_compressed_size_is_not_taken_from_the_header(self):
+        content, size, truncated = self.read('/gzip/500000', 1000)
+        self.assertEqual((content, truncated), (b'x' * 1000, True))
+        # The decoded bytes read, not the (much smaller) compressed length
+        self.assertGreater(size, 1000)
+        self.assertLessEqual(size, 500000)
+
+    def test_deadline_interrupts_a_stalled_read(self):
+        for path in ('/slow', '/slow/close'):
+            with self.subTest(path=path):
+                start = time.time()
+                with self.assertRaises(fetcher.DownloadTimeout):
+                    self.read(path, 10000, deadline=start + 0.5)
+                self.assertLess(time.time() - start, 2)
+
+    def test_deadline_in_time(self):
+        self.assertEqual(self.read('/bytes/1000', 10000, deadline=time.time() + 10), (b'x' * 1000, 1000, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
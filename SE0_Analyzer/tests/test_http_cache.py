@@ -0,0 +1,187 @@
+"""
+Fetch cache: keying on the canonical URL, ETag / Last-Modified
+revalidation through fetch_page against a local server, and eviction of
+the least recently used responses
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper  # noqa: E402
+from extractor import new_seo_data  # noqa: E402
+from http_cache import FetchCache, decompress_body  # noqa: E402
+from records import SeoData  # noqa: E402
+
+PAGE = b'<html><head><title>Cached</title></head><body>Hello</body></html>'
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, **headers):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # /etag and /modified answer 304 to a matching conditional request;
+    # /plain has no validators. Every request's headers are recorded.
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, dict(self.headers)))
+        validators = {
+            '/etag': ('ETag', '"v1"', 'If-None-Match'),
+            '/modified': ('Last-Modified', 'Wed, 01 Jan 2025 00:00:00 GMT', 'If-Modified-Since'),
+        }.get(self.path.split('?')[0])
+        if validators is not None and self.headers.get(validators[2]) == validators[1]:
+            self.send_response(304)
+            self.send_header(validators[0], validators[1])
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        if validators is not None:
+            self.send_header(validators[0], validators[1])
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.cache = FetchCache(os.path.join(self.dir.name, 'responses.sqlite3'), 10 * 1024 * 1024)
+
+
+class FetchCacheTest(CacheTestCase):
+
+    def test_canonical_url_key(self):
+        response = FakeResponse(ETag='"abc"', **{'Set-Cookie': 'dropped'})
+        self.assertTrue(self.cache.store('https://Example.com/page?b=2&a=1&utm_source=mail#top', response, PAGE, 0.3))
+        entry = self.cache.lookup('https://example.com:443/page?a=1&b=2')
+        self.assertEqual(decompress_body(entry), PAGE)
+        self.assertEqual((entry['etag'], entry['status_code'], entry['load_time']), ('"abc"', 200, 0.3))
+        self.assertEqual(entry['headers'], {'ETag': '"abc"'})
+        self.assertIsNone(self.cache.lookup('https://example.com/page?a=1&b=3'))
+
+    def test_only_revalidatable_responses_are_stored(self):
+        url = 'https://example.com/'
+        self.assertFalse(self.cache.store(url, FakeResponse(), PAGE, 0.1))
+        self.assertFalse(self.cache.store(url, FakeResponse(404, ETag='"x"'), PAGE, 0.1))
+        self.assertFalse(self.cache.store(url, FakeResponse(ETag='"x"', **{'Cache-Control': 'private, no-store'}),
+                                          PAGE, 0.1))
+        self.assertIsNone(self.cache.lookup(url))
+        self.assertTrue(self.cache.store(url, FakeResponse(**{'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}),
+                                         PAGE, 0.1))
+
+    def test_conditional_headers_and_refreshed_validators(self):
+        url = 'https://example.com/'
+        self.cache.store(url, FakeResponse(ETag='"v1"', **{'Last-Modified': 'Mon'}), PAGE, 0.1)
+        self.assertEqual(FetchCache.conditional_headers(self.cache.lookup(url)),
+                         {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'})
+        self.cache.touch(url, FakeResponse(304, ETag='"v2"'))
+        self.assertEqual(FetchCache.conditional_headers(self.cache.lookup(url)),
+                         {'If-None-Match': '"v2"', 'If-Modified-Since': 'Mon'})
+
+    def test_parse_results_are_kept_until_the_page_changes(self):
+        url = 'https://example.com/'
+        self.cache.store(url, FakeResponse(ETag='"v1"'), PAGE, 0.1)
+        self.cache.store_parse(url, 'signature', new_seo_data(url, 200, 0.1))
+        entry = self.cache.lookup(url)
+        self.assertEqual(entry['parse_signature'], 'signature')
+        self.assertEqual(SeoData.from_bytes(entry['seo_data'])['url'], url)
+
+        self.cache.store(url, FakeResponse(ETag='"v2"'), PAGE + b'!', 0.1)
+        entry = self.cache.lookup(url)
+        self.assertEqual((entry['parse_signature'], entry['seo_data']), (None, None))
+
+    def test_least_recently_used_are_evicted(self):
+        # Random bytes do not compress, so every entry is 1000+ bytes
+        self.cache.max_bytes = 2500
+        for name in ('a', 'b'):
+            self.cache.store(f'https://example.com/{name}', FakeResponse(ETag='"x"'), os.urandom(1000), 0.1)
+            time.sleep(0.01)
+        self.cache.touch('https://example.com/a')
+        time.sleep(0.01)
+        self.cache.store('https://example.com/c', FakeResponse(ETag='"x"'), os.urandom(1000), 0.1)
+
+        self.assertIsNone(self.cache.lookup('https://example.com/b'))
+        self.assertIsNotNone(self.cache.lookup('https://example.com/a'))
+        self.assertIsNotNone(self.cache.lookup('https://example.com/c'))
+        self.assertLessEqual(self.cache.stats()['entries'], 2)
+
+
+class RevalidationTest(CacheTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        super().setUp()
+        del _Handler.requests[:]
+        patch = mock.patch.object(scraper, 'get_fetch_cache', lambda: self.cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_etag(self):
+        first = scraper.fetch_page(self.base + '/etag')
+        self.assertEqual((first['status_code'], first['cached']), (200, True))
+        self.assertNotIn('not_modified', first)
+
+        second = scraper.fetch_page(self.base + '/etag')
+        self.assertTrue(second['not_modified'])
+        self.assertEqual(second['content'], PAGE)
+        self.assertEqual((second['status_code'], second['load_time']), (200, first['load_time']))
+        self.assertEqual(_Handler.requests[1][1].get('If-None-Match'), '"v1"')
+
+    def test_last_modified(self):
+        scraper.fetch_page(self.base + '/modified')
+        page = scraper.fetch_page(self.base + '/modified')
+        self.assertTrue(page['not_modified'])
+        self.assertEqual(_Handler.requests[1][1].get('If-Modified-Since'), 'Wed, 01 Jan 2025 00:00:00 GMT')
+
+    def test_tracking_parameters_share_the_entry(self):
+        scraper.fetch_page(self.base + '/etag?utm_source=mail')
+        self.assertTrue(scraper.fetch_page(self.base + '/etag')['not_modified'])
+
+    def test_no_validators_no_revalidation(self):
+        self.assertFalse(scraper.fetch_page(self.base + '/plain')['cached'])
+        page = scraper.fetch_page(self.base + '/plain')
+        self.assertNotIn('not_modified', page)
+        self.assertNotIn('If-None-Match', _Handler.requests[1][1])
+
+    def test_cache_not_used(self):
+        scraper.fetch_page(self.base + '/etag')
+        page = scraper.fetch_page(self.base + '/etag', use_cache=False)
+        self.assertEqual((page['status_code'], page['cached']), (200, False))
+        self.assertNotIn('If-None-Match', _Handler.requests[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
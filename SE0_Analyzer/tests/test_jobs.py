@@ -0,0 +1,203 @@
+"""
+Background analysis jobs through the web routes: /analyze, /jobs/<id>,
+/jobs/<id>/events and /jobs/<id>/result. Scraping, AI suggestions and the
+history store are replaced with local fakes.
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs  # noqa: E402
+from app import app  # noqa: E402
+from extractor import new_seo_data  # noqa: E402
+from llm_helper import get_fallback_suggestions  # noqa: E402
+
+URL = 'https://example.com/'
+
+
+def fake_seo_data(url):
+    seo_data = new_seo_data(url, 200, 0.5, 40.0)
+    seo_data['title'] = 'Example'
+    seo_data['title_length'] = 7
+    seo_data['word_count'] = 150
+    return seo_data
+
+
+def sse_events(body):
+    """The progress events of a Server-Sent Events body"""
+    return [json.loads(line[len('data: '):]) for line in body.splitlines() if line.startswith('data: ')]
+
+
+class JobRoutesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_queue = jobs._queue
+        jobs._queue = self.queue = jobs.JobQueue(workers=2, max_pending=10, ttl=60)
+        # Set to hold scrapes until the test lets them go
+        self.release = threading.Event()
+        self.release.set()
+        self.scrape_error = None
+        patches = [
+            mock.patch.object(jobs, 'scrape_website', self.fake_scrape),
+            mock.patch.object(jobs, 'get_seo_suggestions', self.fake_suggestions),
+            mock.patch.object(jobs, 'record_analysis', mock.Mock()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = app.test_client()
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.release.set()
+        self.queue._executor.shutdown(wait=True)
+        jobs._queue = self.saved_queue
+
+    def fake_scrape(self, url, progress=None):
+        progress('fetched', {'status_code': 200})
+        self.release.wait(5)
+        if self.scrape_error:
+            return {'error': self.scrape_error}
+        seo_data = fake_seo_data(url)
+        progress('parsed', {'word_count': seo_data['word_count']})
+        return seo_data
+
+    @staticmethod
+    def fake_suggestions(industry, seo_data, issues, on_section=None):
+        suggestions = get_fallback_suggestions(industry, seo_data)
+        on_section('optimized_title', suggestions['optimized_title'])
+        return suggestions
+
+    def submit(self, **headers):
+        return self.client.post('/analyze', data={'industry': 'plumbing', 'website_url': URL}, headers=headers)
+
+    def wait_until_finished(self, job_id):
+        for _ in range(200):
+            status = self.client.get(f'/jobs/{job_id}').get_json()
+            if status['status'] in (jobs.DONE, jobs.FAILED):
+                return status
+            time.sleep(0.02)
+        self.fail(f"Job {job_id} did not finish")
+
+    def test_form_post_redirects_to_the_result(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 303)
+        job_id = response.headers['Location'].rstrip('/').split('/')[-2]
+        self.assertTrue(response.headers['Location'].endswith(f'/jobs/{job_id}/result'))
+        self.assertEqual(self.wait_until_finished(job_id)['status'], jobs.DONE)
+
+        page = self.client.get(f'/jobs/{job_id}/result')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(URL, page.get_data(as_text=True))
+
+    def test_json_post_returns_the_job_urls(self):
+        response = self.submit(Accept='application/json')
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        job_id = body['job_id']
+        self.assertEqual(body['status_url'], f'/jobs/{job_id}')
+        self.assertEqual(body['events_url'], f'/jobs/{job_id}/events')
+        self.assertEqual(body['result_url'], f'/jobs/{job_id}/result')
+
+        status = self.wait_until_finished(job_id)
+        stages = [event['stage'] for event in status['events']]
+        self.assertEqual(stages, ['queued', 'fetched', 'parsed', 'scored', 'suggestion', 'suggestions', 'done'])
+        self.assertEqual((status['url'], status['industry'], status['error']), (URL, 'plumbing', None))
+        jobs.record_analysis.assert_called_once()
+
+    def test_missing_fields(self):
+        response = self.client.post('/analyze', data={'industry': 'plumbing'}, headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.get_json())
+
+    def test_queue_full(self):
+        self.queue.max_pending = 0
+        self.assertEqual(self.submit(Accept='application/json').status_code, 503)
+        self.assertEqual(self.submit().status_code, 503)
+
+    def test_result_while_running(self):
+        self.release.clear()
+        job_id = self.submit(Accept='application/json').get_json()['job_id']
+        response = self.client.get(f'/jobs/{job_id}/result')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Refresh'], '2')
+        self.release.set()
+        self.wait_until_finished(job_id)
+
+    def test_events_replay_after_the_job_finished(self):
+        job_id = self.submit(Accept='application/json').get_json()['job_id']
+        status = self.wait_until_finished(job_id)
+
+        response = self.client.get(f'/jobs/{job_id}/events')
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(sse_events(response.get_data(as_text=True)), status['events'])
+
+    def test_events_stream_while_running(self):
+        self.release.clear()
+        job_id = self.submit(Accept='application/json').get_json()['job_id']
+        response = self.client.get(f'/jobs/{job_id}/events', buffered=False)
+        chunks = iter(response.response)
+        first = next(chunks)
+        first = first.decode() if isinstance(first, bytes) else first
+        self.assertEqual(sse_events(first)[0]['stage'], 'queued')
+
+        self.release.set()
+        rest = ''.join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in chunks)
+        stages = [event['stage'] for event in sse_events(first + rest)]
+        self.assertEqual(stages[0], 'queued')
+        self.assertEqual(stages[-1], 'done')
+        self.assertEqual(stages, [event['stage'] for event in self.client.get(f'/jobs/{job_id}').get_json()['events']])
+        response.close()
+
+    def test_failed_job(self):
+        self.scrape_error = 'Could not reach the site'
+        job_id = self.submit(Accept='application/json').get_json()['job_id']
+        status = self.wait_until_finished(job_id)
+        self.assertEqual((status['status'], status['error']), (jobs.FAILED, 'Could not reach the site'))
+        self.assertEqual(status['events'][-1], dict(status['events'][-1], stage='failed', error='Could not reach the site'))
+        page = self.client.get(f'/jobs/{job_id}/result')
+        self.assertIn('Could not reach the site', page.get_data(as_text=True))
+        jobs.record_analysis.assert_not_called()
+
+    def test_unknown_job(self):
+        for path in ('/jobs/nope', '/jobs/nope/events', '/jobs/nope/result'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def test_finished_jobs_expire(self):
+        queue = jobs.JobQueue(workers=1, max_pending=5, ttl=0)
+        try:
+            with mock.patch.object(jobs, 'analyze_website', return_value={'error': 'x'}), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                job = queue.submit('plumbing', URL)
+                for _ in range(100):
+                    if job.finished:
+                        break
+                    time.sleep(0.01)
+                self.assertTrue(job.finished)
+                self.assertIs(queue.get(job.id), job)
+                time.sleep(0.01)
+                # Expired jobs are dropped when the next one is submitted
+                queue.submit('plumbing', URL)
+                self.assertIsNone(queue.get(job.id))
+        finally:
+            queue._executor.shutdown(wait=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Link checker: statuses, caching and per-host pacing, against a local server
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import http.server
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import link_checker  # noqa: E402
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        code = 200
+        for status in (404, 410, 503):
+            if f'/{status}' in self.path:
+                code = status
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+class LinkCheckerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.saved = link_checker._cache, link_checker._limiter
+        link_checker._cache = link_checker.LinkCache()
+        link_checker._limiter = link_checker.HostRateLimiter(interval=0.2)
+
+    def tearDown(self):
+        link_checker._cache, link_checker._limiter = self.saved
+
+    def test_statuses(self):
+        self.assertEqual(link_checker.check_link(self.base + '/ok'), link_checker.OK)
+        self.assertEqual(link_checker.check_link(self.base + '/404'), link_checker.BROKEN)
+        self.assertEqual(link_checker.check_link(self.base + '/410'), link_checker.BROKEN)
+        # Transient: not broken, and not remembered
+        self.assertEqual(link_checker.check_link(self.base + '/503'), link_checker.UNKNOWN)
+        self.assertIsNone(link_checker._cache.get(self.base + '/503'))
+        self.assertEqual(link_checker._cache.get(self.base + '/404'), link_checker.BROKEN)
+
+    def test_reserve_past_deadline_takes_no_slot(self):
+        limiter = link_checker.HostRateLimiter(interval=10)
+        now = time.time()
+        self.assertIsNotNone(limiter.reserve('a.com', now + 1))
+        self.assertIsNone(limiter.reserve('a.com', now + 1))
+        # The refused reservation did not push the host further out
+        self.assertLess(limiter.reserve('a.com'), now + 11)
+
+    def test_abandoned_links_leave_the_host_usable(self):
+        urls = [f'{self.base}/page{i}' for i in range(100)]
+        first = link_checker.check_links(urls, time_budget=1, max_links=100)
+        self.assertGreater(first['unchecked'], 50)
+
+        # A later analysis of the same host still gets its links checked
+        second = link_checker.check_links([f'{self.base}/other{i}' for i in range(3)] + [self.base + '/404'],
+                                          time_budget=2, max_links=100)
+        self.assertEqual(second['checked'], 4)
+        self.assertEqual(second['broken_urls'], [self.base + '/404'])
+
+
+if __name__ == '__main__':
+    unittest.main()
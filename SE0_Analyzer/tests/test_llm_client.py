@@ -0,0 +1,130 @@
+"""
+Gemini call limits: the token bucket, the circuit breaker and replacing
+the client when the API key changes (no API calls are made)
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_client  # noqa: E402
+from llm_client import CircuitBreaker, TokenBucket  # noqa: E402
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_empty(self):
+        bucket = TokenBucket(rate=1, burst=3)
+        self.assertEqual([bucket.try_take() for _ in range(4)], [True, True, True, False])
+
+    def test_waits_for_a_token(self):
+        bucket = TokenBucket(rate=20, burst=1)
+        self.assertTrue(bucket.try_take())
+        start = time.monotonic()
+        self.assertTrue(bucket.take(deadline=start + 1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_gives_up_before_the_deadline(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        bucket.try_take()
+        start = time.monotonic()
+        self.assertFalse(bucket.take(deadline=start + 0.1))
+        # It does not sleep when no token can come in time
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def test_refill_is_capped_at_burst(self):
+        bucket = TokenBucket(rate=1000, burst=2)
+        time.sleep(0.02)
+        self.assertEqual([bucket.try_take() for _ in range(3)], [True, True, False])
+
+    def test_drain(self):
+        bucket = TokenBucket(rate=1, burst=5)
+        bucket.drain()
+        self.assertFalse(bucket.try_take())
+
+    def test_limits(self):
+        bucket = TokenBucket(rate=0, burst=0)
+        self.assertGreater(bucket.rate, 0)
+        self.assertEqual(bucket.burst, 1)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.addCleanup(self.output.__exit__, None, None, None)
+
+    def test_opens_after_failures_in_a_row(self):
+        breaker = CircuitBreaker(failures=3, cooldown=60)
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_one_trial_after_the_cooldown(self):
+        breaker = CircuitBreaker(failures=1, cooldown=0.05)
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only one trial call at a time
+        self.assertFalse(breaker.allow())
+
+        breaker.success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_opens_again(self):
+        breaker = CircuitBreaker(failures=2, cooldown=0.05)
+        breaker.failure()
+        breaker.failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+
+
+class ClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = llm_client._client
+        llm_client._client = None
+
+    def tearDown(self):
+        if llm_client._client is not None:
+            llm_client._client.close()
+        llm_client._client = self.saved
+
+    def test_key_change_closes_the_old_client(self):
+        first = llm_client.get_llm_client('key-one')
+        self.assertIs(llm_client.get_llm_client('key-one'), first)
+        second = llm_client.get_llm_client('key-two')
+        self.assertIsNot(second, first)
+        self.assertEqual(second.api_key, 'key-two')
+        with self.assertRaises(RuntimeError):
+            first._executor.submit(print)
+        # A late call on the old client is refused without a request
+        with self.assertRaises(llm_client.LLMUnavailable):
+            first.generate('prompt')
+        self.assertTrue(first._slots.acquire(blocking=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Batched AI suggestions: grouping pages into requests and splitting the
+answer at its page markers (no API calls are made)
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_helper  # noqa: E402
+from llm_helper import build_batch_prompt, estimate_tokens, parse_batch_suggestions, plan_batches  # noqa: E402
+
+ANSWER = """OPTIMIZED TITLE:
+Title for {n}
+
+OPTIMIZED META DESCRIPTION:
+Meta for {n}
+
+IMPROVED H1:
+H1 {n}
+
+CONTENT OUTLINE:
+- Outline one {n}
+- Outline two {n}
+
+TARGET KEYWORDS:
+{keywords}
+BLOG TOPICS:
+- Topic {n}
+"""
+
+
+def answer(n, keywords=1):
+    return ANSWER.format(n=n, keywords=''.join(f'- keyword {n}.{k}\n' for k in range(keywords)))
+
+
+class PlanBatchesTest(unittest.TestCase):
+
+    def test_no_pages(self):
+        self.assertEqual(plan_batches('plumbing', []), [])
+
+    def test_page_limit(self):
+        batches = plan_batches('plumbing', ['URL: x\n'] * 10, max_pages=4)
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+    def test_output_budget_caps_pages(self):
+        most = llm_helper.BATCH_OUTPUT_TOKENS // llm_helper.OUTPUT_TOKENS_PER_PAGE
+        batches = plan_batches('plumbing', ['URL: x\n'] * (most + 1), max_pages=most + 10)
+        self.assertEqual([len(batch) for batch in batches], [most, 1])
+        self.assertEqual(plan_batches('plumbing', ['URL: x\n'] * 3, max_pages=0), [[0], [1], [2]])
+
+    def test_prompt_budget(self):
+        overhead = estimate_tokens(build_batch_prompt('plumbing', []))
+        size = (llm_helper.BATCH_PROMPT_TOKENS - overhead) // 3
+        summaries = ['x' * (size * 4) for _ in range(5)]
+        batches = plan_batches('plumbing', summaries, max_pages=10)
+        self.assertEqual(sum(batches, []), list(range(5)))
+        for batch in batches:
+            tokens = overhead + sum(estimate_tokens(summaries[i]) + 4 for i in batch)
+            self.assertLessEqual(tokens, llm_helper.BATCH_PROMPT_TOKENS)
+        self.assertEqual(len(batches), 3)
+
+    def test_oversized_page_goes_alone(self):
+        huge = 'x' * (llm_helper.BATCH_PROMPT_TOKENS * 8)
+        self.assertEqual(plan_batches('plumbing', ['a', huge, 'b'], max_pages=10), [[0], [1], [2]])
+
+
+class ParseBatchTest(unittest.TestCase):
+
+    def test_marker_styles(self):
+        text = ("Here are the answers.\n\n=== PAGE 1 ===\n" + answer(1) + "\n**PAGE 2**\n" + answer(2)
+                + "\n## Page 3: https://example.com/c\n" + answer(3))
+        parsed = parse_batch_suggestions(text, 3)
+        self.assertEqual(sorted(parsed), [1, 2, 3])
+        for n in (1, 2, 3):
+            self.assertEqual(parsed[n]['optimized_title'], f'Title for {n}')
+            self.assertEqual(parsed[n]['blog_topics'], [f'Topic {n}'])
+
+    def test_missing_page(self):
+        text = "=== PAGE 1 ===\n" + answer(1) + "=== PAGE 3 ===\n" + answer(3)
+        parsed = parse_batch_suggestions(text, 3)
+        self.assertEqual(sorted(parsed), [1, 3])
+        self.assertEqual(parsed[3]['improved_h1'], 'H1 3')
+
+    def test_out_of_order_pages(self):
+        text = "=== PAGE 2 ===\n" + answer(2) + "=== PAGE 3 ===\n" + answer(3) + "=== PAGE 1 ===\n" + answer(1)
+        parsed = parse_batch_suggestions(text, 3)
+        for n in (1, 2, 3):
+            self.assertEqual(parsed[n]['optimized_meta_description'], f'Meta for {n}')
+
+    def test_no_markers(self):
+        self.assertEqual(parse_batch_suggestions(answer(1), 2), {})
+        self.assertEqual(parse_batch_suggestions('', 2), {})
+
+    def test_unknown_and_repeated_pages(self):
+        text = ("=== PAGE 0 ===\n" + answer(0) + "=== PAGE 1 ===\n" + answer(1)
+                + "=== PAGE 1 ===\n" + answer('again') + "=== PAGE 4 ===\n" + answer(4))
+        parsed = parse_batch_suggestions(text, 2)
+        self.assertEqual(list(parsed), [1])
+        self.assertEqual(parsed[1]['optimized_title'], 'Title for 1')
+
+    def test_incomplete_answer_is_missing(self):
+        cut = answer(2).split('BLOG TOPICS:')[0]
+        text = "=== PAGE 1 ===\n" + answer(1) + "=== PAGE 2 ===\n" + cut
+        self.assertEqual(sorted(parse_batch_suggestions(text, 2)), [1])
+
+    def test_page_mentioned_in_text_is_not_a_marker(self):
+        text = "=== PAGE 1 ===\n" + answer(1).replace('Title for 1', 'Title for 1\nPage 2 of the site is weak')
+        parsed = parse_batch_suggestions(text, 2)
+        self.assertEqual(sorted(parsed), [1])
+
+    def test_list_limits(self):
+        parsed = parse_batch_suggestions("=== PAGE 1 ===\n" + answer(1, keywords=12), 1)
+        self.assertEqual(len(parsed[1]['keywords']), llm_helper.LIST_LIMITS['keywords'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Memoized analyses: what the key depends on, reusing a stored result with
+this fetch's timing, and LRU eviction in both stores
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import new_seo_data  # noqa: E402
+from memo import MemoryMemoStore, SqliteMemoStore, lookup, memo_key, remember  # noqa: E402
+
+URL = 'https://example.com/'
+
+
+def page(content=b'<html>Hello</html>', url=URL, load_time=0.5, status_code=200, **extra):
+    return dict(url=url, content=content, load_time=load_time, status_code=status_code, **extra)
+
+
+class MemoKeyTest(unittest.TestCase):
+
+    def test_inputs(self):
+        key = memo_key(page(), True, 'lxml')
+        self.assertEqual(memo_key(page(load_time=3.0, status_code=203), True, 'lxml'), key)
+        variants = [
+            memo_key(page(b'<html>Changed</html>'), True, 'lxml'),
+            memo_key(page(url='https://example.com/other'), True, 'lxml'),
+            memo_key(page(), False, 'lxml'),
+            memo_key(page(), True, 'html.parser'),
+            memo_key(page(truncated=True, size_bytes=10 ** 7), True, 'lxml'),
+        ]
+        self.assertEqual(len({key, *variants}), 6)
+
+    def test_truncated_pages_key_on_their_full_size(self):
+        first = memo_key(page(truncated=True, size_bytes=10 ** 7), True, 'lxml')
+        self.assertNotEqual(memo_key(page(truncated=True, size_bytes=10 ** 7 + 1), True, 'lxml'), first)
+
+
+class LookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryMemoStore(max_entries=10)
+        self.seo_data = new_seo_data(URL, 200, 0.5, 1.0)
+        self.seo_data['title'] = 'Hello'
+        self.analysis = {'score': 42, 'issues': ['x'], 'seo_data': self.seo_data}
+
+    def test_miss(self):
+        self.assertIsNone(lookup(self.store, 'missing', page()))
+
+    def test_same_fetch_reuses_the_analysis(self):
+        remember(self.store, 'key', self.seo_data, self.analysis)
+        seo_data, analysis = lookup(self.store, 'key', page(load_time=0.501))
+        self.assertEqual(seo_data.to_dict(), self.seo_data.to_dict())
+        self.assertEqual(analysis, {'score': 42, 'issues': ['x']})
+
+    def test_new_timing_or_status_needs_rescoring(self):
+        remember(self.store, 'key', self.seo_data, self.analysis)
+        seo_data, analysis = lookup(self.store, 'key', page(load_time=2.345))
+        self.assertEqual((seo_data['load_time'], seo_data['title']), (2.35, 'Hello'))
+        self.assertIsNone(analysis)
+
+        seo_data, analysis = lookup(self.store, 'key', page(status_code=203))
+        self.assertEqual(seo_data['status_code'], 203)
+        self.assertIsNone(analysis)
+
+    def test_seo_data_only(self):
+        remember(self.store, 'key', self.seo_data)
+        self.assertIsNone(lookup(self.store, 'key', page())[1])
+
+
+class StoreTest(unittest.TestCase):
+
+    def check_lru(self, store):
+        store.set('a', b'1')
+        store.set('b', b'2')
+        time.sleep(0.01)
+        self.assertEqual(store.get('a'), b'1')
+        time.sleep(0.01)
+        store.set('c', b'3')
+        self.assertIsNone(store.get('b'))
+        self.assertEqual((store.get('a'), store.get('c')), (b'1', b'3'))
+        self.assertEqual(store.stats()['entries'], 2)
+        self.assertEqual((store.stats()['hits'], store.stats()['misses']), (3, 1))
+        store.clear()
+        self.assertIsNone(store.get('a'))
+
+    def test_memory_store(self):
+        self.check_lru(MemoryMemoStore(max_entries=2))
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'memo.sqlite3')
+            store = SqliteMemoStore(path, max_entries=2)
+            self.check_lru(store)
+            # Shared with other processes through the file
+            store.set('key', b'value')
+            self.assertEqual(SqliteMemoStore(path, max_entries=2).get('key'), b'value')
+            store._connection().close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Parser backend parity over the benchmark corpus
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsers  # noqa: E402
+from analyzer import analyze_seo  # noqa: E402
+from benchmarks.corpus import build_corpus  # noqa: E402
+from extractor import extract_seo_data  # noqa: E402
+
+URL = 'https://example.com/'
+# Pages lxml and html.parser build the same tree for
+WELL_FORMED = ('tiny', 'typical', 'spa', 'deep')
+
+
+class DefaultBackendTest(unittest.TestCase):
+    """Scores are computed with html.parser unless another backend is asked for"""
+
+    def setUp(self):
+        self.saved = parsers._active_backend, os.environ.pop(parsers.PARSER_ENV_VAR, None)
+        parsers._active_backend = None
+
+    def tearDown(self):
+        parsers._active_backend = self.saved[0]
+        if self.saved[1] is not None:
+            os.environ[parsers.PARSER_ENV_VAR] = self.saved[1]
+
+    def test_default_is_html_parser(self):
+        self.assertEqual(parsers.get_parser_backend().name, 'html.parser')
+
+    def test_lxml_is_opt_in(self):
+        if not parsers.PARSER_BACKENDS['lxml'].is_available():
+            self.skipTest('lxml is not installed')
+        os.environ[parsers.PARSER_ENV_VAR] = 'lxml'
+        self.assertEqual(parsers.get_parser_backend().name, 'lxml')
+
+    def test_default_backend_does_not_change_scores(self):
+        for name, raw in build_corpus().items():
+            with self.subTest(page=name):
+                reference = extract_seo_data(parsers.PARSER_BACKENDS['html.parser'].parse(raw), URL,
+                                             page_size_kb=len(raw) / 1024)
+                data = extract_seo_data(parsers.parse_html(raw), URL, page_size_kb=len(raw) / 1024)
+                self.assertEqual(analyze_seo(data)['score'], analyze_seo(reference)['score'])
+
+
+@unittest.skipUnless(parsers.PARSER_BACKENDS['lxml'].is_available(), 'lxml is not installed')
+class BackendParityTest(unittest.TestCase):
+    """check_parity over the corpus"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = build_corpus()
+
+    def test_well_formed_pages_match(self):
+        for name in WELL_FORMED:
+            with self.subTest(page=name):
+                mismatches = parsers.check_parity(self.corpus[name], URL, ['lxml'])
+                self.assertEqual(mismatches, {'html.parser': [], 'lxml': []})
+
+    def test_malformed_page_drift_is_reported(self):
+        # lxml repairs broken markup differently; the check must catch it
+        mismatches = parsers.check_parity(self.corpus['malformed'], URL, ['lxml'])
+        self.assertEqual(mismatches['html.parser'], [])
+        self.assertIn('title', mismatches['lxml'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+SeoData records: the seo_data mapping interface, text compression and the
+binary form
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import datetime
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import FIELD_DEFAULTS, FIELDS, TEXT_COMPRESS_MIN, SeoData, as_record  # noqa: E402
+
+
+def sample():
+    record = SeoData('https://example.com/page', 200, 1.234, 88.5)
+    record['title'] = 'Example'
+    record['title_length'] = 7
+    record['h1_tags'] = ['Heading']
+    record['language'] = 'en'
+    record['schema_types'] = ['Organization']
+    record['text_content'] = 'word ' * 200
+    record['word_count'] = 200
+    record['links_checked'] = 3
+    record['broken_link_urls'] = ['https://example.com/gone']
+    return record
+
+
+class MappingTest(unittest.TestCase):
+
+    def test_defaults(self):
+        record = SeoData('http://example.com/')
+        expected = dict(FIELD_DEFAULTS, url='http://example.com/')
+        self.assertEqual(record.to_dict(), expected)
+        self.assertEqual(list(record), list(FIELDS))
+        self.assertFalse(record['has_https'])
+        self.assertTrue(SeoData('https://example.com/')['has_https'])
+        # List defaults are not shared between records
+        record['h2_tags'].append('x')
+        self.assertEqual(SeoData('http://example.com/')['h2_tags'], [])
+
+    def test_fields_and_extra_keys(self):
+        record = sample()
+        self.assertEqual(record['title'], 'Example')
+        self.assertEqual(record.title, 'Example')
+        self.assertEqual(record.get('links_checked'), 3)
+        self.assertIsNone(record.get('missing'))
+        self.assertIn('links_checked', record)
+        self.assertNotIn('missing', record)
+        self.assertEqual(len(record), len(FIELDS) + 2)
+        self.assertEqual(list(record)[-2:], ['links_checked', 'broken_link_urls'])
+        with self.assertRaises(KeyError):
+            record['missing']
+
+        del record['links_checked']
+        self.assertNotIn('links_checked', record)
+        with self.assertRaises(KeyError):
+            del record['links_checked']
+        with self.assertRaises(TypeError):
+            del record['title']
+
+    def test_extra_keys_must_be_plain_data(self):
+        record = sample()
+        with self.assertRaises(TypeError):
+            record['fetched_at'] = datetime.datetime(2024, 1, 1)
+        self.assertNotIn('fetched_at', record)
+        record['nested'] = {'a': [1, 2.5, None, (True, b'x')]}
+        self.assertEqual(SeoData.from_bytes(record.to_bytes())['nested'], record['nested'])
+
+    def test_interned_fields(self):
+        record = sample()
+        self.assertIs(record['language'], SeoData.from_dict({'language': ''.join(['e', 'n'])})['language'])
+
+    def test_dict_round_trip(self):
+        record = sample()
+        self.assertEqual(SeoData.from_dict(record.to_dict()), record)
+        self.assertIs(as_record(record), record)
+        self.assertEqual(as_record(record.to_dict()).to_dict(), record.to_dict())
+
+
+class TextTest(unittest.TestCase):
+
+    def test_long_text_is_compressed(self):
+        record = sample()
+        self.assertIsInstance(record._text, bytes)
+        self.assertLess(len(record._text), len(record['text_content']))
+        self.assertEqual(record['text_content'], 'word ' * 200)
+
+    def test_short_text_is_kept(self):
+        record = SeoData('https://example.com/')
+        for text in ('', 'x' * (TEXT_COMPRESS_MIN - 1), 'é' * 100):
+            record['text_content'] = text
+            self.assertIsInstance(record._text, str)
+            self.assertEqual(record['text_content'], text)
+
+    def test_unicode_text(self):
+        record = SeoData('https://example.com/')
+        record['text_content'] = 'Größe 日本語 ✅ ' * 50
+        self.assertEqual(record['text_content'], 'Größe 日本語 ✅ ' * 50)
+
+
+class BinaryFormTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        record = sample()
+        copy = SeoData.from_bytes(record.to_bytes())
+        self.assertEqual(copy.to_dict(), record.to_dict())
+        self.assertIsInstance(copy._text, bytes)
+        self.assertEqual(copy.copy().to_dict(), record.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(record)).to_dict(), record.to_dict())
+
+    def test_round_trip_without_extra_keys(self):
+        record = SeoData('https://example.com/')
+        copy = SeoData.from_bytes(record.to_bytes())
+        self.assertEqual(copy.to_dict(), record.to_dict())
+        self.assertEqual(len(copy), len(FIELDS))
+
+    def test_copies_are_independent(self):
+        record = sample()
+        copy = record.copy()
+        copy['h1_tags'].append('Other')
+        self.assertEqual(record['h1_tags'], ['Heading'])
+
+    def test_rejects_other_data(self):
+        for blob in (b'', b'not a record', pickle.dumps({'url': 'x'})):
+            with self.subTest(blob=blob), self.assertRaises(ValueError):
+                SeoData.from_bytes(blob)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Declarative scoring rules: the default profile against the hand-written
+scorer it replaced, and rule compilation
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import analyze_columns, analyze_seo, get_profile  # noqa: E402
+from benchmarks.scoring import legacy_analyze_seo, random_seo_data  # noqa: E402
+from extractor import new_seo_data  # noqa: E402
+from rules import ScoringProfile  # noqa: E402
+
+
+def boundary_seo_data(rng):
+    """A seo_data record with every metric on or next to a threshold"""
+    d = new_seo_data(rng.choice(['https://a.com/', 'http://b.com/']), 200,
+                     rng.choice([0.01, 1.5, 2, 3.99, 4, 7.25]), rng.choice([10.0, 499.9, 500, 999.99, 1000, 4096.5]))
+    for field, length in (('title', 'title_length'), ('meta_description', 'meta_description_length')):
+        d[field] = rng.choice([None, '', 'x'])
+        d[length] = rng.choice([0, 5, 19, 20, 29, 30, 60, 61, 70, 71, 99, 100, 119, 120, 160, 161, 180, 181])
+    d['canonical_url'] = rng.choice([None, 'https://a.com/'])
+    d['meta_robots'] = rng.choice([None, '', 'index,follow', 'NOINDEX, follow'])
+    d['h1_tags'] = ['h'] * rng.choice([0, 1, 2, 5])
+    d['h2_tags'] = ['h'] * rng.choice([0, 1, 2, 3, 9])
+    d['word_count'] = rng.choice([0, 299, 300, 499, 500, 999, 1000, 5000])
+    d['internal_links'] = rng.choice([0, 1, 2, 4, 5, 50])
+    d['external_links'] = rng.choice([0, 3])
+    if rng.random() < 0.5:
+        d['links_checked'] = rng.choice([0, 10])
+        d['broken_links'] = rng.choice([0, 1, 2, 5])
+    d['has_viewport'], d['has_favicon'], d['has_language'] = (rng.random() < 0.5 for _ in range(3))
+    d['language'] = 'en' if d['has_language'] else None
+    d['has_schema'] = rng.random() < 0.5
+    d['schema_types'] = rng.choice([[], ['A'], ['A', 'B', 'C', 'D']])
+    d['images'] = rng.choice([0, 1, 3, 10])
+    d['images_without_alt'] = rng.randint(0, d['images'])
+    d['og_title'], d['og_description'], d['og_image'] = (rng.choice([None, 'x']) for _ in range(3))
+    d['twitter_card'] = rng.choice([None, 'summary'])
+    return d
+
+
+class LegacyParityTest(unittest.TestCase):
+
+    def assertSameAnalysis(self, seo_data):
+        self.assertEqual(analyze_seo(seo_data), legacy_analyze_seo(seo_data))
+
+    def test_representative_pages(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            self.assertSameAnalysis(random_seo_data(rng))
+
+    def test_threshold_boundaries(self):
+        rng = random.Random(2)
+        for _ in range(5000):
+            self.assertSameAnalysis(boundary_seo_data(rng))
+
+    def test_plain_dictionaries(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            self.assertSameAnalysis(boundary_seo_data(rng).to_dict())
+
+    def test_edge_cases(self):
+        cases = {
+            'error': {'error': 'Request timed out'},
+            'empty page': new_seo_data('https://a.com/'),
+            'empty page dict': new_seo_data('https://a.com/').to_dict(),
+        }
+        for name, seo_data in cases.items():
+            with self.subTest(case=name):
+                self.assertSameAnalysis(seo_data)
+
+        d = new_seo_data('https://a.com/', 200, 1.0, 100.0)
+        d.update(title='T', title_length=45, links_checked=0, broken_links=0)
+        with self.subTest(case='no links checked'):
+            self.assertSameAnalysis(d)
+        d.update(links_checked=3, broken_links=3, images=4, images_without_alt=4, h1_tags=[], h2_tags=[])
+        with self.subTest(case='everything broken'):
+            self.assertSameAnalysis(d)
+
+    def test_columns_match_pages(self):
+        rng = random.Random(4)
+        pages = [boundary_seo_data(rng) for _ in range(500)]
+        scored = analyze_columns(pages, messages=True)
+        for i, seo_data in enumerate(pages):
+            expected = legacy_analyze_seo(seo_data)
+            self.assertEqual(scored['score'][i], expected['score'])
+            self.assertEqual(scored['issues'][i], expected['issues'])
+            self.assertEqual(scored['strengths'][i], expected['strengths'])
+            for category, values in scored['category_scores'].items():
+                self.assertEqual(values[i], expected['category_scores'][category])
+
+
+class CompileTest(unittest.TestCase):
+
+    def profile(self, *rules):
+        return ScoringProfile('test', {'c': {'max': 10}}, list(rules))
+
+    def test_messages(self):
+        profile = self.profile({'id': 'r', 'category': 'c', 'metric': 'word_count', 'bands': [
+            {'gt': 10, 'points': 5, 'strength': "{value:,} words in {title!r} {{literal}}"},
+            {'issue': "{h1_count} h1"},
+        ]})
+        d = new_seo_data('https://a.com/')
+        d.update(title='Home', word_count=12345)
+        result = profile.evaluate(d)
+        self.assertEqual(result['strengths'], ["12,345 words in 'Home' {literal}"])
+        self.assertEqual(result['score'], 5)
+        d['word_count'] = 3
+        self.assertEqual(profile.evaluate(d)['issues'], ['0 h1'])
+
+    def test_guard_and_points_per(self):
+        profile = self.profile({'id': 'r', 'category': 'c', 'when': {'metric': 'links_checked', 'gt': 0},
+                                'otherwise': {'issue': 'not checked'}, 'metric': 'broken_links',
+                                'bands': [{'gt': 0, 'points_per': -2, 'points_cap': 5, 'issue': '{value} broken'}]})
+        self.assertEqual(profile.evaluate({'links_checked': 0})['issues'], ['not checked'])
+        result = profile.evaluate({'links_checked': 9, 'broken_links': 9})
+        self.assertEqual((result['issues'], result['category_scores']['c']), (['9 broken'], 0))
+
+    def test_bad_rules_fail_at_compile_time(self):
+        bad = {
+            'band key': {'id': 'r', 'metric': 'word_count', 'bands': [{'greater': 1}]},
+            'metric name': {'id': 'r', 'metric': 'word count', 'bands': [{}]},
+            'conversion': {'id': 'r', 'metric': 'word_count', 'bands': [{'issue': '{value!x}'}]},
+            'nested spec': {'id': 'r', 'metric': 'word_count', 'bands': [{'issue': '{value:{title}}'}]},
+        }
+        for name, rule in bad.items():
+            with self.subTest(rule=name), self.assertRaises(ValueError):
+                self.profile(rule)
+
+    def test_default_profile_is_cached(self):
+        self.assertIs(get_profile(), get_profile(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+AI suggestion cache: the canonical key, expiry and eviction
+
+Run from the SE0_Analyzer directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suggestion_cache import SuggestionCache, suggestion_cache_key  # noqa: E402
+
+SUGGESTIONS = {'optimized_title': 'Title', 'keywords': ['one', 'two']}
+
+
+class KeyTest(unittest.TestCase):
+
+    def test_canonical(self):
+        key = suggestion_cache_key({'industry': 'plumbing', 'title': 'Ünïcode'}, 'model', 0.7, 1000, 1)
+        self.assertEqual(suggestion_cache_key({'title': 'Ünïcode', 'industry': 'plumbing'}, 'model', 0.7, 1000, 1),
+                         key)
+        variants = [
+            suggestion_cache_key({'industry': 'roofing', 'title': 'Ünïcode'}, 'model', 0.7, 1000, 1),
+            suggestion_cache_key({'industry': 'plumbing', 'title': 'Ünïcode'}, 'other-model', 0.7, 1000, 1),
+            suggestion_cache_key({'industry': 'plumbing', 'title': 'Ünïcode'}, 'model', 0.2, 1000, 1),
+            suggestion_cache_key({'industry': 'plumbing', 'title': 'Ünïcode'}, 'model', 0.7, 2000, 1),
+            suggestion_cache_key({'industry': 'plumbing', 'title': 'Ünïcode'}, 'model', 0.7, 1000, 2),
+        ]
+        self.assertEqual(len({key, *variants}), 6)
+
+
+class SuggestionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'suggestions.sqlite3')
+
+    def test_round_trip_and_stats(self):
+        cache = SuggestionCache(self.path, ttl=60, max_entries=10)
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', SUGGESTIONS)
+        self.assertEqual(cache.get('key'), SUGGESTIONS)
+        self.assertEqual(cache.stats(), {'entries': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        # Persistent: a new cache on the same file sees the entry
+        self.assertEqual(SuggestionCache(self.path, ttl=60, max_entries=10).get('key'), SUGGESTIONS)
+
+    def test_expired_entries_are_dropped(self):
+        cache = SuggestionCache(self.path, ttl=0.05, max_entries=10)
+        cache.set('key', SUGGESTIONS)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = SuggestionCache(self.path, ttl=60, max_entries=2)
+        cache.set('a', SUGGESTIONS)
+        time.sleep(0.01)
+        cache.set('b', SUGGESTIONS)
+        time.sleep(0.01)
+        cache.get('a')
+        time.sleep(0.01)
+        cache.set('c', SUGGESTIONS)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_expired_entries_are_evicted_first(self):
+        cache = SuggestionCache(self.path, ttl=60, max_entries=2)
+        cache.set('old', SUGGESTIONS)
+        cache.set('recent', SUGGESTIONS)
+        # Make 'old' expired, though it was used most recently
+        cache._connection().execute("UPDATE suggestions SET created_at = 0, last_access = ? WHERE key = 'old'",
+                                    (time.time() + 1,))
+        cache.set('new', SUGGESTIONS)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertIsNotNone(cache.get('recent'))
+        self.assertIsNotNone(cache.get('new'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Campaign and click tracking parameters, which never change page content.
+# Generic names such as ref or sessionid are left alone: on some sites they
+# select what the page shows.
+TRACKING_PARAMS = re.compile(r'^(utm_[a-z]+|gclid|fbclid|msclkid|mc_[a-z]+)$', re.I)
+
+
+def site_host(url):
+    """Host used to decide whether a link stays on the site (ignores www.)"""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def canonicalize_url(url):
+    """
+    Normalise a URL so that trivially different spellings of the same page
+    compare equal: lowercase scheme and host, no default port, no fragment,
+    no tracking parameters, sorted query string and a non-empty path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower().rstrip('.')
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    path = parts.path or '/'
+    # Resolve ./ and ../ segments
+    if '/.' in path:
+        segments = []
+        for segment in path.split('/'):
+            if segment == '..':
+                if len(segments) > 1:
+                    segments.pop()
+            elif segment != '.':
+                segments.append(segment)
+        path = '/'.join(segments) or '/'
+        if not path.startswith('/'):
+            path = '/' + path
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)]
+    query.sort()
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import memo
+from analyzer import analyze_seo
+from env import env_int
+from parsers import get_parser_backend, set_parser_backend
+from scraper import parse_page
+
+# Default worker count for the shared pool (SEO_PARSE_WORKERS overrides it)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def analyze_page(page, collect_links=False):
+    """
+    CPU stage: parse a fetched page and score it.
+
+    Only the raw page (bytes plus a few scalars) goes in and only plain dicts
+    come out, so this can run in another process without pickling a soup.
+    The returned analysis does not embed seo_data; callers re-attach it with
+    attach_seo_data() to avoid shipping it across the process boundary twice.
+    Identical content analyzed before comes from the memo store without
+    parsing. Returns (seo_data, analysis).
+    """
+    store = memo.get_memo_store()
+    key = None
+    if store is not None:
+        key = memo.memo_key(page, collect_links, get_parser_backend().name)
+        hit = memo.lookup(store, key, page)
+        if hit is not None:
+            seo_data, analysis = hit
+            if analysis is None:
+                analysis = analyze_seo(seo_data)
+                analysis.pop('seo_data', None)
+                memo.remember(store, key, seo_data, analysis)
+            return seo_data, analysis
+
+    seo_data = parse_page(page, collect_links)
+    analysis = analyze_seo(seo_data)
+    analysis.pop('seo_data', None)
+    if store is not None:
+        memo.remember(store, key, seo_data, analysis)
+    return seo_data, analysis
+
+
+def attach_seo_data(seo_data, analysis):
+    """Put seo_data back into an analysis returned by analyze_page"""
+    analysis['seo_data'] = seo_data
+    return analysis
+
+
+def _init_worker(backend_name):
+    """Runs once in every worker process"""
+    set_parser_backend(backend_name)
+
+
+class ParseWorkerPool:
+    """
+    A reusable pool of worker processes for parsing and scoring.
+
+    The processes are started on first use and kept alive across jobs, and
+    every worker uses the same parser backend as the parent process. If a
+    worker dies (which breaks the whole ProcessPoolExecutor), a new set of
+    processes is started the next time the executor is asked for.
+    """
+
+    def __init__(self, workers=None, backend=None):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.backend = backend
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """The underlying ProcessPoolExecutor (usable with run_in_executor)"""
+        if self._executor is None or self._broken():
+            with self._lock:
+                if self._executor is not None and self._broken():
+                    print("⚠️ A parse worker process died, restarting the pool")
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                if self._executor is None:
+                    backend = self.backend or get_parser_backend().name
+                    print(f"⚙️ Starting {self.workers} parse worker processes ({backend})")
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(backend,),
+                    )
+        return self._executor
+
+    def _broken(self):
+        # Set by ProcessPoolExecutor once a worker died; every later submit fails
+        return bool(getattr(self._executor, '_broken', False))
+
+    def submit(self, page):
+        """Schedule one page; the future resolves to (seo_data, analysis)"""
+        return self.executor.submit(analyze_page, page)
+
+    def analyze(self, page):
+        """Parse and score one page in a worker, returning the full analysis"""
+        seo_data, analysis = self.submit(page).result()
+        return attach_seo_data(seo_data, analysis)
+
+    def map(self, pages, chunksize=1):
+        """Parse and score many pages, yielding full analyses in input order"""
+        for seo_data, analysis in self.executor.map(analyze_page, pages, chunksize=chunksize):
+            yield attach_seo_data(seo_data, analysis)
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_worker_pool(workers=None):
+    """
+    Return the process-wide worker pool, creating it on first use with
+    `workers` processes (or SEO_PARSE_WORKERS, or one per CPU). The pool is
+    shared, so a later call asking for another size gets a warning and the
+    existing pool.
+    """
+    global _shared_pool
+
+    pool = _shared_pool
+    if pool is not None and workers is not None and max(1, workers) != pool.workers:
+        print(f"⚠️ The shared parse pool already has {pool.workers} workers, not starting {workers}")
+    if _shared_pool is None:
+        with _shared_lock:
+            if _shared_pool is None:
+                if workers is None:
+                    workers = env_int('SEO_PARSE_WORKERS', DEFAULT_WORKERS)
+                _shared_pool = ParseWorkerPool(workers)
+    return _shared_pool